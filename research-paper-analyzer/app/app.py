@@ -1,26 +1,37 @@
 # app/app.py
 import streamlit as st
+import atexit
 import tempfile
 import json
 import os
 import sys
-import shutil
 from pathlib import Path
 from datetime import datetime, timezone
 from pprint import pprint
+from typing import Optional
 from dotenv import load_dotenv
 
 # Add project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import pipeline pieces
-from ingestion.parser import parse_pdf_to_pages
-from orchestrator.heads import HeadRunner, OpenRouterLLM, LLMGenerationError
+from ingestion.parser import ParseOptions, parse_pdf_to_pages
+from ingestion.cache import ParseCache
+from ingestion.tables import table_hints, validated_results
+from ingestion.ocr import OCRPageCache, tesseract_available
+from orchestrator.cache import TieredCache, open_head_cache
+from orchestrator.context import build_contexts, count_tokens
+from orchestrator.heads import HeadRunner, AsyncOpenRouterLLM, LLMGenerationError
 from orchestrator.pipeline import Pipeline
+from orchestrator.replay import ReplayLLM
+from orchestrator.service import PipelineService
 from orchestrator.repair import Repairer
 from evidence.locator import attach_evidence_for_paper
 from store.store import save_paper, list_papers, load_paper
 
+# Configuration (must be the first Streamlit command, before any cached resource is built)
+st.set_page_config(page_title="Research Paper Analyzer", layout="wide")
+
 # Load environment variables from .env file (local) or Streamlit secrets (deployed)
 load_dotenv()
 
@@ -52,8 +63,59 @@ for label, model in _OPENROUTER_MODEL_OPTIONS_RAW:
         OPENROUTER_MODEL_OPTIONS.append((label, model))
         _seen_router_models.add(model)
 
-# Configuration
-st.set_page_config(page_title="Research Paper Analyzer", layout="wide")
+# Streamlit re-executes this script on every interaction; st.cache_resource keeps
+# the caches, LLM clients and the pipeline service alive for the whole server.
+
+@st.cache_resource
+def get_parse_cache() -> ParseCache:
+    # Parsed-PDF cache shared across uploads (keyed by file content, not temp filename)
+    return ParseCache()
+
+@st.cache_resource
+def get_ocr_cache():
+    # Scanned PDFs are OCR'd when Tesseract is installed; page text is cached per page
+    return OCRPageCache() if tesseract_available() else None
+
+@st.cache_resource
+def get_head_cache() -> TieredCache:
+    # Head results shared across uploads and sessions (.cache/heads.sqlite by default),
+    # with parsed head objects kept in memory so repeated views skip the disk
+    return TieredCache(open_head_cache(os.getenv("HEAD_CACHE_BACKEND", "sqlite"), os.getenv("HEAD_CACHE_PATH")))
+
+@st.cache_resource
+def get_pipeline_service() -> PipelineService:
+    # One background event loop (and OpenRouter connection pool) for every upload
+    service = PipelineService()
+    atexit.register(service.shutdown)
+    return service
+
+@st.cache_resource
+def get_pipeline(llm_choice: str, refresh: bool, openrouter_api_key: Optional[str] = None) -> Pipeline:
+    """One HeadRunner/LLM client/Pipeline per model choice, reused across uploads."""
+    if llm_choice.startswith("openrouter::"):
+        model_id = llm_choice.split("::", 1)[1]
+        llm_client = AsyncOpenRouterLLM(api_key=openrouter_api_key, model_id=model_id, max_prompt_chars=None)
+        runner = HeadRunner(llm_client=llm_client)
+    elif llm_choice == "replay":
+        # recorded completions (scripts/batch_eval.py --record), served without network
+        runner = HeadRunner(llm_client=ReplayLLM(os.environ["LLM_REPLAY_ARCHIVE"]))
+    else:
+        runner = HeadRunner()  # Defaults to MockLLM
+    # refresh=True ignores cached heads (re-generating and re-caching them);
+    # FUSED_HEADS=1 asks for all heads in one LLM call per paper
+    fused = os.getenv("FUSED_HEADS", "").lower() in ("1", "true", "yes")
+    return Pipeline(head_runner=runner, cache=get_head_cache(), refresh=refresh, fused=fused)
+
+PARSE_CACHE = get_parse_cache()
+OCR_CACHE = get_ocr_cache()
+OCR_ENABLED = OCR_CACHE is not None
+# dict extraction keeps font sizes for the section index; compact pages for the session
+PARSE_OPTIONS = ParseOptions(extraction_mode="dict", strip_boilerplate=True, extract_tables=True,
+                             ocr=OCR_ENABLED, ocr_workers=os.cpu_count() or 1, ocr_cache=OCR_CACHE,
+                             compact=True)
+HEAD_CACHE = get_head_cache()
+PIPELINE_SERVICE = get_pipeline_service()
+
 st.title("Research Paper Analyzer")
 st.markdown(
     """
@@ -87,7 +149,7 @@ def process_pdf(filepath: str, run_store_save: bool = False, llm_choice: str = "
     """
     End-to-end local processing pipeline:
       - parse pdf -> pages
-      - build naive contexts from pages
+      - build token-budgeted contexts from the page blocks
       - run heads through Pipeline (with selected LLM)
       - merge -> repair -> attach evidence
     Returns (final_paper_dict, debug_info)
@@ -95,51 +157,43 @@ def process_pdf(filepath: str, run_store_save: bool = False, llm_choice: str = "
     debug = {"steps": [], "timings": {}, "llm_used": llm_choice}
     t0 = datetime.now(timezone.utc)
 
-    if clear_cache:
-        cache_dir = ".cache"
-        if os.path.exists(cache_dir):
-            try:
-                shutil.rmtree(cache_dir)
-                debug["steps"].append(f"cleared_cache: {cache_dir}")
-            except PermissionError:
-                debug["steps"].append(f"warning: could not clear cache at {cache_dir} (permission denied). Continuing...")
-
-
     # 1) Parse
     debug["steps"].append("parsing")
-    parsed = parse_pdf_to_pages(filepath, save_json=False, out_dir="outputs")
+    parsed = parse_pdf_to_pages(filepath, PARSE_OPTIONS, save_json=False, out_dir="outputs", cache=PARSE_CACHE)
     pages = parsed.get("pages", [])
     debug["timings"]["parsing"] = (datetime.now(timezone.utc) - t0).total_seconds()
-
-    # Build simple contexts from page text
-    joiner = "\n\n"
-
-    def _clip(text, limit):
-        text = text or ""
-        return text[:limit]
-
-    def _collect(pages_subset, per_page, total):
-        pieces = [_clip(p.get("clean_text"), per_page) for p in pages_subset]
-        return _clip(joiner.join(pieces), total)
-
-    metadata_ctx = _clip(pages[0].get("clean_text") if pages else "", 800)
-    half = max(1, len(pages) // 2)
-    methods_ctx = _collect(pages[:half], 400, 1200)
-    results_ctx = _collect(pages, 400, 1600)
-    limitations_ctx = _collect(pages[-2:], 400, 800) if pages else ""
-    summary_ctx = _collect([pages[0], pages[-1]], 600, 1200) if pages else ""
-
-    contexts = {
-        "metadata": metadata_ctx,
-        "methods": methods_ctx,
-        "results": results_ctx,
-        "limitations": limitations_ctx,
-        "summary": summary_ctx,
-    }
+    debug["parse_cache"] = PARSE_CACHE.stats()
+    debug["boilerplate_bytes_removed"] = parsed.get("boilerplate", {}).get("bytes_removed", 0)
+    debug["ocr_pages"] = parsed.get("ocr_pages", [])
+    if parsed.get("needs_ocr") and not any(p.get("clean_text") for p in pages):
+        # nothing for the heads to read; do not spend LLM calls on empty contexts
+        raise ValueError(
+            "No text could be extracted from this PDF (it looks scanned). "
+            "Install Tesseract and pytesseract to enable OCR."
+        )
+
+    # Pack the most relevant blocks of each section into per-head token budgets
+    contexts = build_contexts(pages, parsed.get("sections", []))
+    debug["context_tokens"] = {head: count_tokens(ctx) for head, ctx in contexts.items()}
+
+    candidates = parsed.get("table_results", [])
+    debug["table_candidates"] = len(candidates)
+    table_results = []
+    if os.getenv("TABLE_RESULTS", "").lower() in ("1", "true", "yes"):
+        # opt-in: results read straight from tables replace the results head (no LLM call)
+        table_results = validated_results(candidates)
+    if table_results:
+        contexts.pop("results")
+    else:
+        # table candidates are extra context the results head can check against
+        hints = table_hints(candidates)
+        if hints:
+            contexts["results"] = "\n\n".join(t for t in (contexts.get("results"), hints) if t)
 
     # 2) Run heads (Pipeline)
     debug["steps"].append("running_heads")
     
+    openrouter_api_key = None
     if llm_choice.startswith("openrouter::"):
         # Get API key from secrets or environment
         openrouter_api_key = get_secret("OPENROUTER_API_KEY")
@@ -150,14 +204,20 @@ def process_pdf(filepath: str, run_store_save: bool = False, llm_choice: str = "
             )
             st.info("To use this app with OpenRouter models, add your API key in the Streamlit Cloud dashboard under 'Secrets'.")
             st.stop()
-        model_id = llm_choice.split("::", 1)[1]
-        llm_client = OpenRouterLLM(api_key=openrouter_api_key, model_id=model_id)
-        runner = HeadRunner(llm_client=llm_client)
-    else:
-        runner = HeadRunner()  # Defaults to MockLLM
 
-    pipeline = Pipeline(head_runner=runner, cache_dir=".cache")
-    merged = pipeline.run(contexts)
+    # Cache keys cover model, prompt template and parameters, so switching
+    # models or editing prompts never returns stale heads; clear_cache only
+    # forces this run's heads to be re-generated (and re-cached)
+    pipeline = get_pipeline(llm_choice, clear_cache, openrouter_api_key)
+    if clear_cache:
+        debug["steps"].append("refreshing_head_cache")
+    merged = PIPELINE_SERVICE.run(contexts, pipeline)
+    debug["head_cache"] = HEAD_CACHE.stats()
+    # tokens, cost, latency, retries and cache hits per head (also kept in _meta)
+    debug["llm_metrics"] = merged.get("_meta", {}).get("llm_metrics")
+    if table_results:
+        merged["results"] = table_results
+        merged.setdefault("_meta", {})["results_source"] = "tables"
     t1 = datetime.now(timezone.utc)
     debug["timings"]["run_heads"] = (t1 - t0).total_seconds() - debug["timings"]["parsing"]
 
@@ -214,6 +274,8 @@ st.header("Upload PDF")
 
 # --- Main Controls ---
 llm_options = [("Offline (Local)", "offline")]
+if os.getenv("LLM_REPLAY_ARCHIVE"):
+    llm_options.append(("Replay (recorded)", "replay"))
 for label, model_id in OPENROUTER_MODEL_OPTIONS:
     llm_options.append((label, f"openrouter::{model_id}"))
 
@@ -256,7 +318,7 @@ if uploaded:
     with col1:
         run_and_save = st.checkbox("Also save to local datastore", value=False)
     with col2:
-        clear_cache = st.checkbox("Clear cache before running", value=True, help="Force re-running the LLM heads instead of using cached results.")
+        clear_cache = st.checkbox("Re-run LLM heads", value=False, help="Ignore cached head results for this paper and model (other cached results are kept).")
 
     if st.button("Process Paper"):
         with st.spinner(f"Running pipeline with {llm_choice_label}. This may take a moment..."):
@@ -1,5 +1,5 @@
 # evidence/locator.py
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 import re
 from pathlib import Path
 
@@ -61,7 +61,7 @@ def find_number_matches_in_text(text: str) -> List[Tuple[float, int, int, str]]:
             continue
     return matches
 
-def find_numeric_in_pages(pages: List[Dict[str, Any]], target_value: float, unit: Optional[str] = None,
+def find_numeric_in_pages(pages: Iterable[Dict[str, Any]], target_value: float, unit: Optional[str] = None,
                           tolerance: float = 0.5) -> Optional[Dict[str, Any]]:
     """
     Search pages for numeric token equal to target_value (consider tolerance).
@@ -86,7 +86,7 @@ def find_numeric_in_pages(pages: List[Dict[str, Any]], target_value: float, unit
                 return {"page": p.get("page_no"), "snippet": snippet, "matched_text": tok}
     return None
 
-def find_query_in_pages(pages: List[Dict[str, Any]], query: str, fuzzy_threshold: float = 85.0,
+def find_query_in_pages(pages: Iterable[Dict[str, Any]], query: str, fuzzy_threshold: float = 85.0,
                         window: int = 120) -> Optional[Dict[str, Any]]:
     """
     Search page blocks for best match to query. Return the first confident match as {page, snippet, score}.
@@ -143,11 +143,13 @@ def find_query_in_pages(pages: List[Dict[str, Any]], query: str, fuzzy_threshold
     # if no one reached threshold, return None (conservative)
     return None
 
-def attach_evidence_for_paper(paper: Dict[str, Any], pages: List[Dict[str, Any]],
+def attach_evidence_for_paper(paper: Dict[str, Any], pages: Iterable[Dict[str, Any]],
                               fuzzy_threshold: float = 85.0, num_tolerance: float = 0.5,
                               snippet_window: int = 120) -> Dict[str, Any]:
     """
     Attach evidence to the paper dict in-place and return (paper, report)
+    pages may be a list or any re-iterable page stream (e.g. ingestion.parser.JsonlPages);
+    it is scanned once per queried field.
     report: {found:int, missing:int, details: { field:bool }}
     Evidence keys used: title, methods, results, limitations, summary
     """
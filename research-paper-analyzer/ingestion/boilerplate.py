@@ -0,0 +1,97 @@
+# ingestion/boilerplate.py
+"""
+Cross-page boilerplate removal.
+
+Running headers, footers and page numbers sit at the top or bottom of the
+page and repeat across many pages. We index the first/last few blocks of every
+page by (normalized text, vertical position) and drop the ones that recur on a
+large share of pages. Digits are normalized so "Page 3" and "Page 4" collide.
+arXiv side stamps only appear once, so they are matched by pattern instead.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Only this many blocks at each end of a page are boilerplate candidates
+EDGE_BLOCKS = 2
+# A candidate must recur on at least this share of pages (alternating
+# even/odd headers sit at ~50%) and on at least MIN_PAGES pages
+MIN_FRACTION = 0.3
+MIN_PAGES = 3
+# Vertical position bucket in PDF points
+Y_BUCKET = 10.0
+
+ARXIV_STAMP_RE = re.compile(
+    r"^arXiv:\d{4}\.\d{4,5}(v\d+)?\s*\[[^\]]+\]\s*\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4}$"
+)
+
+_DIGITS_RE = re.compile(r"\d+")
+_WS_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    text = _DIGITS_RE.sub("#", text.lower())
+    return _WS_RE.sub(" ", text).strip()[:200]
+
+
+def _block_key(block: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+    bbox = block.get("bbox")
+    y_key = int(round(bbox[1] / Y_BUCKET)) if bbox else None
+    return _normalize(block.get("text", "")), y_key
+
+
+def _edge_indices(n_blocks: int, edge: int) -> List[int]:
+    return sorted(set(range(min(edge, n_blocks))) | set(range(max(0, n_blocks - edge), n_blocks)))
+
+
+def build_frequency_index(pages: List[Dict[str, Any]], edge: int = EDGE_BLOCKS) -> Counter:
+    """Count, for each (normalized text, y bucket) edge block, how many pages contain it."""
+    index: Counter = Counter()
+    for p in pages:
+        blocks = p.get("blocks") or []
+        keys = {_block_key(blocks[i]) for i in _edge_indices(len(blocks), edge)}
+        index.update(k for k in keys if k[0])
+    return index
+
+
+def remove_boilerplate(pages: List[Dict[str, Any]], min_fraction: float = MIN_FRACTION,
+                       min_pages: int = MIN_PAGES, edge: int = EDGE_BLOCKS) -> Dict[str, Any]:
+    """
+    Drop repeating header/footer blocks and arXiv stamps from `pages` in place
+    and rebuild each page's clean_text from the remaining blocks. raw_text is
+    left untouched. Returns a report with the bytes and blocks removed.
+    """
+    index = build_frequency_index(pages, edge)
+    threshold = max(min_pages, min_fraction * len(pages))
+    repeating = {k for k, count in index.items() if count >= threshold}
+
+    bytes_removed = 0
+    blocks_removed = 0
+    patterns = set()
+    for p in pages:
+        blocks = p.get("blocks") or []
+        if not blocks:
+            continue
+        edges = set(_edge_indices(len(blocks), edge))
+        kept = []
+        for i, b in enumerate(blocks):
+            text = b.get("text", "")
+            key = _block_key(b)
+            if (i in edges and key in repeating) or ARXIV_STAMP_RE.match(text):
+                patterns.add(key[0])
+                blocks_removed += 1
+                continue
+            kept.append(b)
+        if len(kept) == len(blocks):
+            continue
+        before = len((p.get("clean_text") or "").encode("utf-8"))
+        p["blocks"] = kept
+        # same joining rule as the parsers; block texts are already whitespace-clean
+        p["clean_text"] = "\n\n".join(b["text"] for b in kept)
+        bytes_removed += before - len(p["clean_text"].encode("utf-8"))
+
+    return {
+        "bytes_removed": bytes_removed,
+        "blocks_removed": blocks_removed,
+        "patterns": sorted(patterns),
+    }
@@ -0,0 +1,119 @@
+# ingestion/cache.py
+"""
+Content-addressed cache for parsed PDFs.
+
+Entries are keyed by sha256(pdf bytes) + parser version + parse options, so the
+same file uploaded under a different (temp) name is still a hit. Each entry is
+the parse result serialized as compact JSON and zlib-compressed. When the cache
+grows beyond `max_bytes`, least-recently-used entries (by file mtime, which is
+refreshed on every hit) are evicted.
+"""
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_PARSE_CACHE_DIR = Path(".parse_cache")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_SUFFIX = ".json.z"
+
+
+def file_sha256(path: str, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(bufsize)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, cache_dir: str = str(DEFAULT_PARSE_CACHE_DIR), max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, path: str, options: Dict[str, Any]) -> str:
+        h = hashlib.sha256()
+        h.update(file_sha256(path).encode("utf-8"))
+        h.update(b"\0")
+        h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
+
+    def _path_for_key(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{_SUFFIX}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        p = self._path_for_key(key)
+        try:
+            blob = p.read_bytes()
+            result = json.loads(zlib.decompress(blob).decode("utf-8"))
+        except (OSError, zlib.error, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(p)  # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        payload = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        blob = zlib.compress(payload, 6)
+        p = self._path_for_key(key)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(blob)
+        os.replace(tmp, p)
+        self._evict()
+
+    def _entries(self):
+        out = []
+        for p in self.cache_dir.glob(f"*{_SUFFIX}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # oldest access first
+        entries.sort(key=lambda e: e[0])
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                total -= size
+                self.evictions += 1
+            except OSError:
+                continue
+
+    def clear(self) -> None:
+        for _, _, p in self._entries():
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,151 @@
+# ingestion/ocr.py
+"""
+OCR stage for scanned PDFs (needs_ocr=True).
+
+Pages are rendered with PyMuPDF and recognised with Tesseract through
+pytesseract. Each page is one task on a process pool with `workers`
+processes, so at most `workers` pages are rendered/recognised at a time and
+results are collected as they complete. Recognised text is cached per page,
+keyed by the PDF content hash, page number, DPI and language, so re-running
+a scanned document (or the pages that finished before an interruption) is
+free.
+
+pytesseract and the tesseract binary are optional; ocr_pages raises
+RuntimeError when OCR is requested without them.
+"""
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import fitz
+
+from ingestion.cache import file_sha256
+
+try:
+    import pytesseract
+    from PIL import Image
+    _HAS_TESSERACT = True
+except Exception:
+    _HAS_TESSERACT = False
+
+DEFAULT_OCR_CACHE_DIR = Path(".ocr_cache")
+DEFAULT_DPI = 300
+DEFAULT_LANG = "eng"
+
+# An engine takes PNG bytes and a Tesseract language code and returns text.
+# It must be a module-level function so it can be sent to worker processes.
+OCREngine = Callable[[bytes, str], str]
+
+
+def tesseract_available() -> bool:
+    if not _HAS_TESSERACT:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def tesseract_ocr(png: bytes, lang: str = DEFAULT_LANG) -> str:
+    if not _HAS_TESSERACT:
+        raise RuntimeError("OCR requires pytesseract and Pillow (pip install pytesseract) "
+                           "plus the tesseract binary on PATH.")
+    return pytesseract.image_to_string(Image.open(io.BytesIO(png)), lang=lang)
+
+
+def render_page_png(path: str, page_no: int, dpi: int = DEFAULT_DPI) -> bytes:
+    doc = fitz.open(path)
+    try:
+        pix = doc.load_page(page_no - 1).get_pixmap(dpi=dpi)
+        return pix.tobytes("png")
+    finally:
+        doc.close()
+
+
+def _ocr_page_task(args: Tuple[str, int, int, str, OCREngine]) -> Tuple[int, str]:
+    # Worker entry point: render one page and recognise it
+    path, page_no, dpi, lang, engine = args
+    return page_no, engine(render_page_png(path, page_no, dpi), lang)
+
+
+class OCRPageCache:
+    """Recognised page text on disk, one UTF-8 file per (pdf hash, page, dpi, lang, engine)."""
+
+    def __init__(self, cache_dir: str = str(DEFAULT_OCR_CACHE_DIR)):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pdf_sha: str, page_no: int, dpi: int, lang: str, engine_name: str) -> str:
+        raw = f"{pdf_sha}\0{page_no}\0{dpi}\0{lang}\0{engine_name}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path_for_key(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            text = self._path_for_key(key).read_text(encoding="utf-8")
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        p = self._path_for_key(key)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, p)
+
+
+def ocr_pages(path: str, page_numbers: Iterable[int], workers: int = 1, dpi: int = DEFAULT_DPI,
+              lang: str = DEFAULT_LANG, cache: Optional[OCRPageCache] = None,
+              engine: Optional[OCREngine] = None) -> Dict[int, str]:
+    """
+    OCR the given 1-based pages of `path` and return {page_no: text}.
+    Cached pages are served first; the rest go through a process pool of
+    `workers` processes (serial when workers <= 1), each finished page is
+    cached as soon as it completes.
+    """
+    if engine is None:
+        if not _HAS_TESSERACT:
+            raise RuntimeError("OCR requires pytesseract and Pillow (pip install pytesseract) "
+                               "plus the tesseract binary on PATH.")
+        engine = tesseract_ocr
+    engine_name = f"{engine.__module__}.{engine.__qualname__}"
+
+    texts: Dict[int, str] = {}
+    keys: Dict[int, str] = {}
+    pdf_sha = file_sha256(path) if cache is not None else None
+    pending = []
+    for page_no in page_numbers:
+        if cache is not None:
+            keys[page_no] = cache.make_key(pdf_sha, page_no, dpi, lang, engine_name)
+            text = cache.get(keys[page_no])
+            if text is not None:
+                texts[page_no] = text
+                continue
+        pending.append(page_no)
+
+    def _done(page_no: int, text: str) -> None:
+        texts[page_no] = text
+        if cache is not None:
+            cache.put(keys[page_no], text)
+
+    tasks = [(path, page_no, dpi, lang, engine) for page_no in pending]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = [pool.submit(_ocr_page_task, t) for t in tasks]
+            for fut in as_completed(futures):
+                _done(*fut.result())
+    else:
+        for t in tasks:
+            _done(*_ocr_page_task(t))
+    return texts
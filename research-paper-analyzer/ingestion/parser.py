@@ -5,7 +5,35 @@ import json
 import os
 import argparse
 import re
-from typing import List, Dict, Any, Optional
+import pickle
+import unicodedata
+import warnings
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from ingestion.boilerplate import remove_boilerplate
+from ingestion.cache import ParseCache, DEFAULT_PARSE_CACHE_DIR
+from ingestion.ocr import DEFAULT_DPI, DEFAULT_LANG, DEFAULT_OCR_CACHE_DIR, OCRPageCache, ocr_pages
+from ingestion.sections import build_section_index
+from ingestion.tables import extract_table_results
+
+# Bump whenever the parse output changes so cached results are invalidated
+PARSER_VERSION = "4"
+# Pages handed to each worker in parallel mode
+DEFAULT_CHUNK_SIZE = 16
+# PyMuPDF extraction: "blocks" (text + blocks passes) or "dict" (single layout
+# pass, blocks also carry font_size); callers opt in to "dict"
+EXTRACTION_MODES = ("dict", "blocks")
+DEFAULT_EXTRACTION_MODE = "blocks"
+# pdfplumber fallback granularity: whole "document" or individual weak "page"s
+FALLBACK_MODES = ("document", "page")
+WEAK_PAGE_MIN_CHARS = 20
+WEAK_PAGE_MAX_GARBAGE = 0.3
+
+_CID_RE = re.compile(r"\(cid:\d+\)")
 
 
 def clean_text_whitespace(s: str) -> str:
@@ -16,74 +44,504 @@ def clean_text_whitespace(s: str) -> str:
     return s.strip()
 
 
-def blocks_from_pymupdf_page(page) -> List[Dict[str, Any]]:
-    # page.get_text("blocks") -> list of (x0, y0, x1, y1, "text", block_no)
-    raw_blocks = page.get_text("blocks")
+def _blocks_from_tuples(raw_blocks, font_sizes: bool = False) -> List[Dict[str, Any]]:
+    # raw_blocks: (x0, y0, x1, y1, "text", ...) tuples as returned by page.get_text("blocks");
+    # with font_sizes=True the sixth element is the block's first-line font size
     # sort by y (top) then x (left)
-    raw_blocks.sort(key=lambda b: (b[1], b[0]))
+    raw_blocks = sorted(raw_blocks, key=lambda b: (b[1], b[0]))
     blocks = []
     for b in raw_blocks:
         x0, y0, x1, y1, text, *rest = b
         text = text.strip()
         if not text:
             continue
-        blocks.append({
+        block = {
             "bbox": [float(x0), float(y0), float(x1), float(y1)],
             "text": clean_text_whitespace(text)
-        })
+        }
+        if font_sizes:
+            block["font_size"] = rest[0]
+        blocks.append(block)
     return blocks
 
 
-def parse_with_pymupdf(path: str) -> Optional[Dict[str, Any]]:
-    try:
-        doc = fitz.open(path)
-    except Exception:
-        return None
+def blocks_from_pymupdf_page(page) -> List[Dict[str, Any]]:
+    # page.get_text("blocks") -> list of (x0, y0, x1, y1, "text", block_no)
+    return _blocks_from_tuples(page.get_text("blocks"))
 
-    pages = []
-    total_text_len = 0
-    for i in range(len(doc)):
-        page = doc[i]
+
+def _text_and_blocks_from_dict(page) -> Tuple[str, List[Tuple]]:
+    """
+    Rebuild the "text" output and the "blocks" tuples from a single
+    get_text("dict") pass. Lines are joined the way PyMuPDF's plain-text
+    writer does: each line is newline-terminated unless its last span already
+    ends in one. Each block tuple also carries the largest span size of its
+    first line, which is the heading cue used by ingestion.sections.
+    """
+    layout = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+    parts = []
+    raw_blocks = []
+    for b in layout["blocks"]:
+        if b.get("type") != 0:
+            continue
+        lines = []
+        for line in b["lines"]:
+            t = "".join(span["text"] for span in line["spans"])
+            lines.append(t if t.endswith("\n") else t + "\n")
+        text = "".join(lines)
+        parts.append(text)
+        first_spans = b["lines"][0]["spans"] if b["lines"] else []
+        font_size = round(max((span["size"] for span in first_spans), default=0.0), 1)
+        raw_blocks.append((*b["bbox"], text, font_size))
+    return "".join(parts), raw_blocks
+
+
+def page_from_pymupdf(page, page_no: int, mode: str = DEFAULT_EXTRACTION_MODE) -> Dict[str, Any]:
+    """
+    mode="blocks" runs two layout passes (get_text("text") + get_text("blocks"));
+    mode="dict" derives raw text and blocks from one get_text("dict") pass.
+    Block text/bbox and clean_text are identical between modes ("dict" blocks
+    also carry font_size); raw_text can differ by stray blank lines around
+    math glyphs.
+    """
+    if mode == "dict":
+        try:
+            raw_text, raw_blocks = _text_and_blocks_from_dict(page)
+        except Exception:
+            raw_text, raw_blocks = "", []
+        blocks = _blocks_from_tuples(raw_blocks, font_sizes=True)
+    elif mode == "blocks":
         try:
             raw_text = page.get_text("text") or ""
         except Exception:
             raw_text = ""
         blocks = blocks_from_pymupdf_page(page)
-        clean_blocks_text = "\n\n".join([b["text"] for b in blocks]) if blocks else clean_text_whitespace(raw_text)
-        clean_text = clean_text_whitespace(clean_blocks_text or raw_text)
-        pages.append({
-            "page_no": i + 1,
-            "raw_text": raw_text,
-            "blocks": blocks,
-            "clean_text": clean_text
-        })
-        total_text_len += len(clean_text or "")
+    else:
+        raise ValueError(f"unknown extraction mode: {mode}")
+    clean_blocks_text = "\n\n".join([b["text"] for b in blocks]) if blocks else clean_text_whitespace(raw_text)
+    clean_text = clean_text_whitespace(clean_blocks_text or raw_text)
+    return {
+        "page_no": page_no,
+        "raw_text": raw_text,
+        "blocks": blocks,
+        "clean_text": clean_text,
+        "parser_used": "pymupdf"
+    }
+
+
+def _parse_pymupdf_range(args: Tuple[str, int, int, str]) -> List[Dict[str, Any]]:
+    # Worker entry point: each process opens its own fitz document
+    path, start, end, mode = args
+    doc = fitz.open(path)
+    try:
+        return [page_from_pymupdf(doc[i], i + 1, mode) for i in range(start, end)]
+    finally:
+        doc.close()
+
+
+def parse_with_pymupdf(path: str, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       mode: str = DEFAULT_EXTRACTION_MODE) -> Optional[Dict[str, Any]]:
+    """
+    Parse every page with PyMuPDF. With workers > 1 the page range is split into
+    chunks of `chunk_size` pages and parsed in a process pool; chunks are merged
+    back in page order so the output is identical to the serial path.
+    """
+    try:
+        doc = fitz.open(path)
+    except Exception:
+        return None
+
+    n_pages = len(doc)
+    chunk_size = max(1, chunk_size)
+    if workers > 1 and n_pages > chunk_size:
+        doc.close()
+        ranges = [(path, s, min(s + chunk_size, n_pages), mode) for s in range(0, n_pages, chunk_size)]
+        pages = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            # map() yields in submission order, i.e. page order
+            for chunk in pool.map(_parse_pymupdf_range, ranges):
+                pages.extend(chunk)
+    else:
+        pages = [page_from_pymupdf(doc[i], i + 1, mode) for i in range(n_pages)]
+        doc.close()
+
+    total_text_len = sum(len(p["clean_text"] or "") for p in pages)
     return {"pages": pages, "total_text_len": total_text_len}
 
 
+def page_from_pdfplumber(page, page_no: int) -> Dict[str, Any]:
+    raw_text = page.extract_text() or ""
+    # simple block heuristic: split lines and treat each line as block
+    lines = [l.strip() for l in raw_text.split("\n") if l.strip()]
+    blocks = [{"bbox": None, "text": clean_text_whitespace(l)} for l in lines]
+    clean_text = clean_text_whitespace("\n\n".join(lines))
+    return {
+        "page_no": page_no,
+        "raw_text": raw_text,
+        "blocks": blocks,
+        "clean_text": clean_text,
+        "parser_used": "pdfplumber"
+    }
+
+
 def parse_with_pdfplumber(path: str) -> Optional[Dict[str, Any]]:
     try:
         with pdfplumber.open(path) as pdf:
-            pages = []
-            total_text_len = 0
-            for i, page in enumerate(pdf.pages):
-                raw_text = page.extract_text() or ""
-                # simple block heuristic: split lines and treat each line as block
-                lines = [l.strip() for l in raw_text.split("\n") if l.strip()]
-                blocks = [{"bbox": None, "text": clean_text_whitespace(l)} for l in lines]
-                clean_text = clean_text_whitespace("\n\n".join(lines))
-                pages.append({
-                    "page_no": i + 1,
-                    "raw_text": raw_text,
-                    "blocks": blocks,
-                    "clean_text": clean_text
-                })
-                total_text_len += len(clean_text or "")
+            pages = [page_from_pdfplumber(page, i + 1) for i, page in enumerate(pdf.pages)]
+        total_text_len = sum(len(p["clean_text"] or "") for p in pages)
         return {"pages": pages, "total_text_len": total_text_len}
     except Exception:
         return None
 
 
+def _parse_pdfplumber_pages(args: Tuple[str, List[int]]) -> List[Dict[str, Any]]:
+    # Worker entry point: re-extract selected (1-based) pages with pdfplumber
+    path, page_numbers = args
+    with pdfplumber.open(path) as pdf:
+        return [page_from_pdfplumber(pdf.pages[n - 1], n) for n in page_numbers]
+
+
+def _garbage_ratio(text: str) -> float:
+    # Share of characters that indicate a broken text layer: U+FFFD, unmapped
+    # "(cid:NN)" glyphs, private-use code points and stray control characters.
+    if not text:
+        return 0.0
+    bad = text.count("\ufffd") + 5 * len(_CID_RE.findall(text))
+    for ch in text:
+        if ch in "\n\t":
+            continue
+        cat = unicodedata.category(ch)
+        if cat == "Co" or cat == "Cc":
+            bad += 1
+    return min(1.0, bad / len(text))
+
+
+def is_weak_page(page: Dict[str, Any], min_chars: int = WEAK_PAGE_MIN_CHARS,
+                 max_garbage: float = WEAK_PAGE_MAX_GARBAGE) -> bool:
+    """A page is weak when its text layer is (near) empty or mostly garbled."""
+    text = (page.get("clean_text") or "").strip()
+    if len(text) < min_chars:
+        return True
+    return _garbage_ratio(text) > max_garbage
+
+
+def refine_weak_pages(path: str, pages: List[Dict[str, Any]], workers: int = 1) -> List[int]:
+    """
+    Re-extract weak PyMuPDF pages with pdfplumber, in parallel when workers > 1,
+    and swap in the pdfplumber page when it is better. Pages are replaced in
+    place; returns the page numbers that were replaced.
+
+    A process pool that breaks (a killed worker, an unpicklable result) is
+    reported with a warning and the pages are re-extracted serially. When
+    pdfplumber itself cannot read them, that is warned about too and the
+    PyMuPDF pages are kept.
+    """
+    weak = [p["page_no"] for p in pages if is_weak_page(p)]
+    if not weak:
+        return []
+    try:
+        candidates = None
+        if workers > 1 and len(weak) > 1:
+            n_chunks = min(workers, len(weak))
+            chunks = [weak[i::n_chunks] for i in range(n_chunks)]
+            try:
+                candidates = []
+                with ProcessPoolExecutor(max_workers=n_chunks) as pool:
+                    for chunk in pool.map(_parse_pdfplumber_pages, [(path, c) for c in chunks]):
+                        candidates.extend(chunk)
+            except (BrokenProcessPool, pickle.PicklingError) as exc:
+                warnings.warn(f"pdfplumber worker pool failed for {path} ({exc!r}); re-extracting serially")
+                candidates = None
+        if candidates is None:
+            candidates = _parse_pdfplumber_pages((path, weak))
+    except Exception as exc:
+        # pdfminer raises a wide range of types on malformed content
+        warnings.warn(f"pdfplumber could not re-extract weak pages {weak} of {path}: {exc!r}")
+        return []
+
+    by_no = {p["page_no"]: i for i, p in enumerate(pages)}
+    replaced = []
+    for cand in candidates:
+        idx = by_no[cand["page_no"]]
+        old = pages[idx]
+        if is_weak_page(cand):
+            # keep whichever carries more usable text
+            old_score = len(old["clean_text"]) * (1.0 - _garbage_ratio(old["clean_text"]))
+            new_score = len(cand["clean_text"]) * (1.0 - _garbage_ratio(cand["clean_text"]))
+            if new_score <= old_score:
+                continue
+        pages[idx] = cand
+        replaced.append(cand["page_no"])
+    return sorted(replaced)
+
+
+def page_from_ocr_text(page_no: int, text: str) -> Dict[str, Any]:
+    # OCR output has no layout here: one block per paragraph, without bbox
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text or "") if p.strip()]
+    blocks = [{"bbox": None, "text": clean_text_whitespace(p)} for p in paragraphs]
+    return {
+        "page_no": page_no,
+        "raw_text": text or "",
+        "blocks": blocks,
+        "clean_text": "\n\n".join(b["text"] for b in blocks),
+        "parser_used": "ocr"
+    }
+
+
+def ocr_weak_pages(path: str, pages: List[Dict[str, Any]], **ocr_kwargs) -> List[int]:
+    """
+    OCR the weak (empty or garbled) pages and swap in the OCR page when it
+    carries more usable text. Pages are replaced in place; returns the page
+    numbers that were replaced. ocr_kwargs go to ingestion.ocr.ocr_pages.
+    """
+    weak = [p["page_no"] for p in pages if is_weak_page(p)]
+    if not weak:
+        return []
+    texts = ocr_pages(path, weak, **ocr_kwargs)
+    by_no = {p["page_no"]: i for i, p in enumerate(pages)}
+    replaced = []
+    for page_no in weak:
+        cand = page_from_ocr_text(page_no, texts.get(page_no, ""))
+        old = pages[by_no[page_no]]
+        old_score = len(old["clean_text"]) * (1.0 - _garbage_ratio(old["clean_text"]))
+        new_score = len(cand["clean_text"]) * (1.0 - _garbage_ratio(cand["clean_text"]))
+        if new_score <= old_score:
+            continue
+        pages[by_no[page_no]] = cand
+        replaced.append(page_no)
+    return replaced
+
+
+def iter_pages(path: str, parser: str = "pymupdf",
+               mode: str = DEFAULT_EXTRACTION_MODE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield page dicts one at a time, in page order, so only a single page is
+    held in memory. parser is "pymupdf" or "pdfplumber". Unlike
+    parse_pdf_to_pages there is no whole-document fallback, since that needs
+    every page before deciding.
+    """
+    if parser == "pymupdf":
+        doc = fitz.open(path)
+        try:
+            for i in range(len(doc)):
+                yield page_from_pymupdf(doc[i], i + 1, mode)
+        finally:
+            doc.close()
+    elif parser == "pdfplumber":
+        with pdfplumber.open(path) as pdf:
+            for i, page in enumerate(pdf.pages):
+                yield page_from_pdfplumber(page, i + 1)
+                # pdfplumber caches parsed layout objects per page; drop them
+                page.flush_cache()
+    else:
+        raise ValueError(f"unknown parser: {parser}")
+
+
+def _write_jsonl(out_path: str, header: Dict[str, Any], pages: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    # header record, one record per page, then a footer with document totals
+    total_text_len = 0
+    n_pages = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"kind": "header", **header}, ensure_ascii=False) + "\n")
+        for page in pages:
+            total_text_len += len(page["clean_text"] or "")
+            n_pages += 1
+            f.write(json.dumps({"kind": "page", **page}, ensure_ascii=False) + "\n")
+        footer = {
+            "kind": "footer",
+            "n_pages": n_pages,
+            "total_text_len": total_text_len,
+            "needs_ocr": is_scanned({"total_text_len": total_text_len}),
+        }
+        f.write(json.dumps(footer, ensure_ascii=False) + "\n")
+    return footer
+
+
+def write_pages_jsonl(path: str, out_path: str, parser: str = "pymupdf",
+                      mode: str = DEFAULT_EXTRACTION_MODE) -> Dict[str, Any]:
+    """
+    Stream a PDF straight to JSONL without building the page list, so memory
+    stays bounded by a single page. Returns the footer record.
+    """
+    path = os.path.abspath(path)
+    basename = os.path.splitext(os.path.basename(path))[0]
+    header = {"file": path, "basename": basename, "parser_used": parser}
+    return _write_jsonl(out_path, header, iter_pages(path, parser=parser, mode=mode))
+
+
+# Separates block texts that are not substrings of clean_text in Page._buf
+_EXTRA_SEP = "\x00"
+_NAN = float("nan")
+
+
+class Block:
+    """
+    Read-only view of one block of a compact Page. Text is a slice of the
+    page buffer and the bbox is read from the page's packed float array.
+    Supports the dict-style reads used on block dicts (b["text"], b.get(...)).
+    """
+    __slots__ = ("_page", "_i")
+
+    def __init__(self, page: "Page", i: int):
+        self._page = page
+        self._i = i
+
+    @property
+    def text(self) -> str:
+        start, end = self._page._spans[2 * self._i], self._page._spans[2 * self._i + 1]
+        return self._page._buf[start:end]
+
+    @property
+    def bbox(self) -> Optional[List[float]]:
+        vals = self._page._bboxes[4 * self._i:4 * self._i + 4]
+        if vals[0] != vals[0]:  # NaN marks "no bbox" (pdfplumber/OCR blocks)
+            return None
+        return list(vals)
+
+    @property
+    def font_size(self) -> Optional[float]:
+        sizes = self._page._font_sizes
+        return round(sizes[self._i], 1) if sizes is not None else None
+
+    def keys(self) -> List[str]:
+        return ["bbox", "text"] + (["font_size"] if self._page._font_sizes is not None else [])
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.keys() else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.keys()}
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (Block, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Block) else other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Block({self.to_dict()!r})"
+
+
+class Page:
+    """
+    Compact parsed page. clean_text and all block texts share one string
+    buffer: blocks are (start, end) offsets into clean_text, and the rare
+    block that is not a substring of clean_text is appended after it. Bboxes
+    (and font sizes, when extracted) are packed into array('f').
+
+    Dict-style reads (p["clean_text"], p.get("blocks", [])) work as on page
+    dicts, so evidence.locator, ingestion.sections and the app accept either.
+    Pages are read-only; bboxes come back as float32 values.
+    """
+    __slots__ = ("page_no", "parser_used", "raw_text", "_buf", "_clean_len",
+                 "_spans", "_bboxes", "_font_sizes")
+
+    _KEYS = ("page_no", "raw_text", "blocks", "clean_text", "parser_used")
+
+    def __init__(self, page_no: int, raw_text: str, clean_text: str, blocks: List[Dict[str, Any]],
+                 parser_used: str):
+        self.page_no = page_no
+        self.parser_used = parser_used
+        self.raw_text = raw_text
+        buf = [clean_text]
+        buf_len = len(clean_text)
+        spans = array("I")
+        bboxes = array("f")
+        sizes = array("f") if blocks and all("font_size" in b for b in blocks) else None
+        pos = 0
+        for b in blocks:
+            text = b.get("text", "")
+            start = clean_text.find(text, pos)
+            if start == -1:
+                start = clean_text.find(text)
+            if start == -1:
+                buf.append(_EXTRA_SEP + text)
+                start = buf_len + 1
+                buf_len += len(text) + 1
+            else:
+                pos = start + len(text)
+            spans.extend((start, start + len(text)))
+            bboxes.extend(b.get("bbox") or (_NAN,) * 4)
+            if sizes is not None:
+                sizes.append(b["font_size"])
+        self._buf = "".join(buf) if len(buf) > 1 else clean_text
+        self._clean_len = len(clean_text)
+        self._spans = spans
+        self._bboxes = bboxes
+        self._font_sizes = sizes
+
+    @classmethod
+    def from_dict(cls, page: Dict[str, Any]) -> "Page":
+        return cls(page["page_no"], page.get("raw_text") or "", page.get("clean_text") or "",
+                   page.get("blocks") or [], page.get("parser_used", ""))
+
+    @property
+    def clean_text(self) -> str:
+        if self._clean_len == len(self._buf):
+            return self._buf
+        return self._buf[:self._clean_len]
+
+    @property
+    def blocks(self) -> List[Block]:
+        return [Block(self, i) for i in range(len(self._spans) // 2)]
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._KEYS
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self._KEYS else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._KEYS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "page_no": self.page_no,
+            "raw_text": self.raw_text,
+            "blocks": [b.to_dict() for b in self.blocks],
+            "clean_text": self.clean_text,
+            "parser_used": self.parser_used,
+        }
+
+    def __repr__(self) -> str:
+        return f"Page(page_no={self.page_no}, blocks={len(self._spans) // 2}, chars={self._clean_len})"
+
+
+def compact_pages(pages: Iterable[Dict[str, Any]]) -> List[Page]:
+    return [p if isinstance(p, Page) else Page.from_dict(p) for p in pages]
+
+
+class JsonlPages:
+    """
+    Re-iterable view over the page records of a JSONL file written by
+    write_pages_jsonl. Each iteration re-reads the file, so consumers that scan
+    pages several times (e.g. evidence.locator) never hold more than one page.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if rec.pop("kind", None) == "page":
+                    yield rec
+
+
 def is_scanned(parsed: Dict[str, Any], threshold_chars: int = 200) -> bool:
     # If total extracted characters is below threshold, likely scanned PDF
     if parsed is None:
@@ -92,32 +550,140 @@ def is_scanned(parsed: Dict[str, Any], threshold_chars: int = 200) -> bool:
     return total < threshold_chars
 
 
-def parse_pdf_to_pages(path: str, save_json: bool = True, out_dir: str = "outputs") -> Dict[str, Any]:
-    path = os.path.abspath(path)
-    basename = os.path.splitext(os.path.basename(path))[0]
+@dataclass(frozen=True)
+class ParseOptions:
+    """
+    How parse_pdf_to_pages parses a PDF.
+
+    fallback="document" re-parses the whole file with pdfplumber only when
+    PyMuPDF finds no text at all; fallback="page" re-extracts just the weak
+    pages (empty or garbled) and records parser_used on every page.
+    strip_boilerplate drops running headers/footers, page numbers and arXiv
+    stamps from blocks/clean_text and adds a "boilerplate" report.
+    extract_tables runs the table finder on captioned pages and adds
+    "table_results", a list of ResultRecord-shaped candidates with page numbers.
+    ocr=True runs Tesseract on the weak pages of documents flagged needs_ocr,
+    with ocr_workers processes and per-page caching in ocr_cache; the OCR
+    pages are merged into "pages" (parser_used "ocr") and listed in
+    "ocr_pages". needs_ocr still reports what the text layer looked like.
+    compact=True returns "pages" as Page objects (shared text buffer, packed
+    bboxes) instead of dicts; the cache and saved JSON keep the dict form.
+
+    Fields marked {"cache_key": False} only change speed or the returned form,
+    not the parse output, so they are left out of the ParseCache key.
+    """
+    workers: int = field(default=1, metadata={"cache_key": False})
+    chunk_size: int = field(default=DEFAULT_CHUNK_SIZE, metadata={"cache_key": False})
+    extraction_mode: str = DEFAULT_EXTRACTION_MODE
+    fallback: str = "document"
+    strip_boilerplate: bool = False
+    extract_tables: bool = False
+    ocr: bool = False
+    ocr_workers: int = field(default=1, metadata={"cache_key": False})
+    ocr_dpi: int = DEFAULT_DPI
+    ocr_lang: str = DEFAULT_LANG
+    ocr_cache: Optional[OCRPageCache] = field(default=None, metadata={"cache_key": False})
+    compact: bool = field(default=False, metadata={"cache_key": False})
+
+    def __post_init__(self):
+        if self.extraction_mode not in EXTRACTION_MODES:
+            raise ValueError(f"unknown extraction mode: {self.extraction_mode}")
+        if self.fallback not in FALLBACK_MODES:
+            raise ValueError(f"unknown fallback mode: {self.fallback}")
+
+    def cache_key(self) -> Dict[str, Any]:
+        """The options that change the parse output, for ParseCache.make_key."""
+        key = {"parser_version": PARSER_VERSION}
+        for f in fields(self):
+            if f.metadata.get("cache_key", True):
+                key[f.name] = getattr(self, f.name)
+        if not self.ocr:
+            # render settings only matter when OCR runs
+            del key["ocr_dpi"], key["ocr_lang"]
+        return key
+
+    def ocr_kwargs(self) -> Optional[Dict[str, Any]]:
+        if not self.ocr:
+            return None
+        return {"workers": self.ocr_workers, "dpi": self.ocr_dpi, "lang": self.ocr_lang, "cache": self.ocr_cache}
+
+
+def _parse_document(path: str, options: ParseOptions) -> Dict[str, Any]:
     # Try PyMuPDF first
-    parsed = parse_with_pymupdf(path)
+    parsed = parse_with_pymupdf(path, workers=options.workers, chunk_size=options.chunk_size,
+                                mode=options.extraction_mode)
     parser_used = "pymupdf"
-    if parsed is None or parsed.get("total_text_len", 0) == 0:
+    if options.fallback == "page" and parsed is not None:
+        # hybrid: only weak pages go through the slow pdfplumber path
+        if refine_weak_pages(path, parsed["pages"], workers=options.workers):
+            parser_used = "pymupdf+pdfplumber"
+            parsed["total_text_len"] = sum(len(p["clean_text"] or "") for p in parsed["pages"])
+    elif parsed is None or parsed.get("total_text_len", 0) == 0:
         # fallback
         parsed = parse_with_pdfplumber(path)
         parser_used = "pdfplumber" if parsed is not None else "none"
 
     scanned = is_scanned(parsed)
+    doc = {
+        "parser_used": parser_used,
+        "needs_ocr": scanned,
+        "pages": parsed["pages"] if parsed else [],
+    }
+    ocr = options.ocr_kwargs()
+    if ocr is not None and scanned and doc["pages"]:
+        doc["ocr_pages"] = ocr_weak_pages(path, doc["pages"], **ocr)
+        if doc["ocr_pages"]:
+            doc["parser_used"] = f"{parser_used}+ocr"
+    if options.strip_boilerplate:
+        doc["boilerplate"] = remove_boilerplate(doc["pages"])
+    # built last so block offsets refer to the final block lists
+    doc["sections"] = build_section_index(doc["pages"])
+    if options.extract_tables:
+        page_texts = {p["page_no"]: p.get("raw_text") or "" for p in doc["pages"]}
+        doc["table_results"] = extract_table_results(path, page_texts=page_texts)
+    return doc
+
+
+def parse_pdf_to_pages(path: str, options: Optional[ParseOptions] = None, save_json: bool = True,
+                       out_dir: str = "outputs", cache: Optional[ParseCache] = None,
+                       save_format: str = "json") -> Dict[str, Any]:
+    """
+    Parse `path` as described by `options` (ParseOptions() when omitted).
+    With a cache, results are looked up by file content and options.cache_key();
+    save_json writes the result to out_dir as .json or, with save_format="jsonl",
+    as a page-per-line .jsonl.
+    """
+    options = options or ParseOptions()
+    path = os.path.abspath(path)
+    basename = os.path.splitext(os.path.basename(path))[0]
+
+    parsed_doc = None
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(path, options.cache_key())
+        parsed_doc = cache.get(cache_key)
+    if parsed_doc is None:
+        parsed_doc = _parse_document(path, options)
+        if cache is not None:
+            cache.put(cache_key, parsed_doc)
 
     result = {
         "file": path,
         "basename": basename,
-        "parser_used": parser_used,
-        "needs_ocr": scanned,
-        "pages": parsed["pages"] if parsed else [],
+        **parsed_doc,
     }
 
     if save_json:
         os.makedirs(out_dir, exist_ok=True)
-        out_path = os.path.join(out_dir, f"{basename}.json")
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        if save_format == "jsonl":
+            header = {k: v for k, v in result.items() if k != "pages"}
+            _write_jsonl(os.path.join(out_dir, f"{basename}.jsonl"), header, result["pages"])
+        else:
+            out_path = os.path.join(out_dir, f"{basename}.json")
+            with open(out_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+    if options.compact:
+        result["pages"] = compact_pages(result["pages"])
     return result
 
 
@@ -125,10 +691,60 @@ def cli_main():
     ap = argparse.ArgumentParser(description="Parse PDF into page-level JSON")
     ap.add_argument("input_pdf", help="path to input PDF")
     ap.add_argument("--out", help="output directory (default: outputs)", default="outputs")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="worker processes for page parsing (default: 1, serial)")
+    ap.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                    help=f"pages per worker task in parallel mode (default: {DEFAULT_CHUNK_SIZE})")
+    ap.add_argument("--cache-dir", default=None,
+                    help=f"reuse parses from a content-addressed cache (e.g. {DEFAULT_PARSE_CACHE_DIR})")
+    ap.add_argument("--extraction-mode", choices=EXTRACTION_MODES, default=DEFAULT_EXTRACTION_MODE,
+                    help=f"PyMuPDF extraction passes per page (default: {DEFAULT_EXTRACTION_MODE})")
+    ap.add_argument("--fallback", choices=FALLBACK_MODES, default="document",
+                    help="pdfplumber fallback for the whole document or only weak pages (default: document)")
+    ap.add_argument("--strip-boilerplate", action="store_true",
+                    help="drop repeating headers/footers, page numbers and arXiv stamps")
+    ap.add_argument("--tables", action="store_true",
+                    help="extract result candidates from tables on captioned pages")
+    ap.add_argument("--ocr", action="store_true",
+                    help="OCR weak pages of scanned PDFs with Tesseract (needs pytesseract)")
+    ap.add_argument("--ocr-workers", type=int, default=1,
+                    help="worker processes for OCR (default: 1)")
+    ap.add_argument("--ocr-dpi", type=int, default=DEFAULT_DPI,
+                    help=f"render resolution for OCR (default: {DEFAULT_DPI})")
+    ap.add_argument("--ocr-lang", default=DEFAULT_LANG,
+                    help=f"Tesseract language(s), e.g. eng+deu (default: {DEFAULT_LANG})")
+    ap.add_argument("--ocr-cache-dir", default=str(DEFAULT_OCR_CACHE_DIR),
+                    help=f"per-page OCR cache (default: {DEFAULT_OCR_CACHE_DIR})")
+    ap.add_argument("--stream", action="store_true",
+                    help="stream pages to <basename>.jsonl with bounded memory (serial, no fallback)")
     args = ap.parse_args()
-    res = parse_pdf_to_pages(args.input_pdf, save_json=True, out_dir=args.out)
+    if args.stream:
+        os.makedirs(args.out, exist_ok=True)
+        basename = os.path.splitext(os.path.basename(args.input_pdf))[0]
+        out_path = os.path.join(args.out, f"{basename}.jsonl")
+        footer = write_pages_jsonl(args.input_pdf, out_path, mode=args.extraction_mode)
+        print(f"Streamed {footer['n_pages']} pages. needs_ocr={footer['needs_ocr']}")
+        print(f"Saved JSONL to {out_path}")
+        return
+    cache = ParseCache(args.cache_dir) if args.cache_dir else None
+    options = ParseOptions(
+        workers=args.workers, chunk_size=args.chunk_size, extraction_mode=args.extraction_mode,
+        fallback=args.fallback, strip_boilerplate=args.strip_boilerplate, extract_tables=args.tables,
+        ocr=args.ocr, ocr_workers=args.ocr_workers, ocr_dpi=args.ocr_dpi, ocr_lang=args.ocr_lang,
+        ocr_cache=OCRPageCache(args.ocr_cache_dir) if args.ocr else None,
+    )
+    res = parse_pdf_to_pages(args.input_pdf, options, save_json=True, out_dir=args.out, cache=cache)
     print(f"Parsed: {res['file']}. parser_used={res['parser_used']}. needs_ocr={res['needs_ocr']}")
+    if "boilerplate" in res:
+        print(f"Boilerplate removed: {res['boilerplate']['bytes_removed']} bytes "
+              f"in {res['boilerplate']['blocks_removed']} blocks")
+    if res.get("ocr_pages"):
+        print(f"OCR pages: {len(res['ocr_pages'])}")
+    if "table_results" in res:
+        print(f"Table result candidates: {len(res['table_results'])}")
     print(f"Saved JSON to {os.path.join(args.out, res['basename'] + '.json')}")
+    if cache is not None:
+        print(f"Parse cache: {cache.stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+# ingestion/sections.py
+"""
+Section segmentation from heading cues.
+
+A block starts a section when its first line looks like a heading: numbered
+("3", "3.1", "IV."), set in a larger font than the body text, or ALL CAPS,
+and short. Heading titles are mapped to canonical names (Abstract,
+Introduction, Method, Experiments, Results, Limitations, Conclusion,
+References, ...). Numbered top-level headings that do not map to a canonical
+name are kept as "Other" so they still close the previous section.
+
+Each section records where it starts and ends as (page_no, block index) pairs;
+orchestrator.context maps every block to its section from these offsets.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+SECTION_PATTERNS: List[Tuple[str, str]] = [
+    ("Abstract", r"abstract"),
+    ("Introduction", r"introduction"),
+    ("Related Work", r"related works?|background and related work|prior work|literature review"),
+    ("Background", r"background|preliminaries|problem (definition|formulation|statement|setup)"),
+    ("Method", r"methods?|methodology|(our |the )?(proposed )?(approach|method|model|framework)"
+               r"|(model )?architecture|(system )?design|method(ology)? overview"),
+    ("Experiments", r"experiments?( and results)?|experimentation|experimental (setup|settings?|evaluation|study|design)"
+                    r"|evaluation|empirical (evaluation|study)|experimental analysis"),
+    ("Results", r"results|(main|experimental|empirical) results|results and (discussion|analysis)"),
+    ("Limitations", r"limitations?( and future (work|directions))?|discussion and limitations"),
+    ("Discussion", r"discussion"),
+    ("Conclusion", r"conclusions?( and future (work|directions))?|concluding remarks"
+                   r"|discussion and conclusions?|summary and conclusions?"),
+    ("References", r"references|bibliography"),
+    ("Acknowledgements", r"acknowledge?ments?"),
+    ("Appendix", r"appendix|appendices|supplementary materials?"),
+]
+_COMPILED = [(name, re.compile(rf"^(?:{pat})$")) for name, pat in SECTION_PATTERNS]
+
+# "3", "3.1", "IV", "A" alone on a line, or as a prefix before the title
+_NUM = r"(?:\d{1,2}(?:\.\d{1,2})*|[IVX]{1,5}|[A-H])"
+_NUM_ONLY_RE = re.compile(rf"^{_NUM}\.?$")
+_NUM_PREFIX_RE = re.compile(rf"^({_NUM})[.)]?\s+(.+)$")
+_INLINE_ABSTRACT_RE = re.compile(r"^abstract\s*[.:—–-]", re.I)
+
+MAX_HEADING_CHARS = 80
+MAX_HEADING_WORDS = 10
+# Font size must exceed the body size by this much to count as a cue
+FONT_DELTA = 0.9
+
+
+def canonical_section_name(title: str) -> Optional[str]:
+    # "Proposed Method: CUSP" -> "proposed method"
+    t = title.split(":", 1)[0]
+    t = re.sub(r"[\s.]+$", "", t.strip().lower())
+    t = re.sub(r"\s+", " ", t)
+    for name, rx in _COMPILED:
+        if rx.match(t):
+            return name
+    return None
+
+
+def body_font_size(pages: List[Dict[str, Any]]) -> Optional[float]:
+    """Most common block font size, weighted by text length."""
+    sizes: Counter = Counter()
+    for p in pages:
+        for b in p.get("blocks") or []:
+            fs = b.get("font_size")
+            if fs:
+                sizes[fs] += len(b.get("text", ""))
+    return sizes.most_common(1)[0][0] if sizes else None
+
+
+def _heading_of(block: Dict[str, Any], body_size: Optional[float]) -> Optional[Tuple[str, str, int]]:
+    """Return (canonical name or "Other", heading text, depth) if the block opens a section."""
+    text = block.get("text", "")
+    lines = [l.strip() for l in text.split("\n") if l.strip()]
+    if not lines:
+        return None
+    first = lines[0]
+    if _INLINE_ABSTRACT_RE.match(first):
+        return "Abstract", "Abstract", 1
+
+    number = None
+    if _NUM_ONLY_RE.match(first) and len(lines) > 1:
+        number, title = first.rstrip("."), lines[1]
+    else:
+        m = _NUM_PREFIX_RE.match(first)
+        if m:
+            number, title = m.group(1), m.group(2)
+        else:
+            title = first
+    if len(title) > MAX_HEADING_CHARS or len(title.split()) > MAX_HEADING_WORDS:
+        return None
+    if not title[:1].isalpha():
+        return None
+
+    fs = block.get("font_size")
+    big_font = bool(fs and body_size and fs >= body_size + FONT_DELTA)
+    all_caps = title.isupper() and len(title) > 3
+    standalone = len(lines) == 1 if number is None else len(lines) <= 2
+    depth = number.count(".") + 1 if number else 1
+
+    name = canonical_section_name(title)
+    if name:
+        if number or big_font or all_caps or standalone:
+            heading = f"{number} {title}" if number else title
+            return name, heading, depth
+        return None
+    # Unknown headings only count as boundaries at the top level
+    if depth == 1 and title[:1].isupper() and (big_font if body_size else (number and number.isdigit())):
+        if number or all_caps:
+            heading = f"{number} {title}" if number else title
+            return "Other", heading, depth
+    return None
+
+
+def build_section_index(pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Scan blocks in reading order and return the list of sections:
+      {"name", "heading", "page_start", "block_start", "page_end", "block_end"}
+    Start is inclusive, end is exclusive (the position of the next heading, or
+    one past the last block). Each canonical name is used at most once (first
+    occurrence wins); text before the first canonical heading (title, authors)
+    is not indexed.
+    """
+    body_size = body_font_size(pages)
+    starts = []
+    seen = set()
+    for p in pages:
+        for bi, b in enumerate(p.get("blocks") or []):
+            h = _heading_of(b, body_size)
+            if not h:
+                continue
+            name, heading, depth = h
+            if name == "Other" and not seen:
+                continue
+            if name != "Other":
+                if name in seen:
+                    continue
+                seen.add(name)
+            starts.append((name, heading, p.get("page_no"), bi))
+
+    sections = []
+    if not starts:
+        return sections
+    last = pages[-1]
+    end_of_doc = (last.get("page_no"), len(last.get("blocks") or []))
+    for i, (name, heading, page_no, bi) in enumerate(starts):
+        page_end, block_end = (starts[i + 1][2], starts[i + 1][3]) if i + 1 < len(starts) else end_of_doc
+        sections.append({
+            "name": name,
+            "heading": heading,
+            "page_start": page_no,
+            "block_start": bi,
+            "page_end": page_end,
+            "block_end": block_end,
+        })
+    return sections
@@ -0,0 +1,338 @@
+# ingestion/tables.py
+"""
+Table extraction into result candidates, without an LLM call.
+
+Only pages whose text carries a "Table N" caption are searched (PyMuPDF's
+table finder costs tens of milliseconds to seconds per page). Papers mostly
+use rule-only (booktabs) tables, for which the finder merges a column of
+values into one cell ("92.1\n90.3") and neighbouring columns into one cell
+("Cora Citeseer"), so cells are first expanded back into a grid.
+
+Each numeric cell becomes a ResultRecord-shaped dict:
+  {"dataset", "metric", "value", "unit", "ours_is", "confidence",
+   "page", "table", "row_label", "source": "table"}
+The metric comes from a metric-like column header, otherwise from the
+caption; the dataset comes from the rest of the header ("CRT Acc"), a
+"Dataset" row label, a non-metric column header, or "on <Name>" in the
+caption. Cells where either is unknown are dropped. ours_is is only set
+for rows labelled as the paper's own method ("Ours", "Proposed ..."); a
+table does not say which of its other rows are baselines.
+
+Header and caption matching is heuristic (ablation tables, transposed
+layouts), so candidates are meant as extra context for the results head
+(table_hints) rather than as a replacement for it.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import fitz
+
+from normalizers.number_parser import parse_number_string
+from schema.head_models import ResultRecord
+
+CAPTION_RE = re.compile(r"^\s*Table\s+(\d+|[IVX]+)\s*[:.|]?\s*(.*)$", re.I | re.M)
+
+METRIC_KEYWORDS = [
+    ("Accuracy", r"acc(uracy)?|top-?1|top-?5"),
+    ("F1", r"(macro-?|micro-?)?f1(-score)?|f-?score"),
+    ("BLEU", r"bleu"),
+    ("ROUGE", r"rouge(-?[12l])?"),
+    ("AUC", r"(roc-?)?auc|auroc|auprc"),
+    ("Precision", r"precision|prec\.?"),
+    ("Recall", r"recall|rec\.?"),
+    ("mAP", r"m?ap(@[\d.]+)?"),
+    ("MRR", r"mrr"),
+    ("MCC", r"mcc"),
+    ("Hits", r"hits@\d+|h@\d+"),
+    ("NDCG", r"ndcg(@\d+)?"),
+    ("PPL", r"ppl|perplexity"),
+    ("EM", r"em|exact match"),
+    ("MAE", r"mae"),
+    ("RMSE", r"rmse"),
+    ("MSE", r"mse"),
+    ("Error", r"error( rate)?|err\.?|wer|cer"),
+    ("Speedup", r"speed-?up"),
+]
+_METRIC_RES = [(name, re.compile(rf"^(?:{pat})$", re.I)) for name, pat in METRIC_KEYWORDS]
+_METRIC_SEARCH = [(name, re.compile(rf"\b(?:{pat})\b", re.I)) for name, pat in METRIC_KEYWORDS]
+_LOWER_IS_BETTER = {"PPL", "MAE", "RMSE", "MSE", "Error"}
+
+_DATASET_HEADER_RE = re.compile(r"^(datasets?|data|benchmarks?|tasks?)$", re.I)
+_CAPTION_DATASET_RE = re.compile(r"\bon (?:the )?([A-Z][\w\-.]*\d*[\w\-]*)")
+_OURS_RE = re.compile(r"\b(ours|our (?:method|model|approach|system)|proposed)\b", re.I)
+_NUMERIC_TOKEN_RE = re.compile(r"^[±+\-−]?\d[\d,]*(\.\d+)?%?$")
+# "92.1 ± 0.3", "92.1±0.3", "92.1 (0.3)"
+_VALUE_RE = re.compile(r"^\s*([+\-−]?\d+(?:\.\d+)?\s*%?)\s*(?:(?:±|\+/-|\+-)\s*\d+(?:\.\d+)?|\(\s*\d+(?:\.\d+)?\s*\))?\s*[*†‡]*\s*$")
+
+# Confidence attached to table candidates (below a typical LLM self-report,
+# since header/caption matching is heuristic)
+TABLE_CONFIDENCE = 0.6
+# Candidates listed in the results head's context (about 15 tokens each)
+TABLE_HINT_ROWS = 25
+
+
+def split_header(text: str) -> Tuple[Optional[str], str]:
+    """
+    Split a column header into (metric, rest): "CRT Acc" -> ("Accuracy", "CRT").
+    The whole header is tried first, then each word; parenthesized notes and
+    symbol-only words are dropped from the rest.
+    """
+    t = re.sub(r"\s*\(.*?\)\s*|[↑↓%]", " ", (text or "")).strip()
+    words = t.split()
+    for candidate in [t] + words:
+        for name, rx in _METRIC_RES:
+            if rx.match(candidate):
+                rest = [] if candidate == t else [w for w in words if w != candidate]
+                return name, " ".join(w for w in rest if any(ch.isalnum() for ch in w))
+    return None, " ".join(w for w in words if any(ch.isalnum() for ch in w))
+
+
+def metric_from_caption(caption: str) -> Optional[str]:
+    for name, rx in _METRIC_SEARCH:
+        if rx.search(caption or ""):
+            return name
+    return None
+
+
+def dataset_from_caption(caption: str) -> Optional[str]:
+    """
+    Dataset named as "on <Name>" in a caption. Names that look like dataset
+    identifiers (digits, hyphens, inner capitals: "CIFAR-10", "ImageNet")
+    win over plain words ("on the Transformer architecture").
+    """
+    names = [m.group(1).rstrip(".,") for m in _CAPTION_DATASET_RE.finditer(caption or "")]
+    for name in names:
+        if re.search(r"\d|-|[a-z][A-Z]|^[A-Z]{2,}", name):
+            return name
+    return names[0] if names else None
+
+
+def parse_cell_value(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """Parse "92.1", "92.1%", "92.1 ± 0.3" or "92.1*"; anything else is (None, None)."""
+    m = _VALUE_RE.match((text or "").replace("−", "-"))
+    if not m:
+        return None, None
+    return parse_number_string(m.group(1))
+
+
+def _cell(text) -> str:
+    return (text or "").strip()
+
+
+def _expand_rows(rows: List[List[Optional[str]]]) -> List[List[str]]:
+    """Split multi-line cells into separate rows (cells of one row stay aligned by line index)."""
+    out = []
+    for row in rows:
+        split = [_cell(c).split("\n") for c in row]
+        height = max((len(lines) for lines in split), default=0)
+        if height <= 1:
+            out.append([_cell(c) for c in row])
+            continue
+        for i in range(height):
+            out.append([lines[i].strip() if len(lines) == height else (_cell(lines[0]) if i == 0 else "")
+                        for lines in split])
+    return out
+
+
+def _header_rows(grid: List[List[str]]) -> int:
+    """Leading rows without any numeric value are headers."""
+    n = 0
+    for row in grid:
+        if any(parse_cell_value(c)[0] is not None or _numeric_tokens(c) for c in row[1:]):
+            break
+        n += 1
+    return n
+
+
+def _numeric_tokens(cell: str) -> Optional[List[str]]:
+    tokens = cell.split()
+    if tokens and all(_NUMERIC_TOKEN_RE.match(t) for t in tokens):
+        return tokens
+    return None
+
+
+def _expand_columns(grid: List[List[str]], n_header: int) -> List[List[str]]:
+    """
+    Split a merged column ("PPL BLEU params" over "4.92 25.8 65") when one
+    header row has exactly as many words as the widest body cell and every
+    body cell is numeric tokens. Short cells are left-aligned, which is how
+    omitted trailing values are usually typeset.
+    """
+    n_cols = max(len(r) for r in grid)
+    grid = [r + [""] * (n_cols - len(r)) for r in grid]
+    new_rows: List[List[str]] = [[] for _ in grid]
+    for c in range(n_cols):
+        body = [r[c] for r in grid[n_header:] if r[c]]
+        token_lists = [_numeric_tokens(cell) for cell in body]
+        k = max((len(t) for t in token_lists if t), default=0)
+        header_row = next((i for i in range(n_header) if len(grid[i][c].split()) == k), None)
+        if k < 2 or header_row is None or not all(token_lists):
+            for i, r in enumerate(grid):
+                new_rows[i].append(r[c])
+            continue
+        for i, r in enumerate(grid):
+            words = r[c].split()
+            if i >= n_header or len(words) == k:
+                new_rows[i].extend(words + [""] * (k - len(words)))
+            else:
+                # a spanning group label ("CRT" over "Acc MCC F1") applies to every sub-column
+                new_rows[i].extend([r[c]] * k)
+    return new_rows
+
+
+def _column_headers(grid: List[List[str]], n_header: int) -> List[str]:
+    # join stacked header rows per column
+    headers = []
+    for c in range(len(grid[0])):
+        parts = [grid[r][c] for r in range(n_header) if grid[r][c]]
+        headers.append(" ".join(parts))
+    return headers
+
+
+def records_from_grid(rows: List[List[Optional[str]]], caption: str = "") -> List[Dict[str, Any]]:
+    """Turn extracted table rows into result candidates (without page/table provenance)."""
+    grid = _expand_rows(rows)
+    if len(grid) < 2 or not any(grid[0]):
+        return []
+    n_header = _header_rows(grid)
+    if n_header == 0 or n_header >= len(grid):
+        return []
+    grid = _expand_columns(grid, n_header)
+    headers = _column_headers(grid, n_header)
+    caption_metric = metric_from_caption(caption)
+    caption_dataset = dataset_from_caption(caption)
+    rows_are_datasets = bool(_DATASET_HEADER_RE.match(headers[0] or ""))
+    columns = [split_header(h) for h in headers]
+    # once any column names a metric, the other columns (params, time) are not results
+    has_metric_columns = any(metric for metric, _ in columns[1:])
+
+    records = []
+    for row in grid[n_header:]:
+        label = row[0]
+        if not label:
+            continue
+        for c in range(1, len(row)):
+            value, unit = parse_cell_value(row[c])
+            if value is None:
+                continue
+            header = headers[c] if c < len(headers) else ""
+            metric, rest = columns[c] if c < len(columns) else (None, "")
+            if metric:
+                dataset = rest or (label if rows_are_datasets else caption_dataset)
+            elif has_metric_columns:
+                continue
+            else:
+                metric = caption_metric
+                dataset = rest or None
+            if not metric or not dataset:
+                continue
+            if "%" in header and unit is None:
+                unit = "%"
+            records.append({
+                "dataset": dataset,
+                "metric": metric,
+                "value": value,
+                "unit": unit,
+                "higher_is_better": metric not in _LOWER_IS_BETTER,
+                "ours_is": label if not rows_are_datasets and _OURS_RE.search(label) else None,
+                "confidence": TABLE_CONFIDENCE,
+                "row_label": label,
+            })
+    return records
+
+
+def _captions(text: str, max_chars: int = 400) -> List[Tuple[str, str]]:
+    """(label, caption) pairs; a caption runs to the next blank line, up to max_chars."""
+    text = text or ""
+    out = []
+    for m in CAPTION_RE.finditer(text):
+        end = text.find("\n\n", m.start(2))
+        caption = text[m.start(2):end if end != -1 else len(text)][:max_chars]
+        out.append((m.group(1), " ".join(caption.split())))
+    return out
+
+
+def extract_table_results(path: str, page_numbers: Optional[Iterable[int]] = None,
+                          page_texts: Optional[Dict[int, str]] = None) -> List[Dict[str, Any]]:
+    """
+    Run the table finder on captioned pages of `path` and return result
+    candidates in page order. `page_texts` (page_no -> text) lets callers
+    reuse already-extracted text for the caption scan.
+    """
+    doc = fitz.open(path)
+    try:
+        numbers = list(page_numbers) if page_numbers is not None else range(1, len(doc) + 1)
+        records = []
+        for page_no in numbers:
+            page = doc.load_page(page_no - 1)
+            text = page_texts.get(page_no) if page_texts else None
+            if text is None:
+                text = page.get_text("text")
+            captions = _captions(text)
+            if not captions:
+                continue
+            try:
+                tables = page.find_tables().tables
+            except Exception:
+                continue
+            for ti, table in enumerate(tables):
+                try:
+                    rows = table.extract()
+                except Exception:
+                    continue
+                # a table's caption is the nearest one on the page; with
+                # several captions, pair them with tables in order
+                label, caption = captions[min(ti, len(captions) - 1)]
+                for rec in records_from_grid(rows, caption):
+                    rec.update({"page": page_no, "table": label, "source": "table"})
+                    records.append(rec)
+        return records
+    finally:
+        doc.close()
+
+
+def _valid_candidates(candidates: Iterable[Dict[str, Any]]):
+    # (candidate, ResultRecord dict) for candidates that pass ResultRecord,
+    # de-duplicated on (dataset, metric, value, row)
+    seen = set()
+    for cand in candidates or []:
+        try:
+            rec = ResultRecord(**cand).dict()
+        except Exception:
+            continue
+        key = (rec["dataset"], rec["metric"], rec["value"], cand.get("row_label"))
+        if key in seen:
+            continue
+        seen.add(key)
+        yield cand, rec
+
+
+def validated_results(candidates: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Candidates that pass ResultRecord, as plain ResultRecord dicts (provenance
+    fields dropped). Used in place of the results head only when callers opt
+    in (table_results=True); see table_hints() for the default use.
+    """
+    return [rec for _, rec in _valid_candidates(candidates)]
+
+
+def table_hints(candidates: Iterable[Dict[str, Any]], max_rows: int = TABLE_HINT_ROWS) -> str:
+    """
+    Valid candidates as a compact listing to append to the results head's
+    context, so the head can check its numbers against the parsed tables.
+    Empty when there is nothing to list.
+    """
+    lines = []
+    for cand, rec in _valid_candidates(candidates):
+        if len(lines) >= max_rows:
+            break
+        where = f"Table {cand['table']}" if cand.get("table") else "Table"
+        if cand.get("page"):
+            where += f" (p. {cand['page']})"
+        unit = rec["unit"] or ""
+        lines.append(f"- {where}, row \"{cand.get('row_label') or '?'}\": "
+                     f"{rec['metric']} on {rec['dataset']} = {rec['value']:g}{unit}")
+    if not lines:
+        return ""
+    return ("TABLE CANDIDATES (parsed automatically from the PDF tables; they may mislabel "
+            "datasets or rows, so keep only values the context supports):\n" + "\n".join(lines))
@@ -0,0 +1,478 @@
+# orchestrator/cache.py
+"""
+Head-result caches used by Pipeline.
+
+A backend maps a cache key to a head's JSON payload. Every entry is tagged
+with the head name, model id and prompt template version it came from, so
+one store can hold several models and be cleared selectively
+(scripts/invalidate_cache.py) instead of wiped.
+
+  - JsonFileCache: one JSON file per key in a directory (the original layout).
+  - SQLiteCache: a single SQLite file in WAL mode with size (LRU) and age
+    (TTL) eviction. Each thread/process opens its own connection and writers
+    wait on SQLite's lock, so worker processes can share one file.
+  - MemoryCache: in-process LRU bounded by entries and approximate bytes,
+    holding already-parsed head objects.
+  - TieredCache: a MemoryCache in front of a disk backend, for long-running
+    processes (the app, repeated evaluation passes).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_HEAD_CACHE_DIR = Path(".cache")
+DEFAULT_SQLITE_NAME = "heads.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheBackend:
+    """Interface for head-result caches."""
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached payload for `key`, or None."""
+        raise NotImplementedError
+
+    def put(self, key: str, payload: Any, head: str = "", model: str = "", template: str = "",
+            value: Any = None) -> None:
+        """
+        Store `payload` (JSON-serializable). `value` is the parsed form (e.g.
+        the head's pydantic model); in-memory tiers keep it and return it from
+        get(), disk backends ignore it.
+        """
+        raise NotImplementedError
+
+    def clear(self, head: Optional[str] = None, model: Optional[str] = None,
+              template: Optional[str] = None) -> int:
+        """Drop entries matching every given tag (all entries when none given); returns the count."""
+        raise NotImplementedError
+
+    def namespaces(self) -> List[Dict[str, Any]]:
+        """Entry counts per (head, model, template)."""
+        raise NotImplementedError
+
+    def acquire_lease(self, key: str, seconds: float) -> bool:
+        """
+        Claim the right to compute `key` for `seconds` across processes.
+        Backends without shared state always grant it.
+        """
+        return True
+
+    def release_lease(self, key: str) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+def _dumps(payload: Any) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+class JsonFileCache(CacheBackend):
+    """One indented JSON file per key: {"_cached_at", "head", "model", "template", "payload"}."""
+
+    def __init__(self, cache_dir: str = str(DEFAULT_HEAD_CACHE_DIR)):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def _path_for_key(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            text = self._path_for_key(key).read_text(encoding="utf-8")
+            payload = json.loads(text)["payload"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_read += len(text)
+        return payload
+
+    def put(self, key: str, payload: Any, head: str = "", model: str = "", template: str = "",
+            value: Any = None) -> None:
+        text = json.dumps(
+            {
+                "_cached_at": datetime.now(timezone.utc).isoformat(),
+                "head": head,
+                "model": model,
+                "template": template,
+                "payload": payload,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+        p = self._path_for_key(key)
+        tmp = p.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, p)
+        self.bytes_written += len(text)
+
+    def _tagged_entries(self):
+        for p in self.cache_dir.glob("*.json"):
+            try:
+                entry = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            # files written before tagging have empty tags
+            yield p, {tag: entry.get(tag) or "" for tag in ("head", "model", "template")}
+
+    def clear(self, head: Optional[str] = None, model: Optional[str] = None,
+              template: Optional[str] = None) -> int:
+        wanted = {k: v for k, v in (("head", head), ("model", model), ("template", template)) if v is not None}
+        if wanted:
+            paths = [p for p, tags in self._tagged_entries() if all(tags[k] == v for k, v in wanted.items())]
+        else:
+            paths = list(self.cache_dir.glob("*.json"))
+        removed = 0
+        for p in paths:
+            try:
+                p.unlink()
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def namespaces(self) -> List[Dict[str, Any]]:
+        counts: Dict[Tuple[str, str, str], int] = {}
+        for _, tags in self._tagged_entries():
+            ns = (tags["head"], tags["model"], tags["template"])
+            counts[ns] = counts.get(ns, 0) + 1
+        return [{"head": h, "model": m, "template": t, "entries": n} for (h, m, t), n in sorted(counts.items())]
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = []
+        for p in self.cache_dir.glob("*.json"):
+            try:
+                sizes.append(p.stat().st_size)
+            except OSError:
+                continue
+        return {
+            "backend": "json",
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "entries": len(sizes),
+            "bytes": sum(sizes),
+        }
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    head TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT '',
+    template TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_namespace ON entries (head, model);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+_TAGS = ("head", "model", "template")
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Head results in one SQLite file. Entries older than `ttl_seconds` (if set)
+    are misses and are purged on write; once the stored payloads exceed
+    `max_bytes` the least recently read entries are evicted.
+    """
+
+    def __init__(self, path: str = str(DEFAULT_HEAD_CACHE_DIR / DEFAULT_SQLITE_NAME),
+                 max_bytes: Optional[int] = DEFAULT_MAX_BYTES, ttl_seconds: Optional[float] = None,
+                 timeout: float = 30.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+            if "template" not in columns:
+                # databases created before entries were tagged with a template version
+                conn.execute("ALTER TABLE entries ADD COLUMN template TEXT NOT NULL DEFAULT ''")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not cross threads or forks: one per (thread, pid)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT payload, created FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or self._expired(row[1], now):
+            self.misses += 1
+            return None
+        conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        self.bytes_read += len(row[0])
+        return json.loads(row[0])
+
+    def put(self, key: str, payload: Any, head: str = "", model: str = "", template: str = "",
+            value: Any = None) -> None:
+        text = _dumps(payload)
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, head, model, template, payload, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, head, model, template, text, size, now, now),
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.bytes_written += size
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            cur = conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl_seconds,))
+            self.evictions += max(cur.rowcount, 0)
+        if self.max_bytes is None:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self, head: Optional[str] = None, model: Optional[str] = None,
+              template: Optional[str] = None) -> int:
+        where, params = [], []
+        for tag, value in zip(_TAGS, (head, model, template)):
+            if value is not None:
+                where.append(f"{tag} = ?")
+                params.append(value)
+        sql = "DELETE FROM entries" + (" WHERE " + " AND ".join(where) if where else "")
+        return max(self._connect().execute(sql, params).rowcount, 0)
+
+    @property
+    def _lease_owner(self) -> str:
+        return f"{os.getpid()}:{id(self)}"
+
+    def acquire_lease(self, key: str, seconds: float) -> bool:
+        """Lease row for `key`; an expired lease (crashed owner) is taken over."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires < ?", (key, now))
+            cur = conn.execute("INSERT OR IGNORE INTO leases (key, owner, expires) VALUES (?, ?, ?)",
+                               (key, self._lease_owner, now + seconds))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount == 1
+
+    def release_lease(self, key: str) -> None:
+        self._connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self._lease_owner))
+
+    def namespaces(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT head, model, template, COUNT(*) FROM entries GROUP BY head, model, template "
+            "ORDER BY head, model, template").fetchall()
+        return [{"head": h, "model": m, "template": t, "entries": n} for h, m, t, n in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        entries, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "backend": "sqlite",
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class MemoryCache(CacheBackend):
+    """
+    Thread-safe in-process LRU. Sizes are approximated by the payload's JSON
+    length, so `max_bytes` bounds what the entries would take on disk rather
+    than exact interpreter memory.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int, Tuple[str, str, str]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, payload: Any, head: str = "", model: str = "", template: str = "",
+            value: Any = None, size: Optional[int] = None) -> None:
+        if size is None:
+            size = len(_dumps(payload))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (payload if value is None else value, size, (head, model, template))
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self, head: Optional[str] = None, model: Optional[str] = None,
+              template: Optional[str] = None) -> int:
+        wanted = (head, model, template)
+        with self._lock:
+            doomed = [k for k, (_, _, tags) in self._entries.items()
+                      if all(w is None or w == t for w, t in zip(wanted, tags))]
+            for k in doomed:
+                self._bytes -= self._entries.pop(k)[1]
+            return len(doomed)
+
+    def namespaces(self) -> List[Dict[str, Any]]:
+        counts: Dict[Tuple[str, str, str], int] = {}
+        with self._lock:
+            for _, _, tags in self._entries.values():
+                counts[tags] = counts.get(tags, 0) + 1
+        return [{"head": h, "model": m, "template": t, "entries": n} for (h, m, t), n in sorted(counts.items())]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+class TieredCache(CacheBackend):
+    """
+    Memory tier in front of a disk backend. Hits in memory never touch the
+    disk or parse JSON; disk hits are promoted into memory; writes go to both.
+    """
+
+    def __init__(self, disk: CacheBackend, memory: Optional[MemoryCache] = None):
+        self.disk = disk
+        self.memory = memory if memory is not None else MemoryCache()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        payload = self.disk.get(key)
+        if payload is not None:
+            # tags are unknown here; a later tagged clear() still reaches the disk copy
+            self.memory.put(key, payload)
+        return payload
+
+    def put(self, key: str, payload: Any, head: str = "", model: str = "", template: str = "",
+            value: Any = None) -> None:
+        self.disk.put(key, payload, head=head, model=model, template=template)
+        self.memory.put(key, payload, head=head, model=model, template=template, value=value)
+
+    def clear(self, head: Optional[str] = None, model: Optional[str] = None,
+              template: Optional[str] = None) -> int:
+        # entries promoted from disk carry no tags, so any clear empties the memory tier
+        self.memory.clear()
+        return self.disk.clear(head=head, model=model, template=template)
+
+    def namespaces(self) -> List[Dict[str, Any]]:
+        return self.disk.namespaces()
+
+    def acquire_lease(self, key: str, seconds: float) -> bool:
+        return self.disk.acquire_lease(key, seconds)
+
+    def release_lease(self, key: str) -> None:
+        self.disk.release_lease(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.disk.stats(), "memory": self.memory.stats()}
+
+
+def open_head_cache(backend: str = "sqlite", location: Optional[str] = None, **kwargs: Any) -> CacheBackend:
+    """
+    Build a head cache by name: "sqlite" (`location` is the database file,
+    default .cache/heads.sqlite) or "json" (`location` is the directory).
+    """
+    if backend == "sqlite":
+        return SQLiteCache(location or str(DEFAULT_HEAD_CACHE_DIR / DEFAULT_SQLITE_NAME), **kwargs)
+    if backend == "json":
+        return JsonFileCache(location or str(DEFAULT_HEAD_CACHE_DIR))
+    raise ValueError(f"unknown head cache backend: {backend}")
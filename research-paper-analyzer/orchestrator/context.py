@@ -0,0 +1,217 @@
+# orchestrator/context.py
+"""
+Token-budgeted context construction for the extraction heads.
+
+Every page block is scored per head from the section it sits in (via the
+section index built at ingestion) and from head-specific keyword hits. The
+highest-scoring blocks are packed greedily into the head's token budget and
+then put back in document order, so a prompt never exceeds its budget and the
+budget is spent on the most relevant text rather than on whatever comes first.
+
+Tokens are counted with tiktoken (cl100k_base) when it is installed and
+falls back to a word-piece estimate otherwise.
+"""
+import math
+import re
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import tiktoken
+    _HAS_TIKTOKEN = True
+except Exception:
+    _HAS_TIKTOKEN = False
+
+HEADS = ("metadata", "methods", "results", "limitations", "summary")
+
+# Context tokens per head. With the prompt templates (~150-300 tokens) each
+# prompt stays around the ~750 tokens that the old 3,000-character cut allowed.
+DEFAULT_HEAD_BUDGETS: Dict[str, int] = {
+    "metadata": 250,
+    "methods": 450,
+    "results": 450,
+    "limitations": 400,
+    "summary": 450,
+}
+
+# Section prior per head; None stands for front matter (text before the first
+# section heading: title, authors, affiliations)
+SECTION_WEIGHTS: Dict[str, Dict[Optional[str], float]] = {
+    "metadata": {None: 4.0, "Abstract": 1.0},
+    "methods": {"Method": 4.0, "Background": 1.5, "Introduction": 1.0, "Other": 1.5, "Experiments": 0.5},
+    "results": {"Results": 4.0, "Experiments": 3.5, "Abstract": 1.0, "Conclusion": 1.0, "Other": 0.5},
+    "limitations": {"Limitations": 5.0, "Discussion": 3.0, "Conclusion": 2.5, "Results": 0.5},
+    "summary": {"Abstract": 5.0, "Conclusion": 3.0, "Introduction": 1.5},
+}
+# Never worth sending to any head
+EXCLUDED_SECTIONS = {"References", "Acknowledgements"}
+
+HEAD_KEYWORDS: Dict[str, str] = {
+    "metadata": r"\b(universit\w*|institute|department|laborator\w*|arxiv|proceedings|conference|"
+                r"journal|preprint|(19|20)\d\d)\b|@",
+    "methods": r"\b(we (propose|introduce|present|design)|architecture|framework|module|layer|encoder|"
+               r"decoder|algorithm|loss|objective|train\w*|attention|network|pipeline)\b",
+    "results": r"\b(table|accuracy|f1|bleu|auc|precision|recall|outperform\w*|improv\w*|baseline|"
+               r"state-of-the-art|sota|speed-?up|dataset|benchmark)\b|\d+\.\d+|\d+(\.\d+)?\s?%",
+    "limitations": r"\b(limitation\w*|future work|however|fail\w*|cannot|does not|restrict\w*|"
+                   r"drawback\w*|ethic\w*|societal|negative impact)\b",
+    "summary": r"\b(we (propose|introduce|present|show|demonstrate)|this paper|contribution\w*|"
+               r"outperform\w*|achiev\w*|results show)\b",
+}
+_KEYWORD_RES = {head: re.compile(pat, re.I) for head, pat in HEAD_KEYWORDS.items()}
+
+# Blocks shorter than this are demoted
+SHORT_BLOCK_CHARS = 40
+
+JOINER = "\n\n"
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_encoder = None
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None and _HAS_TIKTOKEN:
+        try:
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # encoding files not downloadable (offline); use the estimate
+            _encoder = False
+    return _encoder or None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, else a word-piece estimate."""
+    if not text:
+        return 0
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # BPE vocabularies keep short words whole and split long ones every ~4 chars
+    return sum(1 if len(p) <= 4 else math.ceil(len(p) / 4) for p in _PIECE_RE.findall(text))
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    if budget <= 0:
+        return ""
+    enc = _get_encoder()
+    if enc is not None:
+        ids = enc.encode(text, disallowed_special=())
+        return text if len(ids) <= budget else enc.decode(ids[:budget])
+    used = 0
+    for m in _PIECE_RE.finditer(text):
+        p = m.group(0)
+        used += 1 if len(p) <= 4 else math.ceil(len(p) / 4)
+        if used > budget:
+            return text[:m.start()].rstrip()
+    return text
+
+
+def _section_lookup(sections: List[Dict[str, Any]]):
+    """Return a function (page_no, block_index) -> section name or None (front matter)."""
+    starts = sorted(((s["page_start"], s["block_start"]), s["name"]) for s in sections or [])
+    positions = [pos for pos, _ in starts]
+
+    def lookup(page_no: int, bi: int) -> Optional[str]:
+        i = bisect_right(positions, (page_no, bi))
+        return starts[i - 1][1] if i else None
+
+    return lookup
+
+
+def _iter_blocks(pages: Iterable[Dict[str, Any]]):
+    for p in pages:
+        blocks = p.get("blocks") or []
+        if blocks:
+            for bi, b in enumerate(blocks):
+                text = b.get("text", "")
+                if text:
+                    yield p.get("page_no"), bi, text
+        elif p.get("clean_text"):
+            # pages without blocks contribute their text as one unit
+            yield p.get("page_no"), 0, p.get("clean_text")
+
+
+def rank_blocks(head: str, pages: Iterable[Dict[str, Any]],
+                sections: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[float, int, str]]:
+    """
+    Score every block for `head`. Returns (score, document position, text)
+    sorted best first; blocks in excluded sections are dropped.
+    """
+    weights = SECTION_WEIGHTS.get(head, {})
+    keyword_re = _KEYWORD_RES.get(head)
+    section_of = _section_lookup(sections or [])
+    ranked = []
+    for pos, (page_no, bi, text) in enumerate(_iter_blocks(pages)):
+        name = section_of(page_no, bi)
+        if name in EXCLUDED_SECTIONS:
+            continue
+        score = weights.get(name, 0.0)
+        if keyword_re is not None:
+            hits = len(keyword_re.findall(text))
+            # density, so long blocks do not win on length alone
+            score += min(2.0, hits / math.sqrt(max(1, len(text) / 80)))
+        if head == "metadata" and page_no == 1:
+            score += 1.0
+        if len(text) < SHORT_BLOCK_CHARS:
+            # headings, table cells and figure labels are cheap but say little
+            score -= 1.0
+        # earlier text breaks ties
+        score -= pos * 1e-4
+        ranked.append((score, pos, text))
+    ranked.sort(key=lambda r: (-r[0], r[1]))
+    return ranked
+
+
+def build_context(head: str, pages: Iterable[Dict[str, Any]],
+                  sections: Optional[List[Dict[str, Any]]] = None, budget: Optional[int] = None) -> str:
+    """
+    Pack the best blocks for `head` into `budget` tokens, in document order.
+    Blocks with no positive score are left out even if budget remains.
+    """
+    budget = DEFAULT_HEAD_BUDGETS.get(head, 400) if budget is None else budget
+    joiner_cost = count_tokens(JOINER)
+    ranked = rank_blocks(head, pages, sections)
+    relevant = [r for r in ranked if r[0] > 0]
+    if not relevant:
+        # no section or keyword signal at all: fall back to reading order
+        relevant = sorted(ranked, key=lambda r: r[1])
+    chosen = []
+    used = 0
+    for score, pos, text in relevant:
+        cost = count_tokens(text) + (joiner_cost if chosen else 0)
+        if used + cost > budget:
+            if not chosen:
+                # a single oversized block: keep its head rather than nothing
+                chosen.append((pos, truncate_to_tokens(text, budget)))
+                break
+            continue
+        chosen.append((pos, text))
+        used += cost
+        if used >= budget:
+            break
+    chosen.sort()
+    return JOINER.join(text for _, text in chosen)
+
+
+def build_contexts(pages: Iterable[Dict[str, Any]], sections: Optional[List[Dict[str, Any]]] = None,
+                   budgets: Optional[Dict[str, int]] = None, heads: Iterable[str] = HEADS) -> Dict[str, str]:
+    """Contexts for each head; `pages` must be re-iterable (list, compact pages, JsonlPages)."""
+    budgets = {**DEFAULT_HEAD_BUDGETS, **(budgets or {})}
+    return {head: build_context(head, pages, sections, budgets.get(head)) for head in heads}
+
+
+def fuse_contexts(contexts: Dict[str, str], heads: Iterable[str] = HEADS) -> str:
+    """
+    One context for the fused (all-heads) prompt: the per-head contexts'
+    blocks in head order, each block kept once (metadata and summary contexts
+    usually share the abstract and title page).
+    """
+    seen = set()
+    blocks = []
+    for head in heads:
+        for block in (contexts.get(head) or "").split(JOINER):
+            key = block.strip()
+            if key and key not in seen:
+                seen.add(key)
+                blocks.append(block)
+    return JOINER.join(blocks)
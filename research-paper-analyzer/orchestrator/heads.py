@@ -1,12 +1,20 @@
 # orchestrator/heads.py
+import asyncio
 import json
 import os
-from pathlib import Path
-from typing import Any, Dict, Optional
+import threading
+import weakref
+from typing import Any, Dict, Iterable, Optional, Tuple
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
+from orchestrator.context import count_tokens
+from orchestrator.metrics import record_call, record_usage
+from orchestrator.prompts import PROMPTS_DIR, PromptRegistry, shared_prompt_registry
+from orchestrator.ratelimit import get_limiter
+from orchestrator.streaming import JSONStreamValidator, Shape, StreamDivergedError
 from schema.head_models import (
     LimitationsOutput,
     MetadataOutput,
@@ -17,19 +25,162 @@ from schema.head_models import (
 
 load_dotenv()
 
-PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
-
 
 class LLMGenerationError(RuntimeError):
     """Raised when an LLM backend fails to return usable content."""
 
 
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# One connection pool per process (sync) and per event loop (async), shared
+# by every head, paper and OpenRouterLLM instance so TCP/TLS sessions are reused
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+# Retries belong to orchestrator.ratelimit (per call, shared backoff); the
+# OpenAI client's own retries would multiply them behind the limiter's back
+OPENAI_CLIENT_RETRIES = 0
+
+_pool_lock = threading.Lock()
+_sync_http_client: Optional[httpx.Client] = None
+_sync_openai_clients: Dict[Tuple[str, str], OpenAI] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Any, Any]]" = weakref.WeakKeyDictionary()
+
+
+def shared_openai_client(api_key: str, base_url: str = OPENROUTER_BASE_URL) -> OpenAI:
+    """Process-wide OpenAI client for (api_key, base_url) on the shared keep-alive pool."""
+    global _sync_http_client
+    with _pool_lock:
+        if _sync_http_client is None:
+            _sync_http_client = httpx.Client(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)
+        key = (api_key, base_url)
+        if key not in _sync_openai_clients:
+            _sync_openai_clients[key] = OpenAI(base_url=base_url, api_key=api_key, http_client=_sync_http_client,
+                                               max_retries=OPENAI_CLIENT_RETRIES)
+        return _sync_openai_clients[key]
+
+
+def shared_async_openai_client(api_key: str, base_url: str = OPENROUTER_BASE_URL) -> AsyncOpenAI:
+    """
+    AsyncOpenAI client for (api_key, base_url) on the running loop's shared
+    pool. httpx async pools are bound to the loop that created them, so there
+    is one pool per event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = {"http": httpx.AsyncClient(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)}
+            _async_clients[loop] = clients
+        key = (api_key, base_url)
+        if key not in clients:
+            clients[key] = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=clients["http"],
+                                       max_retries=OPENAI_CLIENT_RETRIES)
+        return clients[key]
+
+
+async def aclose_shared_clients() -> None:
+    """Close the running loop's async pool (call before closing a short-lived loop)."""
+    loop = asyncio.get_running_loop()
+    with _pool_lock:
+        clients = _async_clients.pop(loop, None)
+    if clients:
+        await clients["http"].aclose()
+
+
+SYSTEM_INSTRUCTION = (
+    "You are a strict JSON generator. Respond with JSON only. "
+    "Do not include code fences, prose, or explanations."
+)
+
+# Strip known sentinel tokens emitted by some models (DeepSeek)
+SENTINELS = {
+    "<|begin_of_sentence|>",
+    "<|end_of_sentence|>",
+    "<|end_of_text|>",
+    "<|fim_suffix|>",
+    "<|fim_middle|>",
+    "<|fim_prefix|>",
+    "<\uff5cbegin\u2581of\u2581sentence\uff5c>",
+    "<\uff5cend\u2581of\u2581sentence\uff5c>",
+    "<\uff5cend\u2581of\u2581text\uff5c>",
+}
+
+
+def clean_completion_text(text: str) -> str:
+    """Strip code fences and sentinel tokens; cut a JSON object out of surrounding prose."""
+    cleaned_text = (text or "").strip()
+    if cleaned_text.lower().startswith("```json"):
+        cleaned_text = cleaned_text[7:]
+    elif cleaned_text.startswith("```"):
+        cleaned_text = cleaned_text[3:]
+
+    if cleaned_text.endswith("```"):
+        cleaned_text = cleaned_text[:-3]
+
+    for token in SENTINELS:
+        if token in cleaned_text:
+            cleaned_text = cleaned_text.replace(token, " ")
+
+    cleaned_text = cleaned_text.strip()
+
+    # Best-effort: if provider ignored JSON instruction, try to extract a JSON block
+    if cleaned_text and not cleaned_text.lstrip().startswith(('{', '[')):
+        txt = cleaned_text
+        start = txt.find('{')
+        end = txt.rfind('}')
+        if start != -1 and end != -1 and end > start:
+            candidate = txt[start:end+1]
+            try:
+                # Validate it's JSON; if so, return only that chunk
+                json.loads(candidate)
+                cleaned_text = candidate
+            except Exception:
+                pass
+
+    return cleaned_text.strip()
+
+
+def message_text(message) -> str:
+    """Content of a chat message, falling back to reasoning fields some models fill instead."""
+    text = (message.content or "").strip()
+    if not text:
+        reasoning = getattr(message, "reasoning", None)
+        if reasoning:
+            text = reasoning.strip()
+    if not text:
+        reasoning_details = getattr(message, "reasoning_details", None) or []
+        for detail in reasoning_details:
+            detail_text = detail.get("text")
+            if detail_text and detail_text.strip():
+                text = detail_text.strip()
+                break
+    return text
+
+
+def delta_text(chunk) -> str:
+    """Content of one streamed chat chunk ("" for role-only or empty chunks)."""
+    choices = getattr(chunk, "choices", None) or []
+    delta = getattr(choices[0], "delta", None) if choices else None
+    return (getattr(delta, "content", None) or "") if delta is not None else ""
+
+
 class OpenRouterLLM:
     """Wrapper for the OpenRouter API (supports Grok, DeepSeek, etc.)."""
 
     DEFAULT_MODEL = "deepseek/deepseek-chat-v3.1:free"
+    # Completion budget when the caller does not ask for one (a single head's JSON)
+    DEFAULT_MAX_TOKENS = 256
+    # Hard prompt cut for callers that do not budget their contexts
+    DEFAULT_MAX_PROMPT_CHARS = 3000
 
-    def __init__(self, api_key: Optional[str] = None, model_id: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_id: Optional[str] = None,
+        max_prompt_chars: Optional[int] = DEFAULT_MAX_PROMPT_CHARS,
+        stream: Optional[bool] = None,
+        base_url: Optional[str] = None,
+    ):
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
         if not self.api_key:
             raise ValueError(
@@ -37,136 +188,101 @@ class OpenRouterLLM:
             )
 
         self.model_id = model_id or os.getenv("OPENROUTER_MODEL") or self.DEFAULT_MODEL
-        self.client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=self.api_key)
+        # OPENROUTER_BASE_URL points the client at any OpenAI-compatible server
+        # (e.g. scripts/local_llm_server.py)
+        self.base_url = base_url or os.getenv("OPENROUTER_BASE_URL") or OPENROUTER_BASE_URL
+        self.client = shared_openai_client(self.api_key, self.base_url)
+        # Process-wide RPM/TPM/in-flight governor for this model, shared by every instance
+        self.limiter = get_limiter(self.model_id)
+        # None disables the cut (contexts built by orchestrator.context already fit a token budget)
+        self.max_prompt_chars = max_prompt_chars
+        # Stream completions that come with a schema and drop them once they
+        # diverge from it (OPENROUTER_STREAM=1 turns this on by default)
+        if stream is None:
+            stream = os.getenv("OPENROUTER_STREAM", "").lower() in ("1", "true", "yes")
+        self.stream = stream
+        self.stream_stats = {"streamed": 0, "diverged": 0}
+        self.last_divergence: Optional[str] = None
 
-    def generate(
-        self,
-        prompt: str,
-        temperature: float = 0.0,
-        max_tokens: int = 1024,
-    ) -> str:
-        """Generate content using the configured OpenRouter model."""
-        prompt = prompt[:3000]
-        max_tokens = min(max_tokens, 256)
-
-        # Some providers (e.g., Google AI Studio via OpenRouter) do not allow
-        # developer/system instructions unless explicitly enabled. Gemma 3N free
-        # tier returns: "Developer instruction is not enabled" (400) if we send
-        # a system role. To be safe, we use a user-only message flow for Google models
-        # and otherwise fall back to a retry without system on specific 400s.
-        is_google_model = self.model_id.startswith("google/") or ":google" in self.model_id
+    def cache_params(self, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        # request settings that change completions, folded into head cache keys;
+        # max_tokens is what the caller passes to generate (None: the default)
+        params = {"max_prompt_chars": self.max_prompt_chars, "max_tokens": max_tokens or self.DEFAULT_MAX_TOKENS}
+        if self.base_url != OPENROUTER_BASE_URL:
+            # another server answers differently; keep its heads apart from OpenRouter's
+            params["base_url"] = self.base_url
+        return params
 
-        def _create(messages, use_json_mode: bool = True):
-            kwargs = {
-                "model": self.model_id,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-            }
-            # Avoid JSON mode for Google AI Studio models (Gemma) unless explicitly supported
-            if use_json_mode:
-                kwargs["response_format"] = {"type": "json_object"}
-            return self.client.chat.completions.create(**kwargs)
+    def _request_plan(self, prompt: str, temperature: float, max_tokens: Optional[int]):
+        """
+        Return (first request kwargs, fallback(exc) -> retry kwargs or None).
 
-        sys_instruction = (
-            "You are a strict JSON generator. Respond with JSON only. "
-            "Do not include code fences, prose, or explanations."
-        )
+        Some providers (e.g., Google AI Studio via OpenRouter) do not allow
+        developer/system instructions unless explicitly enabled. Gemma 3N free
+        tier returns: "Developer instruction is not enabled" (400) if we send
+        a system role. To be safe, we use a user-only message flow for Google models
+        and otherwise fall back to a retry without system on specific 400s.
+        """
+        if self.max_prompt_chars:
+            prompt = prompt[:self.max_prompt_chars]
+        if max_tokens is None:
+            max_tokens = self.DEFAULT_MAX_TOKENS
+        is_google_model = self.model_id.startswith("google/") or ":google" in self.model_id
 
         messages_system = [
-            {"role": "system", "content": sys_instruction},
+            {"role": "system", "content": SYSTEM_INSTRUCTION},
             {"role": "user", "content": prompt},
         ]
         messages_user_only = [
             {
                 "role": "user",
-                "content": f"{sys_instruction}\n\n{prompt}",
+                "content": f"{SYSTEM_INSTRUCTION}\n\n{prompt}",
             }
         ]
 
-        try:
-            # Prefer user-only AND no JSON mode for Google models to avoid 400s.
-            completion = _create(
-                messages_user_only if is_google_model else messages_system,
-                use_json_mode=not is_google_model,
-            )
-        except Exception as first_exc:
+        def _kwargs(messages, use_json_mode: bool = True):
+            kwargs = {
+                "model": self.model_id,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            }
+            # Avoid JSON mode for Google AI Studio models (Gemma) unless explicitly supported
+            if use_json_mode:
+                kwargs["response_format"] = {"type": "json_object"}
+            if self.base_url == OPENROUTER_BASE_URL:
+                # OpenRouter usage accounting: the usage block also carries the cost
+                kwargs["extra_body"] = {"usage": {"include": True}}
+            return kwargs
+
+        def _fallback(first_exc: Exception):
             detail1 = str(first_exc)
             # If the provider complains about developer/system instructions, retry without system.
             if "Developer instruction is not enabled" in detail1 or "developer instruction" in detail1.lower():
-                try:
-                    completion = _create(messages_user_only, use_json_mode=False)
-                except Exception:
-                    # If retry also fails, re-raise original with context below.
-                    raise
+                return _kwargs(messages_user_only, use_json_mode=False)
             # If provider rejects JSON mode, retry without response_format
-            elif "JSON mode is not enabled" in detail1 or "json mode" in detail1.lower():
-                try:
-                    # Keep the same message flavor we used above
-                    msgs = messages_user_only if is_google_model else messages_system
-                    completion = _create(msgs, use_json_mode=False)
-                except Exception:
-                    raise
-            else:
-                # For other errors, re-raise and handle below.
-                raise
+            if "JSON mode is not enabled" in detail1 or "json mode" in detail1.lower():
+                # Keep the same message flavor we used above
+                return _kwargs(messages_user_only if is_google_model else messages_system, use_json_mode=False)
+            # For other errors, re-raise
+            return None
+
+        # Prefer user-only AND no JSON mode for Google models to avoid 400s.
+        first = _kwargs(
+            messages_user_only if is_google_model else messages_system,
+            use_json_mode=not is_google_model,
+        )
+        return first, _fallback
+
+    @staticmethod
+    def _estimated_tokens(request: Dict[str, Any]) -> int:
+        # Charged against the TPM bucket before the call: prompt plus the completion cap
+        prompt_tokens = sum(count_tokens(m["content"]) for m in request["messages"])
+        return prompt_tokens + request["max_tokens"]
 
+    def _finish(self, completion) -> str:
         try:
-            message = completion.choices[0].message
-            cleaned_text = (message.content or "").strip()
-            if not cleaned_text:
-                reasoning = getattr(message, "reasoning", None)
-                if reasoning:
-                    cleaned_text = reasoning.strip()
-            if not cleaned_text:
-                reasoning_details = getattr(message, "reasoning_details", None) or []
-                for detail in reasoning_details:
-                    text = detail.get("text")
-                    if text:
-                        cleaned_text = text.strip()
-                        if cleaned_text:
-                            break
-            if cleaned_text.lower().startswith("```json"):
-                cleaned_text = cleaned_text[7:]
-            elif cleaned_text.startswith("```"):
-                cleaned_text = cleaned_text[3:]
-
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]
-
-            # Strip known sentinel tokens emitted by some models (DeepSeek)
-            SENTINELS = {
-                "<|begin_of_sentence|>",
-                "<|end_of_sentence|>",
-                "<|end_of_text|>",
-                "<|fim_suffix|>",
-                "<|fim_middle|>",
-                "<|fim_prefix|>",
-                "<\uff5cbegin\u2581of\u2581sentence\uff5c>",
-                "<\uff5cend\u2581of\u2581sentence\uff5c>",
-                "<\uff5cend\u2581of\u2581text\uff5c>",
-            }
-            for token in SENTINELS:
-                if token in cleaned_text:
-                    cleaned_text = cleaned_text.replace(token, " ")
-
-            cleaned_text = cleaned_text.strip()
-
-            # Best-effort: if provider ignored JSON instruction, try to extract a JSON block
-            if cleaned_text and not cleaned_text.lstrip().startswith(('{', '[')):
-                txt = cleaned_text
-                start = txt.find('{')
-                end = txt.rfind('}')
-                if start != -1 and end != -1 and end > start:
-                    candidate = txt[start:end+1]
-                    try:
-                        # Validate it's JSON; if so, return only that chunk
-                        json.loads(candidate)
-                        cleaned_text = candidate
-                    except Exception:
-                        pass
-
-            return cleaned_text.strip()
+            return clean_completion_text(message_text(completion.choices[0].message))
         except Exception as exc:
             detail = str(exc)
             hint = ""
@@ -182,12 +298,165 @@ class OpenRouterLLM:
                 f"{hint} Details: {detail}"
             ) from exc
 
+    @staticmethod
+    def _account(request: Dict[str, Any], usage: Any = None, text: str = "") -> None:
+        # the provider's usage block when it sent one (a stream closed early
+        # never gets to it), otherwise a local estimate
+        if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+            record_usage(usage.prompt_tokens, usage.completion_tokens or 0, getattr(usage, "cost", None))
+        else:
+            prompt_tokens = sum(count_tokens(m["content"]) for m in request["messages"])
+            record_usage(prompt_tokens, count_tokens(text), estimated=True)
+
+    def _streamed_text(self, validator: JSONStreamValidator) -> str:
+        if validator.done:
+            return validator.json_text
+        text = clean_completion_text(validator.text)
+        if not text:
+            # e.g. reasoning models that stream nothing but reasoning deltas
+            raise StreamDivergedError("stream ended without content")
+        return text
+
+    def _diverged(self, exc: StreamDivergedError) -> None:
+        self.stream_stats["diverged"] += 1
+        self.last_divergence = str(exc)
+
+    def generate(
+        self,
+        prompt: str,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        schema: Any = None,
+    ) -> str:
+        """
+        Generate content using the configured OpenRouter model. The call goes
+        through the model's rate limiter, which retries it on 429/5xx.
+        With streaming on and a `schema` (head model class or streaming.Shape),
+        the completion is streamed and validated as it arrives; a stream that
+        diverges is closed and the request is repeated without streaming.
+        """
+        first, fallback = self._request_plan(prompt, temperature, max_tokens)
+        # the request actually answered (first, or its fallback), for token accounting
+        sent = {"request": first}
+
+        def _create(**extra):
+            sent["request"] = first
+            try:
+                return self.client.chat.completions.create(**first, **extra)
+            except Exception as first_exc:
+                retry = fallback(first_exc)
+                if retry is None:
+                    raise
+                sent["request"] = retry
+                return self.client.chat.completions.create(**retry, **extra)
+
+        def _stream():
+            validator = JSONStreamValidator(schema)
+            stream = _create(stream=True)
+            usage = None
+            try:
+                for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    if validator.feed(delta_text(chunk)):
+                        break
+            finally:
+                # closing the response ends the generation on the provider side
+                stream.close()
+                self._account(sent["request"], usage, validator.text)
+            self.stream_stats["streamed"] += 1
+            return self._streamed_text(validator)
+
+        est_tokens = self._estimated_tokens(first)
+        if self.stream and schema is not None:
+            try:
+                return self.limiter.call(_stream, est_tokens=est_tokens)
+            except StreamDivergedError as exc:
+                self._diverged(exc)
+        completion = self.limiter.call(_create, est_tokens=est_tokens)
+        text = self._finish(completion)
+        self._account(sent["request"], getattr(completion, "usage", None), text)
+        return text
+
+
+class AsyncOpenRouterLLM(OpenRouterLLM):
+    """
+    OpenRouterLLM with a native async path. agenerate() issues the request
+    through AsyncOpenAI on the running loop's shared connection pool, so
+    concurrent heads need no worker threads; generate() stays available for
+    synchronous callers.
+    """
+
+    async def agenerate(
+        self,
+        prompt: str,
+        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        schema: Any = None,
+    ) -> str:
+        client = shared_async_openai_client(self.api_key, self.base_url)
+        first, fallback = self._request_plan(prompt, temperature, max_tokens)
+        sent = {"request": first}
+
+        async def _create(**extra):
+            sent["request"] = first
+            try:
+                return await client.chat.completions.create(**first, **extra)
+            except Exception as first_exc:
+                retry = fallback(first_exc)
+                if retry is None:
+                    raise
+                sent["request"] = retry
+                return await client.chat.completions.create(**retry, **extra)
+
+        async def _stream():
+            validator = JSONStreamValidator(schema)
+            stream = await _create(stream=True)
+            usage = None
+            try:
+                async for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    if validator.feed(delta_text(chunk)):
+                        break
+            finally:
+                await stream.close()
+                self._account(sent["request"], usage, validator.text)
+            self.stream_stats["streamed"] += 1
+            return self._streamed_text(validator)
+
+        est_tokens = self._estimated_tokens(first)
+        if self.stream and schema is not None:
+            try:
+                return await self.limiter.acall(_stream, est_tokens=est_tokens)
+            except StreamDivergedError as exc:
+                self._diverged(exc)
+        completion = await self.limiter.acall(_create, est_tokens=est_tokens)
+        text = self._finish(completion)
+        self._account(sent["request"], getattr(completion, "usage", None), text)
+        return text
+
+
 class MockLLM:
     """
     Deterministic mock LLM for offline dev/testing.
     Returns canned JSON for each head given a short context.
     """
+    # phrase that routes generate() to each head's canned answer
+    HEAD_PROMPTS = {
+        "metadata": "Extract title",
+        "methods": "From the METHODS/ARCHITECTURE sections",
+        "results": "Extract evaluation results",
+        "limitations": "Extract the paper's limitations",
+        "summary": "concise summary",
+    }
+
+    def head_response(self, head: str) -> str:
+        """Canned JSON answer for one head."""
+        return MockLLM.generate(self, self.HEAD_PROMPTS[head])
+
     def generate(self, prompt: str, temperature: float = 0.0, max_tokens: int = 512) -> str:
+        if "for ALL HEADS" in prompt:
+            # fused prompt: every head's canned answer under its head name
+            return json.dumps({head: json.loads(self.head_response(head)) for head in self.HEAD_PROMPTS})
         # Very small heuristic to choose which head this is
         if "Extract evaluation results" in prompt or '"dataset"' in prompt:
             # return a simple results array
@@ -235,44 +504,179 @@ class MockLLM:
         # default fallback: return empty JSON object
         return "{}"
 
+    async def agenerate(self, prompt: str, temperature: float = 0.0, max_tokens: int = 512) -> str:
+        return self.generate(prompt, temperature=temperature, max_tokens=max_tokens)
+
+# Completion budget for the fused prompt (all five heads' JSON in one answer)
+FUSED_MAX_TOKENS = 1536
+
+def max_tokens_for(head_name: Optional[str]) -> Optional[int]:
+    """Completion budget a head's call is made with (None: the backend's default)."""
+    return FUSED_MAX_TOKENS if head_name == "fused" else None
+
+HEAD_OUTPUT_MODELS = {
+    "metadata": MetadataOutput,
+    "methods": MethodsOutput,
+    "results": ResultsOutput,
+    "limitations": LimitationsOutput,
+    "summary": SummaryOutput,
+}
+
+
+# Streamed fused answers are only checked to be one JSON object; the head
+# parts are validated after the split (which tolerates a few layouts)
+FUSED_SHAPE = Shape("object")
+
+
 class HeadRunner:
-    def __init__(self, llm_client=None, temperature: float = 0.0):
+    def __init__(self, llm_client=None, temperature: float = 0.0, prompts: Optional[PromptRegistry] = None):
         self.llm = llm_client or MockLLM()
         self.temperature = temperature
+        # templates are read once per process (see orchestrator.prompts for hot reload)
+        self.prompts = prompts or shared_prompt_registry(PROMPTS_DIR)
 
     def _load_prompt(self, head_name: str, context: str) -> str:
-        p = PROMPTS_DIR / f"{head_name}_prompt.txt"
-        if not p.exists():
-            raise FileNotFoundError(f"Prompt template not found: {p}")
-        template = p.read_text(encoding="utf-8")
-        return template.replace("{context_text}", context)
+        return self.prompts.render(head_name, context_text=context)
+
+    def template_version(self, head_name: str) -> str:
+        """Short hash of the head's prompt template; editing the file changes it."""
+        return self.prompts.version(head_name)
+
+    @property
+    def model_id(self) -> str:
+        return getattr(self.llm, "model_id", None) or type(self.llm).__name__
+
+    def generation_params(self, head_name: Optional[str] = None) -> Dict[str, Any]:
+        """Everything besides model, template and context that shapes a head's output.
+
+        Pass the head (or "fused") so the completion budget reported is the one
+        its call is actually made with.
+        """
+        cache_params = getattr(self.llm, "cache_params", None)
+        params = cache_params(max_tokens_for(head_name)) if callable(cache_params) else {}
+        return {"temperature": self.temperature, **params}
+
+    def _generate_kwargs(self, schema: Any = None, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"temperature": self.temperature}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if schema is not None and getattr(self.llm, "stream", False):
+            # only streaming backends take the schema (to drop diverging completions)
+            kwargs["schema"] = schema
+        return kwargs
+
+    def _generate(self, prompt: str, max_tokens: Optional[int] = None, schema: Any = None) -> str:
+        record_call()
+        return self.llm.generate(prompt, **self._generate_kwargs(schema, max_tokens))
 
     def run_metadata_head(self, context: str) -> MetadataOutput:
         prompt = self._load_prompt("metadata", context)
-        raw = self.llm.generate(prompt, temperature=self.temperature)
+        raw = self._generate(prompt, schema=MetadataOutput)
         data = json.loads(raw)
         return MetadataOutput(**data)
 
     def run_methods_head(self, context: str) -> MethodsOutput:
         prompt = self._load_prompt("methods", context)
-        raw = self.llm.generate(prompt, temperature=self.temperature)
+        raw = self._generate(prompt, schema=MethodsOutput)
         data = json.loads(raw)
         return MethodsOutput(**data)
 
     def run_results_head(self, context: str) -> ResultsOutput:
         prompt = self._load_prompt("results", context)
-        raw = self.llm.generate(prompt, temperature=self.temperature)
+        raw = self._generate(prompt, schema=ResultsOutput)
         data = json.loads(raw)
         return ResultsOutput.parse_obj(data)
 
     def run_limitations_head(self, context: str) -> LimitationsOutput:
         prompt = self._load_prompt("limitations", context)
-        raw = self.llm.generate(prompt, temperature=self.temperature)
+        raw = self._generate(prompt, schema=LimitationsOutput)
         data = json.loads(raw)
         return LimitationsOutput(**data)
 
     def run_summary_head(self, context: str) -> SummaryOutput:
         prompt = self._load_prompt("summary", context)
-        raw = self.llm.generate(prompt, temperature=self.temperature)
+        raw = self._generate(prompt, schema=SummaryOutput)
         data = json.loads(raw)
         return SummaryOutput(**data)
+
+    # Async variants: await backends that implement agenerate() (AsyncOpenRouterLLM,
+    # MockLLM); sync-only backends are run on a worker thread.
+
+    async def _agenerate(self, prompt: str, max_tokens: Optional[int] = None, schema: Any = None) -> str:
+        kwargs = self._generate_kwargs(schema, max_tokens)
+        record_call()
+        agenerate = getattr(self.llm, "agenerate", None)
+        if agenerate is not None:
+            return await agenerate(prompt, **kwargs)
+        return await asyncio.to_thread(self.llm.generate, prompt, **kwargs)
+
+    async def arun_head(self, head_name: str, context: str):
+        prompt = self._load_prompt(head_name, context)
+        model = HEAD_OUTPUT_MODELS[head_name]
+        raw = await self._agenerate(prompt, schema=model)
+        data = json.loads(raw)
+        return model.parse_obj(data) if head_name == "results" else model(**data)
+
+    async def arun_metadata_head(self, context: str) -> MetadataOutput:
+        return await self.arun_head("metadata", context)
+
+    async def arun_methods_head(self, context: str) -> MethodsOutput:
+        return await self.arun_head("methods", context)
+
+    async def arun_results_head(self, context: str) -> ResultsOutput:
+        return await self.arun_head("results", context)
+
+    async def arun_limitations_head(self, context: str) -> LimitationsOutput:
+        return await self.arun_head("limitations", context)
+
+    async def arun_summary_head(self, context: str) -> SummaryOutput:
+        return await self.arun_head("summary", context)
+
+    # Fused mode: one request returns every head, split back into the head models.
+
+    def _fused_prompt(self, context: str, heads: Iterable[str]) -> str:
+        names = ", ".join(f'"{h}"' for h in heads)
+        return self.prompts.render("fused", heads=names, context_text=context)
+
+    @staticmethod
+    def split_fused_output(raw: str, heads: Iterable[str]) -> Tuple[Dict[str, Any], Dict[str, Exception]]:
+        """
+        Validate each head's part of a fused completion. Returns (head -> model,
+        head -> error); heads missing from or invalid in the output are errors.
+        """
+        heads = list(heads)
+        try:
+            data = json.loads(raw)
+            if not isinstance(data, dict):
+                raise ValueError(f"fused output is a {type(data).__name__}, not an object")
+        except Exception as exc:
+            return {}, {h: exc for h in heads}
+        outputs: Dict[str, Any] = {}
+        errors: Dict[str, Exception] = {}
+        for head in heads:
+            part = data.get(head)
+            try:
+                if part is None:
+                    raise KeyError(f"fused output has no '{head}'")
+                # tolerate the head's own key repeated inside ({"results": [...]}) or left out
+                if head == "results" and isinstance(part, dict) and "results" in part:
+                    part = part["results"]
+                if head == "methods" and isinstance(part, list):
+                    part = {"methods": part}
+                if head == "summary" and isinstance(part, str):
+                    part = {"summary": part}
+                model = HEAD_OUTPUT_MODELS[head]
+                outputs[head] = model.parse_obj(part) if head == "results" else model(**part)
+            except Exception as exc:
+                errors[head] = exc
+        return outputs, errors
+
+    def run_fused_heads(self, context: str, heads: Iterable[str] = HEAD_OUTPUT_MODELS):
+        heads = list(heads)
+        raw = self._generate(self._fused_prompt(context, heads), max_tokens_for("fused"), FUSED_SHAPE)
+        return self.split_fused_output(raw, heads)
+
+    async def arun_fused_heads(self, context: str, heads: Iterable[str] = HEAD_OUTPUT_MODELS):
+        heads = list(heads)
+        raw = await self._agenerate(self._fused_prompt(context, heads), max_tokens_for("fused"), FUSED_SHAPE)
+        return self.split_fused_output(raw, heads)
@@ -0,0 +1,132 @@
+# orchestrator/metrics.py
+"""
+Per-paper LLM accounting: tokens, cost, latency, retries and cache hits per head.
+
+Pipeline.run_heads opens a HeadMetrics record for every head and makes it the
+current one while the head runs. The record lives in a context variable, so it
+follows the head's task and the worker thread a sync backend is run on.
+Everything below the pipeline reports into it without being handed it:
+HeadRunner counts LLM calls, backends report the provider's usage block
+(record_usage) and the rate limiter reports retries (record_retry). Outside a
+pipeline run there is no current record and these calls do nothing.
+
+The per-paper record ends up in paper["_meta"]["llm_metrics"].
+"""
+import contextvars
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# where a head's output came from
+SOURCE_LLM = "llm"        # this run called the model for it
+SOURCE_CACHE = "cache"    # head cache hit
+SOURCE_SHARED = "shared"  # another caller's identical in-flight call (single-flight)
+SOURCE_FUSED = "fused"    # part of this run's fused call
+SOURCE_UNKNOWN = "unknown"  # never marked (a path that does not report its source)
+
+_CURRENT: contextvars.ContextVar[Optional["HeadMetrics"]] = contextvars.ContextVar("head_metrics", default=None)
+
+
+@dataclass
+class HeadMetrics:
+    source: str = SOURCE_UNKNOWN
+    latency_ms: float = 0.0       # wall time of the head: cache lookups, queueing and retries included
+    calls: int = 0                # completions the head asked for (retries are counted below)
+    retries: int = 0              # attempts the rate limiter repeated after 429/5xx
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: Optional[float] = None  # as billed by the provider (OpenRouter usage accounting)
+    estimated: bool = False       # some token counts are local estimates (no usage block)
+
+
+@contextmanager
+def measuring(record: HeadMetrics) -> Iterator[HeadMetrics]:
+    """Make `record` the current one and add the block's wall time to it."""
+    token = _CURRENT.set(record)
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.latency_ms += (time.perf_counter() - t0) * 1000.0
+        _CURRENT.reset(token)
+
+
+def mark_source(source: str) -> None:
+    record = _CURRENT.get()
+    if record is not None:
+        record.source = source
+
+
+def record_call() -> None:
+    record = _CURRENT.get()
+    if record is not None:
+        record.calls += 1
+
+
+def record_retry() -> None:
+    record = _CURRENT.get()
+    if record is not None:
+        record.retries += 1
+
+
+def record_usage(prompt_tokens: int, completion_tokens: int, cost: Optional[float] = None,
+                 estimated: bool = False) -> None:
+    record = _CURRENT.get()
+    if record is None:
+        return
+    record.prompt_tokens += int(prompt_tokens or 0)
+    record.completion_tokens += int(completion_tokens or 0)
+    if cost is not None:
+        record.cost = (record.cost or 0.0) + float(cost)
+    record.estimated = record.estimated or estimated
+
+
+def percentile(values: Iterable[float], q: float) -> Optional[float]:
+    """Linearly interpolated q-th percentile (0-100); None for no values."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * q / 100.0
+    lo, hi = math.floor(rank), math.ceil(rank)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+class LLMMetrics:
+    """The head records of one paper, plus the fused call's when there is one."""
+
+    def __init__(self):
+        self.heads: Dict[str, HeadMetrics] = {}
+        self.fused: Optional[HeadMetrics] = None
+        self.wall_ms = 0.0
+
+    def head(self, name: str) -> HeadMetrics:
+        return self.heads.setdefault(name, HeadMetrics())
+
+    def _records(self) -> List[HeadMetrics]:
+        return list(self.heads.values()) + ([self.fused] if self.fused is not None else [])
+
+    def to_dict(self, model_id: str = "") -> Dict[str, Any]:
+        records = self._records()
+        costs = [r.cost for r in records if r.cost is not None]
+        hits = sum(r.source == SOURCE_CACHE for r in self.heads.values())
+        out: Dict[str, Any] = {
+            "model": model_id,
+            "heads": {name: asdict(r) for name, r in self.heads.items()},
+            "totals": {
+                "heads": len(self.heads),
+                "cache_hits": hits,
+                "cache_hit_rate": hits / len(self.heads) if self.heads else None,
+                "calls": sum(r.calls for r in records),
+                "retries": sum(r.retries for r in records),
+                "prompt_tokens": sum(r.prompt_tokens for r in records),
+                "completion_tokens": sum(r.completion_tokens for r in records),
+                "cost": sum(costs) if costs else None,
+                "estimated": any(r.estimated for r in records),
+                "wall_ms": self.wall_ms,
+            },
+        }
+        if self.fused is not None:
+            out["fused"] = asdict(self.fused)
+        return out
@@ -1,47 +1,102 @@
 # orchestrator/pipeline.py
 import asyncio
+import copy
 import hashlib
 import json
-import os
-from pathlib import Path
-from typing import Dict, Any, Callable
-from datetime import datetime, timezone
-from orchestrator.heads import HeadRunner, LLMGenerationError
+import time
+from typing import Dict, Any, Awaitable, Callable, Optional
+from orchestrator.cache import CacheBackend, JsonFileCache
+from orchestrator.context import HEADS, fuse_contexts
+from orchestrator.heads import HeadRunner, LLMGenerationError, aclose_shared_clients
 from orchestrator.merge import merge_heads_to_paper
+from orchestrator import metrics
+from orchestrator.metrics import LLMMetrics
+from orchestrator.singleflight import SINGLE_FLIGHT, SingleFlight
 
-CACHE_DIR = Path(".cache")
-
-def _hash_key(head_name: str, context_text: str) -> str:
+def _hash_key(head_name: str, context_text: str, model_id: str = "", template_version: str = "",
+              params: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key over everything that determines a head's output."""
     h = hashlib.sha256()
-    h.update(head_name.encode("utf-8"))
-    h.update(b"\0")
+    for part in (head_name, model_id, template_version, json.dumps(params or {}, sort_keys=True)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
     h.update(context_text.encode("utf-8"))
     return h.hexdigest()
 
-def _cache_path_for_key(key: str) -> Path:
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    return CACHE_DIR / f"{key}.json"
+class DictWrapper:
+    """Minimal adapter exposing a cached head dict through .dict() and attributes."""
+    def __init__(self, d):
+        self._d = d
+    def dict(self):
+        return self._d
+    def __getattr__(self, item):
+        # return key or None; lists of dicts (methods or results) are kept as is
+        return self._d.get(item)
 
 class Pipeline:
-    def __init__(self, head_runner: HeadRunner = None, cache_dir: str = ".cache"):
+    def __init__(self, head_runner: HeadRunner = None, cache_dir: str = ".cache",
+                 cache: Optional[CacheBackend] = None, refresh: bool = False,
+                 single_flight: Optional[SingleFlight] = SINGLE_FLIGHT, fused: bool = False):
+        """
+        Head results are cached in `cache` (any CacheBackend, e.g. a shared
+        SQLiteCache); without one, a JsonFileCache in `cache_dir` is used.
+        refresh=True skips cache reads (heads are re-run) but still stores results.
+        Cache misses are de-duplicated through `single_flight` (process-wide
+        by default; None disables coalescing).
+        fused=True asks for all heads in one LLM call (prompts/fused_prompt.txt);
+        only heads whose part of that answer fails validation are re-run on
+        their own prompts.
+        """
         self.head_runner = head_runner or HeadRunner()
-        self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = cache if cache is not None else JsonFileCache(cache_dir)
+        self.refresh = refresh
+        self.single_flight = single_flight
+        self.fused = fused
+
+    @property
+    def model_id(self) -> str:
+        return self.head_runner.model_id
 
     async def _run_head_cached(self, head_name: str, call_fn: Callable[[str], Any], context: str) -> Any:
         """
-        Run a head function with caching. call_fn is a synchronous function taking context and returning a Pydantic model.
-        We'll run it in a thread and await the result.
+        Run a head function with caching. call_fn takes the context and returns a Pydantic model;
+        coroutine functions (HeadRunner.arun_*) are awaited, plain functions run in a thread.
         """
-        key = _hash_key(head_name, context)
-        cache_path = _cache_path_for_key(key)
-        if cache_path.exists():
-            raw = json.loads(cache_path.read_text(encoding="utf-8"))
-            # Return the raw dict; caller may parse into model or may already have Pydantic model
-            return raw
-
-        # Run call_fn in a thread to keep event loop free
-        result = await asyncio.to_thread(call_fn, context)
+        runner = self.head_runner
+        template = runner.template_version(head_name)
+        key = _hash_key(head_name, context, runner.model_id, template, runner.generation_params(head_name))
+        lookup = lambda: self._lookup(key)
+
+        hit = lookup()
+        if hit is not None:
+            metrics.mark_source(metrics.SOURCE_CACHE)
+            return hit
+        if self.single_flight is None:
+            return await self._compute_head(key, head_name, template, call_fn, context)
+        # identical calls in flight (other sessions, threads or processes) share one LLM call
+        return await self.single_flight.run(
+            key, lambda: self._compute_head(key, head_name, template, call_fn, context),
+            cache=self.cache, lookup=lookup,
+        )
+
+    def _lookup(self, key: str) -> Any:
+        cached = None if self.refresh else self.cache.get(key)
+        if cached is None:
+            return None
+        # memory tiers hand back the head model itself; disk tiers the JSON payload
+        return {"payload": cached} if isinstance(cached, (dict, list)) else cached
+
+    async def _compute_head(self, key: str, head_name: str, template: str,
+                            call_fn: Callable[[str], Any], context: str) -> Any:
+        metrics.mark_source(metrics.SOURCE_LLM)
+        if asyncio.iscoroutinefunction(call_fn):
+            result = await call_fn(context)
+        else:
+            # Run sync call_fn in a thread to keep event loop free
+            result = await asyncio.to_thread(call_fn, context)
+        return self._store(key, head_name, template, result)
+
+    def _store(self, key: str, head_name: str, template: str, result: Any) -> Any:
         # result may be a Pydantic model; convert to dict for caching
         try:
             if hasattr(result, "dict"):
@@ -52,60 +107,98 @@ class Pipeline:
         except Exception:
             payload = result
 
-        # Save to cache
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "_cached_at": datetime.now(timezone.utc).isoformat(),
-                    "payload": payload,
-                },
-                f,
-                ensure_ascii=False,
-                indent=2,
-            )
-        # Return the payload (not wrapped)
-        return {"payload": payload}
-
-    async def run_heads(self, contexts: Dict[str, str]) -> Dict[str, Any]:
+        self.cache.put(key, payload, head=head_name, model=self.model_id, template=template, value=result)
+        return result if payload is not result else {"payload": payload}
+
+    async def _run_fused_cached(self, contexts: Dict[str, str],
+                                collector: Optional[LLMMetrics] = None) -> Dict[str, Any]:
+        """
+        Heads of `contexts` answered by one fused call over their combined
+        context. Each head is cached on its own (tagged "fused:<head>"), so a
+        later run only asks for the heads still missing. Heads that fail
+        validation are absent from the result.
+        """
+        collector = collector or LLMMetrics()
+        runner = self.head_runner
+        heads = [h for h in HEADS if h in contexts]
+        fused_ctx = fuse_contexts(contexts, heads)
+        template = runner.template_version("fused")
+        params = runner.generation_params("fused")
+        keys = {h: _hash_key(f"fused:{h}", fused_ctx, runner.model_id, template, params) for h in heads}
+
+        outputs = {}
+        for head in heads:
+            hit = self._lookup(keys[head])
+            if hit is not None:
+                outputs[head] = hit
+                collector.head(head).source = metrics.SOURCE_CACHE
+        missing = [h for h in heads if h not in outputs]
+        if not missing:
+            return outputs
+
+        async def compute():
+            metrics.mark_source(metrics.SOURCE_FUSED)
+            parsed, _ = await runner.arun_fused_heads(fused_ctx, missing)
+            return {h: self._store(keys[h], f"fused:{h}", template, res) for h, res in parsed.items()}
+
+        collector.fused = fused_record = metrics.HeadMetrics()
+        with metrics.measuring(fused_record):
+            if self.single_flight is None:
+                fresh = await compute()
+            else:
+                # in-process coalescing only: a fused answer is not one cache entry to lease
+                flight_key = _hash_key("fused:" + ",".join(missing), fused_ctx, runner.model_id, template, params)
+                fresh = await self.single_flight.run(flight_key, compute)
+        for head in fresh:
+            record = collector.head(head)
+            record.source, record.latency_ms = fused_record.source, fused_record.latency_ms
+        outputs.update(fresh)
+        return outputs
+
+    async def run_heads(self, contexts: Dict[str, str], collector: Optional[LLMMetrics] = None) -> Dict[str, Any]:
         """
         contexts: mapping of head_name -> context_text
         head_name must match runner methods: metadata, methods, results, limitations, summary
         Returns dict head_name -> parsed object (prefer Pydantic models where possible, otherwise raw dict)
+        Per-head tokens, latency, retries and cache hits are recorded in `collector`.
         """
+        collector = collector or LLMMetrics()
+        t0 = time.perf_counter()
         # Map head_name to runner functions
         runner = self.head_runner
         mapping = {
-            "metadata": runner.run_metadata_head,
-            "methods": runner.run_methods_head,
-            "results": runner.run_results_head,
-            "limitations": runner.run_limitations_head,
-            "summary": runner.run_summary_head
+            "metadata": runner.arun_metadata_head,
+            "methods": runner.arun_methods_head,
+            "results": runner.arun_results_head,
+            "limitations": runner.arun_limitations_head,
+            "summary": runner.arun_summary_head
         }
 
+        fused = {}
+        if self.fused:
+            fused = await self._run_fused_cached({h: c for h, c in contexts.items() if h in mapping}, collector)
+
         tasks = {}
         for head_name, ctx in contexts.items():
-            if head_name not in mapping:
+            if head_name not in mapping or head_name in fused:
                 continue
             call_fn = mapping[head_name]
             # Wrap in async cached task
-            tasks[head_name] = asyncio.create_task(self._run_head_cached(head_name, call_fn, ctx))
+            tasks[head_name] = asyncio.create_task(
+                self._measured(collector.head(head_name), self._run_head_cached(head_name, call_fn, ctx)))
 
         # Await all
         results = {}
         errors = {}
+        for head_name, res in fused.items():
+            results[head_name] = self._unwrap(res)
         for head_name, task in tasks.items():
             try:
-                res = await task
-                # If cached file format used, unwrap
-                if isinstance(res, dict) and "payload" in res and len(res) == 1:
-                    res_obj = res["payload"]
-                else:
-                    # result may already be Pydantic model (if not cached path)
-                    res_obj = res
-                results[head_name] = res_obj
+                results[head_name] = self._unwrap(await task)
             except Exception as e:
                 results[head_name] = None
                 errors[head_name] = e
+        collector.wall_ms = (time.perf_counter() - t0) * 1000.0
         if errors:
             messages = []
             for head, err in errors.items():
@@ -114,20 +207,52 @@ class Pipeline:
             raise LLMGenerationError(f"Head failures detected: {summary}") from next(iter(errors.values()))
         return results
 
+    @staticmethod
+    async def _measured(record: metrics.HeadMetrics, coro: Awaitable[Any]) -> Any:
+        # runs inside the head's own task, so the record is current for that head only
+        with metrics.measuring(record):
+            return await coro
+
+    @staticmethod
+    def _unwrap(res: Any) -> Any:
+        # If cached file format used, unwrap
+        if isinstance(res, dict) and "payload" in res and len(res) == 1:
+            return res["payload"]
+        # result may already be Pydantic model (if not cached path)
+        return res
+
+    async def arun(self, contexts: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Run the heads on the caller's event loop and merge them. Lets one loop
+        drive many papers at once (scripts/batch_eval.py) on a single connection pool.
+        """
+        collector = LLMMetrics()
+        return self._with_metrics(self._merge_outputs(await self.run_heads(contexts, collector)), collector)
+
     def run(self, contexts: Dict[str, str]) -> Dict[str, Any]:
         """
         Synchronous wrapper for convenience in tests and CLI.
         """
+        collector = LLMMetrics()
         loop = asyncio.new_event_loop()
         try:
             asyncio.set_event_loop(loop)
-            head_outputs = loop.run_until_complete(self.run_heads(contexts))
+            head_outputs = loop.run_until_complete(self.run_heads(contexts, collector))
         finally:
             try:
+                # the loop is discarded, so release its connection pool too
+                loop.run_until_complete(aclose_shared_clients())
                 loop.close()
             except Exception:
                 pass
+        return self._with_metrics(self._merge_outputs(head_outputs), collector)
+
+    def _with_metrics(self, paper: Dict[str, Any], collector: LLMMetrics) -> Dict[str, Any]:
+        paper.setdefault("_meta", {})["llm_metrics"] = collector.to_dict(self.model_id)
+        return paper
 
+    @staticmethod
+    def _merge_outputs(head_outputs: Dict[str, Any]) -> Dict[str, Any]:
         # At this point head_outputs contains raw dicts (from cache) or Pydantic models (if not cached).
         # Normalize: if dict contains {"_cached_at","payload"}, unwrap to payload
         normalized = {}
@@ -145,18 +270,7 @@ class Pipeline:
             head_objs[k] = v  # merge module handles dicts as necessary
 
         # The merge function (merge_heads_to_paper) expects Pydantic-like objects (attributes) for metadata, methods, etc.
-        # If head_objs values are dicts (from cache), wrap minimal adapter that exposes .dict() and attributes via keys.
-        class DictWrapper:
-            def __init__(self, d):
-                self._d = d
-            def dict(self):
-                return self._d
-            def __getattr__(self, item):
-                # return key or None
-                val = self._d.get(item)
-                # if the val is a list of dicts (methods or results), keep as is
-                return val
-
+        # If head_objs values are dicts (from cache), wrap them in DictWrapper.
         head_for_merge = {}
         for name, val in head_objs.items():
             # If it's already a Pydantic model (has dict() and attrs), keep it.
@@ -170,6 +284,7 @@ class Pipeline:
                     raw = val if isinstance(val, dict) else {}
                 head_for_merge[name] = DictWrapper(raw)
 
-        # Merge into final paper JSON (may raise ValidationError)
+        # Merge into final paper JSON (may raise ValidationError). Head objects
+        # can be shared with an in-memory cache tier, so the paper gets its own copy.
         merged = merge_heads_to_paper(head_for_merge)
-        return merged
+        return copy.deepcopy(merged)
@@ -0,0 +1,152 @@
+# orchestrator/prompts.py
+"""
+Prompt templates, loaded once and pre-split for rendering.
+
+A PromptRegistry reads every prompts/<name>_prompt.txt when it is created and
+keeps each as an immutable PromptTemplate: the text, a short content hash
+(the template version folded into head cache keys) and the text split around
+its placeholders, so rendering a prompt is one join instead of a search and
+replace over the whole template.
+
+Templates hold literal JSON examples, so only the known placeholders
+({context_text}, {heads}) are substituted; every other brace is text.
+
+With hot_reload=True (PROMPTS_HOT_RELOAD=1 for the shared registry) the
+registry stats a template's file on each lookup and reloads it when it
+changed, e.g. while tuning prompts in the app. Otherwise templates stay as
+loaded until reload() is called.
+"""
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+TEMPLATE_SUFFIX = "_prompt.txt"
+PLACEHOLDERS = ("context_text", "heads")
+
+_PLACEHOLDER_RE = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    text: str
+    version: str                # short sha256 of the text
+    literals: Tuple[str, ...]   # text between placeholders (one more than fields)
+    fields: Tuple[str, ...]     # placeholder names in order of appearance
+    mtime_ns: int = 0
+
+    @classmethod
+    def compile(cls, name: str, text: str, mtime_ns: int = 0) -> "PromptTemplate":
+        pieces = _PLACEHOLDER_RE.split(text)
+        return cls(
+            name=name,
+            text=text,
+            version=hashlib.sha256(text.encode("utf-8")).hexdigest()[:12],
+            literals=tuple(pieces[0::2]),
+            fields=tuple(pieces[1::2]),
+            mtime_ns=mtime_ns,
+        )
+
+    @property
+    def prefix(self) -> str:
+        """Instruction text before the first placeholder."""
+        return self.literals[0]
+
+    def render(self, **values: str) -> str:
+        if self.fields == ("context_text",):
+            # the head templates: prefix + context + suffix
+            return self.literals[0] + values["context_text"] + self.literals[1]
+        parts = [self.literals[0]]
+        for name, literal in zip(self.fields, self.literals[1:]):
+            parts.append(values[name])
+            parts.append(literal)
+        return "".join(parts)
+
+
+class PromptRegistry:
+    def __init__(self, directory: Optional[Path] = None, hot_reload: bool = False):
+        self.directory = Path(directory) if directory is not None else PROMPTS_DIR
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._templates: Mapping[str, PromptTemplate] = MappingProxyType({})
+        self.reload()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}{TEMPLATE_SUFFIX}"
+
+    def _read(self, name: str) -> PromptTemplate:
+        path = self._path(name)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            raise FileNotFoundError(f"Prompt template not found: {path}")
+        return PromptTemplate.compile(name, text, mtime_ns)
+
+    def reload(self) -> Dict[str, str]:
+        """Re-read every template file; returns {name: version} of those that changed."""
+        names = sorted(p.name[:-len(TEMPLATE_SUFFIX)] for p in self.directory.glob(f"*{TEMPLATE_SUFFIX}"))
+        fresh = {name: self._read(name) for name in names}
+        with self._lock:
+            old = self._templates
+            # swapped whole, so concurrent readers see either set
+            self._templates = MappingProxyType(fresh)
+        return {n: t.version for n, t in fresh.items() if n not in old or old[n].version != t.version}
+
+    def _refresh(self, name: str, current: Optional[PromptTemplate]) -> PromptTemplate:
+        try:
+            mtime_ns = self._path(name).stat().st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if current is not None and mtime_ns == current.mtime_ns:
+            return current
+        template = self._read(name)
+        with self._lock:
+            self._templates = MappingProxyType({**self._templates, name: template})
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        current = self._templates.get(name)
+        if self.hot_reload:
+            return self._refresh(name, current)
+        if current is None:
+            raise FileNotFoundError(f"Prompt template not found: {self._path(name)}")
+        return current
+
+    def render(self, name: str, **values: str) -> str:
+        return self.get(name).render(**values)
+
+    def version(self, name: str) -> str:
+        """Short hash of the template's text; editing the file changes it."""
+        return self.get(name).version
+
+    def versions(self) -> Dict[str, str]:
+        return {name: self.get(name).version for name in self._templates}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+_SHARED: Dict[Tuple[Path, bool], PromptRegistry] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_prompt_registry(directory: Optional[Path] = None, hot_reload: Optional[bool] = None) -> PromptRegistry:
+    """Process-wide registry per prompts directory, so templates are read once."""
+    if hot_reload is None:
+        hot_reload = os.getenv("PROMPTS_HOT_RELOAD", "").lower() in ("1", "true", "yes")
+    key = (Path(directory if directory is not None else PROMPTS_DIR).resolve(), hot_reload)
+    with _SHARED_LOCK:
+        registry = _SHARED.get(key)
+        if registry is None:
+            registry = _SHARED[key] = PromptRegistry(key[0], hot_reload=hot_reload)
+        return registry
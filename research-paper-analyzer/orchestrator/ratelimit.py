@@ -0,0 +1,272 @@
+# orchestrator/ratelimit.py
+"""
+Client-side rate limiting for OpenRouter calls, per model id.
+
+Each model gets a governor with
+  - a requests-per-minute token bucket,
+  - a tokens-per-minute token bucket (prompt estimate + max_tokens),
+  - a cap on requests in flight,
+  - retry of the failed call only, with jittered exponential backoff that
+    honours Retry-After; a Retry-After also pauses the model's buckets so the
+    other heads back off together instead of hammering the quota.
+
+Buckets refill continuously, so a steady stream of calls runs at the quota
+ceiling instead of bursting and then sleeping. State is guarded by a
+threading lock and waiting is done with time/asyncio sleeps, so one governor
+works for sync callers, worker threads and any number of event loops.
+
+Limits come from OPENROUTER_RPM / OPENROUTER_TPM / OPENROUTER_MAX_IN_FLIGHT /
+OPENROUTER_MAX_RETRIES, per-model overrides from OPENROUTER_RATE_LIMITS
+(JSON: {"model/id": {"rpm": 20, "tpm": 40000}}), or configure_model().
+"""
+import asyncio
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from orchestrator.metrics import record_retry
+
+T = TypeVar("T")
+
+# OpenRouter allows 20 requests/minute on ":free" models; paid models are
+# only capped when configured
+FREE_MODEL_RPM = 20.0
+DEFAULT_MAX_IN_FLIGHT = 8
+DEFAULT_MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+# Poll interval while waiting for an in-flight slot
+_SLOT_POLL = 0.02
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    rpm: Optional[float] = None
+    tpm: Optional[float] = None
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    max_retries: int = DEFAULT_MAX_RETRIES
+    backoff_base: float = BACKOFF_BASE
+    backoff_cap: float = BACKOFF_CAP
+
+
+def _env_float(name: str) -> Optional[float]:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return None
+    value = float(raw)
+    return value if value > 0 else None
+
+
+def limits_from_env(model_id: str) -> ModelLimits:
+    limits = ModelLimits(rpm=FREE_MODEL_RPM if model_id.endswith(":free") else None)
+    overrides: Dict[str, Any] = {}
+    if os.getenv("OPENROUTER_RPM") is not None:
+        overrides["rpm"] = _env_float("OPENROUTER_RPM")
+    if os.getenv("OPENROUTER_TPM") is not None:
+        overrides["tpm"] = _env_float("OPENROUTER_TPM")
+    if os.getenv("OPENROUTER_MAX_IN_FLIGHT"):
+        overrides["max_in_flight"] = int(os.environ["OPENROUTER_MAX_IN_FLIGHT"])
+    if os.getenv("OPENROUTER_MAX_RETRIES"):
+        overrides["max_retries"] = int(os.environ["OPENROUTER_MAX_RETRIES"])
+    per_model = json.loads(os.getenv("OPENROUTER_RATE_LIMITS") or "{}")
+    overrides.update(per_model.get(model_id, {}))
+    return replace(limits, **overrides)
+
+
+class TokenBucket:
+    """Continuously refilling bucket of `rate_per_minute` tokens, burst up to one minute's worth."""
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, n: float = 1.0) -> float:
+        """
+        Take `n` tokens, going into debt if needed, and return how long the
+        caller must wait before using them. Reserving (rather than polling)
+        keeps waiters in arrival order.
+        """
+        n = min(n, self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= n
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for `seconds` (server asked us to, via Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class RateLimiter:
+    """Governor for one model id: RPM/TPM buckets, in-flight cap and per-call retry."""
+
+    def __init__(self, model_id: str, limits: ModelLimits):
+        self.model_id = model_id
+        self.limits = limits
+        self.requests = TokenBucket(limits.rpm) if limits.rpm else None
+        self.tokens = TokenBucket(limits.tpm) if limits.tpm else None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self.retries = 0
+        self.throttled = 0
+
+    def _reserve(self, est_tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(est_tokens))
+        return wait
+
+    def _try_enter(self) -> bool:
+        with self._lock:
+            if self._in_flight < self.limits.max_in_flight:
+                self._in_flight += 1
+                return True
+            return False
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._released.notify()
+
+    def _on_error(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Delay before retrying `exc`, or None when it should be raised."""
+        if attempt >= self.limits.max_retries or not is_retryable(exc):
+            return None
+        self.retries += 1
+        record_retry()
+        delay = random.uniform(0, min(self.limits.backoff_cap, self.limits.backoff_base * 2 ** attempt))
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            self.throttled += 1
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.pause(retry_after)
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, fn: Callable[[], T], est_tokens: int = 0) -> T:
+        """Run `fn` under the limits, retrying it alone on transient errors."""
+        attempt = 0
+        while True:
+            wait = self._reserve(est_tokens)
+            if wait > 0:
+                time.sleep(wait)
+            with self._lock:
+                while self._in_flight >= self.limits.max_in_flight:
+                    self._released.wait()
+                self._in_flight += 1
+            try:
+                return fn()
+            except Exception as exc:
+                delay = self._on_error(exc, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._leave()
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], est_tokens: int = 0) -> T:
+        """Async counterpart of call(); `fn` returns a fresh awaitable per attempt."""
+        attempt = 0
+        while True:
+            wait = self._reserve(est_tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            while not self._try_enter():
+                await asyncio.sleep(_SLOT_POLL)
+            try:
+                return await fn()
+            except Exception as exc:
+                delay = self._on_error(exc, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._leave()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model_id, "in_flight": self._in_flight,
+                "retries": self.retries, "throttled": self.throttled}
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        response = getattr(exc, "response", None)
+        code = getattr(response, "status_code", None)
+    return code
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429, 408/409, 5xx, timeouts and connection errors are worth retrying."""
+    code = _status_code(exc)
+    if code is not None:
+        return code in (408, 409, 429) or code >= 500
+    name = type(exc).__name__
+    return name in ("APIConnectionError", "APITimeoutError") or isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After / retry-after-ms header on the error's response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return max(0.0, float(ms) / 1000.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        when = email.utils.parsedate_to_datetime(value)
+        if when is None:
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model_id: str) -> RateLimiter:
+    """Process-wide governor for `model_id`, created from the environment on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(model_id)
+        if limiter is None:
+            limiter = _limiters[model_id] = RateLimiter(model_id, limits_from_env(model_id))
+        return limiter
+
+
+def configure_model(model_id: str, **limits: Any) -> RateLimiter:
+    """Replace the governor for `model_id` (e.g. configure_model(m, rpm=60, tpm=100_000))."""
+    with _limiters_lock:
+        limiter = _limiters[model_id] = RateLimiter(model_id, replace(limits_from_env(model_id), **limits))
+        return limiter
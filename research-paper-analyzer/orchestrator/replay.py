@@ -0,0 +1,263 @@
+# orchestrator/replay.py
+"""
+Record and replay LLM completions for offline, deterministic runs.
+
+RecordingLLM wraps a live backend and stores every completion in a
+ResponseArchive keyed on (model id, rendered prompt). ReplayLLM serves the
+archive back without network access: prompts are rendered from the same
+PDFs, templates and context budgets, so a replayed batch asks for exactly
+the recorded keys. Replayed calls go through the model's rate limiter like
+live ones and can be slowed down (recorded or fixed latency plus jitter) and
+made to fail (injected 429/5xx errors, retried by the limiter), which makes
+the archive a load-testing backend for Pipeline, batch_eval and the app:
+
+    with RecordingLLM(AsyncOpenRouterLLM(), "responses.jsonl.gz") as llm:
+        ...                                   # run the pipeline once, online
+    llm = ReplayLLM("responses.jsonl.gz", error_rate=0.05)
+
+The archive is gzip-compressed JSON lines ({key, model, completion,
+latency}); every flush appends one gzip member, so recording can be stopped
+at any time and a half-written tail is ignored on load.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from orchestrator.context import count_tokens
+from orchestrator.heads import LLMGenerationError
+from orchestrator.metrics import record_usage
+from orchestrator.ratelimit import ModelLimits, RateLimiter, get_limiter
+
+DEFAULT_FLUSH_EVERY = 20
+
+
+class ReplayMissError(LLMGenerationError):
+    """The archive holds no completion for this model and prompt."""
+
+
+class InjectedError(Exception):
+    """Synthetic provider error raised by ReplayLLM (looks like an HTTP error to the limiter)."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"injected HTTP {status_code}")
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = type("InjectedResponse", (), {"status_code": status_code, "headers": headers})()
+
+
+def response_key(model_id: str, prompt: str) -> str:
+    h = hashlib.sha256()
+    h.update(model_id.encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResponseArchive:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    record = json.loads(line)
+                    self._entries[record["key"]] = record
+        except (EOFError, OSError, zlib.error, ValueError):
+            # recording was interrupted mid-flush; keep what was complete
+            pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def models(self) -> List[str]:
+        return sorted({r["model"] for r in self._entries.values()})
+
+    def get(self, model_id: str, prompt: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(response_key(model_id, prompt))
+
+    def add(self, model_id: str, prompt: str, completion: str, latency: float = 0.0) -> None:
+        key = response_key(model_id, prompt)
+        record = {"key": key, "model": model_id, "completion": completion, "latency": round(latency, 3)}
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = record
+            self._pending.append(record)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as fh:
+                for record in self._pending:
+                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._pending.clear()
+
+
+class RecordingLLM:
+    """
+    Pass-through to `llm` that archives each completion. Attributes not
+    defined here (model_id, limiter, cache_params, stream) are the wrapped
+    backend's, so head cache keys and limits are unchanged by recording.
+    """
+
+    def __init__(self, llm: Any, path: str, flush_every: int = DEFAULT_FLUSH_EVERY):
+        self.llm = llm
+        self.archive = ResponseArchive(path)
+        self.flush_every = flush_every
+        self._since_flush = 0
+
+    def __getattr__(self, item):
+        if item == "llm":
+            raise AttributeError(item)
+        return getattr(self.llm, item)
+
+    @property
+    def _model(self) -> str:
+        return getattr(self.llm, "model_id", None) or type(self.llm).__name__
+
+    def _record(self, prompt: str, completion: str, started: float) -> str:
+        self.archive.add(self._model, prompt, completion, time.perf_counter() - started)
+        self._since_flush += 1
+        if self._since_flush >= self.flush_every:
+            self._since_flush = 0
+            self.archive.flush()
+        return completion
+
+    def generate(self, prompt: str, **kwargs: Any) -> str:
+        started = time.perf_counter()
+        return self._record(prompt, self.llm.generate(prompt, **kwargs), started)
+
+    async def agenerate(self, prompt: str, **kwargs: Any) -> str:
+        started = time.perf_counter()
+        agenerate = getattr(self.llm, "agenerate", None)
+        if agenerate is not None:
+            completion = await agenerate(prompt, **kwargs)
+        else:
+            completion = await asyncio.to_thread(self.llm.generate, prompt, **kwargs)
+        return self._record(prompt, completion, started)
+
+    def close(self) -> None:
+        self.archive.flush()
+
+    def __enter__(self) -> "RecordingLLM":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ReplayLLM:
+    def __init__(
+        self,
+        path: str,
+        model_id: Optional[str] = None,
+        latency: Optional[float] = None,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 429,
+        retry_after: Optional[float] = None,
+        seed: Optional[int] = None,
+        limits: Optional[ModelLimits] = None,
+    ):
+        """
+        Serve completions recorded in the archive at `path`.
+
+        latency=None sleeps for each completion's recorded latency, a number
+        sleeps that many seconds instead; `jitter` adds up to that many
+        seconds at random. A fraction `error_rate` of attempts raises an
+        InjectedError with `error_status` (and a Retry-After of `retry_after`
+        seconds), which the limiter retries. `model_id` defaults to the
+        archive's only model; `limits` replaces the model's process-wide
+        limiter with a private one.
+        """
+        self.archive = ResponseArchive(path)
+        if model_id is None:
+            models = self.archive.models()
+            if len(models) != 1:
+                raise ValueError(f"Archive {path} holds models {models}; pass model_id")
+            model_id = models[0]
+        self.model_id = model_id
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.limiter = RateLimiter(model_id, limits) if limits is not None else get_limiter(model_id)
+        self.calls = 0
+        self.misses = 0
+        self.injected_errors = 0
+
+    def _lookup(self, prompt: str) -> Dict[str, Any]:
+        record = self.archive.get(self.model_id, prompt)
+        with self._lock:
+            self.calls += 1
+            if record is None:
+                self.misses += 1
+        if record is None:
+            raise ReplayMissError(
+                f"No recorded completion for model '{self.model_id}' and this prompt "
+                f"(key {response_key(self.model_id, prompt)[:12]}); re-record the archive"
+            )
+        return record
+
+    def _delay_and_fault(self, record: Dict[str, Any]) -> float:
+        """Latency for this attempt; raises InjectedError for the injected share of attempts."""
+        with self._lock:
+            delay = record.get("latency", 0.0) if self.latency is None else self.latency
+            if self.jitter:
+                delay += self._random.uniform(0.0, self.jitter)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+        if fail:
+            raise InjectedError(self.error_status, self.retry_after)
+        return delay
+
+    @staticmethod
+    def _estimated_tokens(prompt: str, record: Dict[str, Any]) -> int:
+        return count_tokens(prompt) + count_tokens(record["completion"])
+
+    def generate(self, prompt: str, temperature: float = 0.0, max_tokens: Optional[int] = None,
+                 **kwargs: Any) -> str:
+        record = self._lookup(prompt)
+
+        def _attempt():
+            time.sleep(self._delay_and_fault(record))
+            return record["completion"]
+
+        completion = self.limiter.call(_attempt, est_tokens=self._estimated_tokens(prompt, record))
+        record_usage(count_tokens(prompt), count_tokens(completion), estimated=True)
+        return completion
+
+    async def agenerate(self, prompt: str, temperature: float = 0.0, max_tokens: Optional[int] = None,
+                        **kwargs: Any) -> str:
+        record = self._lookup(prompt)
+
+        async def _attempt():
+            await asyncio.sleep(self._delay_and_fault(record))
+            return record["completion"]
+
+        completion = await self.limiter.acall(_attempt, est_tokens=self._estimated_tokens(prompt, record))
+        record_usage(count_tokens(prompt), count_tokens(completion), estimated=True)
+        return completion
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "misses": self.misses, "injected_errors": self.injected_errors,
+                **self.limiter.stats()}
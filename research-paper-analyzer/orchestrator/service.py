@@ -0,0 +1,103 @@
+# orchestrator/service.py
+"""
+Long-lived pipeline runner for servers and scripts.
+
+Pipeline.run() creates and closes an event loop per paper, which also throws
+away the loop's HTTP connection pool. PipelineService owns one event loop on
+a background thread for its whole life, so the async OpenRouter client pool
+(one per loop, see orchestrator.heads) stays warm across papers and
+sessions. Any thread can submit work:
+
+    service = PipelineService(Pipeline(head_runner=runner, cache=cache))
+    future = service.submit(contexts)        # concurrent.futures.Future
+    paper = future.result()
+    service.shutdown()
+
+or use it as a context manager.
+"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Dict, Optional
+
+from orchestrator.heads import aclose_shared_clients
+from orchestrator.pipeline import Pipeline
+
+
+class PipelineService:
+    def __init__(self, pipeline: Optional[Pipeline] = None, name: str = "pipeline-service"):
+        self._pipeline = pipeline
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    @property
+    def pipeline(self) -> Pipeline:
+        # built on first use: callers that always pass their own pipeline to
+        # submit() never create the default one (and its .cache directory)
+        with self._lock:
+            if self._pipeline is None:
+                self._pipeline = Pipeline()
+            return self._pipeline
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def submit(self, contexts: Dict[str, str], pipeline: Optional[Pipeline] = None) -> concurrent.futures.Future:
+        """
+        Run the heads for `contexts` on the service loop and merge them.
+        `pipeline` overrides the default one (e.g. another model); the result
+        is the merged paper dict, or the pipeline's exception.
+        """
+        pipeline = pipeline or self.pipeline
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PipelineService is shut down")
+            return asyncio.run_coroutine_threadsafe(pipeline.arun(contexts), self._loop)
+
+    def run(self, contexts: Dict[str, str], pipeline: Optional[Pipeline] = None,
+            timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Blocking submit(); must not be called from the service loop itself."""
+        return self.submit(contexts, pipeline).result(timeout)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        Stop accepting work, optionally cancel running submissions, close the
+        loop's connection pool and stop the loop thread. Idempotent.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        async def _drain():
+            current = asyncio.current_task()
+            pending = [t for t in asyncio.all_tasks() if t is not current]
+            if cancel_pending:
+                for t in pending:
+                    t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await aclose_shared_clients()
+
+        stopped = asyncio.run_coroutine_threadsafe(_drain(), self._loop)
+        stopped.add_done_callback(lambda _: self._loop.call_soon_threadsafe(self._loop.stop))
+        if wait:
+            stopped.result()
+            self._thread.join()
+            self._loop.close()
+
+    def __enter__(self) -> "PipelineService":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
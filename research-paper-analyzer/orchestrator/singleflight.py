@@ -0,0 +1,104 @@
+# orchestrator/singleflight.py
+"""
+Single-flight de-duplication of head calls.
+
+Concurrent requests for the same cache key share one computation: the first
+caller (the leader) runs it and everyone else awaits the leader's future.
+Futures are concurrent.futures.Future objects in a process-wide registry, so
+followers may sit on other threads or other event loops (e.g. two app
+sessions, each with its own Pipeline.run loop).
+
+Across processes the leader also takes a lease on the key in the cache
+backend (SQLiteCache keeps a lease row). While another process holds the
+lease, the caller polls the cache for that process's result instead of
+paying for the same LLM call; an expired lease (its owner died) is taken over.
+"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from orchestrator.cache import CacheBackend
+from orchestrator.metrics import SOURCE_CACHE, SOURCE_SHARED, mark_source
+
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_POLL_SECONDS = 0.25
+
+
+class SingleFlight:
+    def __init__(self, lease_seconds: float = DEFAULT_LEASE_SECONDS, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.lease_waits = 0
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]],
+                  cache: Optional[CacheBackend] = None,
+                  lookup: Optional[Callable[[], Optional[Any]]] = None) -> Any:
+        """
+        Return compute()'s result, running it at most once per key at a time
+        in this process. With `cache`, compute() runs under the backend's
+        lease for `key`, and `lookup()` (default cache.get(key)) answers when
+        another process produced the result first. Followers receive the
+        leader's result or exception.
+        """
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = concurrent.futures.Future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            mark_source(SOURCE_SHARED)
+            return await asyncio.wrap_future(fut)
+        try:
+            if cache is not None:
+                result = await self._with_lease(key, compute, cache, lookup or (lambda: cache.get(key)))
+            else:
+                result = await compute()
+        except BaseException as exc:
+            fut.set_exception(exc)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def _with_lease(self, key: str, compute: Callable[[], Awaitable[Any]], cache: CacheBackend,
+                          lookup: Callable[[], Optional[Any]]) -> Any:
+        while True:
+            if cache.acquire_lease(key, self.lease_seconds):
+                try:
+                    # a process that held the lease may have finished since our miss
+                    cached = lookup()
+                    if cached is None:
+                        return await compute()
+                    mark_source(SOURCE_CACHE)
+                    return cached
+                finally:
+                    cache.release_lease(key)
+            # another process is computing this key: wait for its result
+            self.lease_waits += 1
+            await asyncio.sleep(self.poll_seconds)
+            cached = lookup()
+            if cached is not None:
+                # the other process's call answered for us
+                mark_source(SOURCE_SHARED)
+                return cached
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = len(self._inflight)
+        return {"leaders": self.leaders, "coalesced": self.coalesced,
+                "lease_waits": self.lease_waits, "in_flight": inflight}
+
+
+# Shared by every Pipeline in the process
+SINGLE_FLIGHT = SingleFlight()
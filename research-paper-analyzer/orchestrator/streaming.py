@@ -0,0 +1,243 @@
+# orchestrator/streaming.py
+"""
+Incremental validation of streamed JSON completions.
+
+A streamed head completion is fed chunk by chunk into JSONStreamValidator,
+which follows the JSON syntax character by character and checks every value
+as it starts against the head's Pydantic model (reduced to a Shape: which
+fields hold objects, arrays or scalars, and which may be null). As soon as
+the text can no longer become valid output -- a results head that opens an
+object instead of an array, authors given as a string, a stray bracket --
+StreamDivergedError is raised so the caller can drop the stream instead of
+paying for the rest of the generation. Once the top-level value closes the
+validator reports done, so trailing prose is never waited for either.
+
+Scalars are not type-checked (pydantic coerces "2023" to an int), and
+unknown keys are accepted (pydantic ignores them); the finished text still
+goes through json.loads and the head model.
+"""
+import inspect
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+
+# Characters a streamed completion may spend before its JSON value starts
+# (code fences, "Here is the JSON:")
+DEFAULT_MAX_PREAMBLE = 200
+
+_LITERAL_CHARS = set("0123456789+-.eEtrufalsn")
+_WHITESPACE = set(" \t\r\n")
+
+
+class StreamDivergedError(ValueError):
+    """The streamed completion can no longer become valid output for its schema."""
+
+
+@dataclass(frozen=True)
+class Shape:
+    """Structural outline of a JSON value: kind is object, array, scalar or any."""
+    kind: str
+    fields: Optional[Dict[str, "Shape"]] = None  # object keys; None accepts any key
+    item: Optional["Shape"] = None               # array items
+    nullable: bool = False
+
+    def child(self, key: str) -> "Shape":
+        if self.kind == "object" and self.fields is not None:
+            return self.fields.get(key, ANY)
+        return ANY
+
+
+ANY = Shape("any")
+
+
+def _type_shape(tp: Any) -> Shape:
+    if inspect.isclass(tp) and issubclass(tp, BaseModel):
+        return shape_of(tp)
+    if tp is Any:
+        return ANY
+    if inspect.isclass(tp) and issubclass(tp, dict):
+        return Shape("object")
+    return Shape("scalar")
+
+
+def _field_shape(model_field) -> Shape:
+    inner = _type_shape(model_field.type_)
+    if model_field.shape == SHAPE_SINGLETON:
+        shape = inner
+    elif getattr(model_field, "key_field", None) is not None:
+        shape = Shape("object")  # Dict[str, X]
+    else:
+        shape = Shape("array", item=inner)
+    if model_field.allow_none:
+        shape = Shape(shape.kind, shape.fields, shape.item, nullable=True)
+    return shape
+
+
+def shape_of(schema: Any) -> Shape:
+    """Shape of a Pydantic model class (custom __root__ models give their root's shape)."""
+    if isinstance(schema, Shape):
+        return schema
+    fields = schema.__fields__
+    if "__root__" in fields:
+        return _field_shape(fields["__root__"])
+    return Shape("object", {name: _field_shape(f) for name, f in fields.items()})
+
+
+@dataclass
+class _Frame:
+    container: str  # "object" or "array"
+    shape: Shape
+    path: str
+    expect: str     # object: key/colon/value/next; array: value/next
+    empty: bool = True
+    key: Optional[str] = None
+
+
+class JSONStreamValidator:
+    def __init__(self, schema: Any, max_preamble: int = DEFAULT_MAX_PREAMBLE):
+        """`schema` is a Pydantic model class or a Shape."""
+        self.shape = shape_of(schema)
+        self.max_preamble = max_preamble
+        self.done = False
+        self._parts: List[str] = []
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._key_chars: Optional[List[str]] = None
+        self._literal = False
+
+    @property
+    def text(self) -> str:
+        """Everything received so far."""
+        return "".join(self._parts)
+
+    @property
+    def json_text(self) -> Optional[str]:
+        """The complete top-level JSON value once done, else None."""
+        return self.text[self._start:self._end] if self.done else None
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk; returns True once the top-level value is complete."""
+        self._parts.append(chunk)
+        for ch in chunk:
+            if self.done:
+                break
+            self._step(ch)
+            self._pos += 1
+        return self.done
+
+    def _diverged(self, reason: str) -> StreamDivergedError:
+        return StreamDivergedError(f"{reason} (after {self._pos} characters)")
+
+    def _step(self, ch: str) -> None:
+        if self._start is None:
+            if ch in "{[":
+                self._start = self._pos
+                self._open(ch, self.shape, "$")
+            elif self._pos >= self.max_preamble:
+                raise self._diverged("no JSON value started")
+            return
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._key_chars is not None:
+                    self._stack[-1].key = "".join(self._key_chars)
+                    self._key_chars = None
+                return
+            if self._key_chars is not None:
+                self._key_chars.append(ch)
+            return
+        if self._literal:
+            if ch in _LITERAL_CHARS:
+                return
+            self._literal = False
+        if ch in _WHITESPACE:
+            return
+
+        frame = self._stack[-1]
+        if frame.container == "object":
+            if frame.expect == "key":
+                if ch == '"':
+                    self._in_string = True
+                    self._key_chars = []
+                    frame.expect = "colon"
+                elif ch == "}" and frame.empty:
+                    self._close()
+                else:
+                    raise self._diverged(f"unexpected {ch!r} where {frame.path} expects a key")
+            elif frame.expect == "colon":
+                if ch != ":":
+                    raise self._diverged(f"unexpected {ch!r} after key {frame.path}.{frame.key}")
+                frame.expect = "value"
+            elif frame.expect == "value":
+                frame.expect = "next"
+                self._start_value(ch, frame.shape.child(frame.key), f"{frame.path}.{frame.key}")
+            elif ch == ",":
+                frame.expect, frame.empty = "key", False
+            elif ch == "}":
+                self._close()
+            else:
+                raise self._diverged(f"unexpected {ch!r} in {frame.path}")
+        else:
+            if frame.expect == "value":
+                if ch == "]" and frame.empty:
+                    self._close()
+                    return
+                frame.expect = "next"
+                self._start_value(ch, frame.shape.item or ANY, f"{frame.path}[]")
+            elif ch == ",":
+                frame.expect, frame.empty = "value", False
+            elif ch == "]":
+                self._close()
+            else:
+                raise self._diverged(f"unexpected {ch!r} in {frame.path}")
+
+    def _start_value(self, ch: str, shape: Shape, path: str) -> None:
+        if ch in "{[":
+            kind = "object" if ch == "{" else "array"
+        elif ch == "n":
+            kind = "null"
+        elif ch == '"' or ch in "tf-0123456789":
+            kind = "scalar"
+        else:
+            raise self._diverged(f"unexpected {ch!r} at {path}")
+        self._check(kind, shape, path)
+        if ch in "{[":
+            self._open(ch, shape, path)
+        elif ch == '"':
+            self._in_string = True
+        else:
+            self._literal = True
+
+    def _check(self, kind: str, shape: Shape, path: str) -> None:
+        if shape.kind == "any":
+            return
+        if kind == "null":
+            if not shape.nullable:
+                raise self._diverged(f"{path} must not be null")
+            return
+        if kind != shape.kind:
+            raise self._diverged(f"{path} should be {shape.kind}, got {kind}")
+
+    def _open(self, ch: str, shape: Shape, path: str) -> None:
+        if not self._stack:
+            self._check("object" if ch == "{" else "array", shape, path)
+        if ch == "{":
+            self._stack.append(_Frame("object", shape, path, expect="key"))
+        else:
+            self._stack.append(_Frame("array", shape, path, expect="value"))
+
+    def _close(self) -> None:
+        self._stack.pop()
+        if not self._stack:
+            self.done = True
+            self._end = self._pos + 1
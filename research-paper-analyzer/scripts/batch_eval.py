@@ -4,13 +4,15 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import functools
 import json
 import os
 import sys
-import time
-from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, replace
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
 import pandas as pd
@@ -22,16 +24,25 @@ from rapidfuzz import fuzz
 REPO_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
-from ingestion.parser import parse_pdf_to_pages
-from orchestrator.heads import HeadRunner, OpenRouterLLM, LLMGenerationError
+from ingestion.parser import ParseOptions, parse_pdf_to_pages
+from ingestion.cache import ParseCache, DEFAULT_PARSE_CACHE_DIR
+from ingestion.tables import table_hints, validated_results
+from ingestion.ocr import DEFAULT_OCR_CACHE_DIR, OCRPageCache, tesseract_available
+from orchestrator.cache import CacheBackend, SQLiteCache, TieredCache
+from orchestrator.context import DEFAULT_HEAD_BUDGETS, build_contexts
+from orchestrator.heads import HeadRunner, AsyncOpenRouterLLM, LLMGenerationError, aclose_shared_clients
+from orchestrator.metrics import SOURCE_CACHE, percentile
+from orchestrator.ratelimit import configure_model
+from orchestrator.replay import RecordingLLM, ReplayLLM
 from orchestrator.pipeline import Pipeline
 from orchestrator.repair import Repairer
 from evidence.locator import attach_evidence_for_paper
-from orchestrator.merge import merge_heads_to_paper
 from schema.models import Paper
 
 ALIGNMENT_THRESHOLD = 72
 FUZZY_THRESHOLD = 65
+# dict extraction keeps font sizes for the section index; main() adds OCR and --keep-boilerplate
+BATCH_PARSE_OPTIONS = ParseOptions(extraction_mode="dict", strip_boilerplate=True)
 
 
 @dataclass
@@ -43,6 +54,18 @@ class PaperMetrics:
     alignment_pre: float
     alignment_post: float
     notes: Optional[str] = None
+    # LLM accounting from the paper's _meta["llm_metrics"]
+    llm_calls: int = 0
+    llm_retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    llm_cost: Optional[float] = None
+    head_cache_hits: int = 0
+    heads: int = 0
+    heads_wall_ms: float = 0.0
+    # metadata csv=False keeps a field out of metrics.csv
+    parse_cache_hit: bool = field(default=False, metadata={"csv": False})
+    head_latencies_ms: List[float] = field(default_factory=list, metadata={"csv": False})
 
 
 def discover_pdfs(folder: Path) -> List[Path]:
@@ -89,57 +112,91 @@ def evidence_coverage_metric(evidence: Dict[str, Any]) -> float:
     return covered / len(buckets)
 
 
-def process_pdf(
+@dataclass
+class PreparedPaper:
+    """Output of the CPU stage: everything the LLM and finishing stages need."""
+    slug: str
+    work_dir: Path
+    pages: List[Dict[str, Any]]
+    contexts: Dict[str, str]
+    from_tables: List[Dict[str, Any]]
+    parse_cache_hit: bool = False
+
+
+def prepare_paper(
     pdf_path: Path,
     output_dir: Path,
-    retries: int = 2,
-    backoff: float = 5.0,
-) -> PaperMetrics:
+    parse_cache: Optional[ParseCache] = None,
+    parse_options: ParseOptions = BATCH_PARSE_OPTIONS,
+    table_results: bool = False,
+    table_context: bool = True,
+    context_budgets: Optional[Dict[str, int]] = None,
+) -> PreparedPaper:
+    """Parse a PDF and build the head contexts (CPU-bound; runs in a worker process)."""
     slug = slugify(pdf_path)
     work_dir = output_dir / slug
     work_dir.mkdir(parents=True, exist_ok=True)
 
-    parsed = parse_pdf_to_pages(str(pdf_path), save_json=False, out_dir=str(work_dir))
+    hits_before = parse_cache.hits if parse_cache is not None else 0
+    parsed = parse_pdf_to_pages(
+        str(pdf_path),
+        replace(parse_options, extract_tables=table_results or table_context),
+        save_json=False,
+        out_dir=str(work_dir),
+        cache=parse_cache,
+    )
     pages = parsed.get("pages", [])
+    if parsed.get("needs_ocr") and not any(p.get("clean_text") for p in pages):
+        raise RuntimeError("No extractable text (scanned PDF); OCR unavailable or found nothing")
+
+    contexts = build_contexts(pages, parsed.get("sections", []), budgets=context_budgets)
+
+    candidates = parsed.get("table_results", [])
+    from_tables = validated_results(candidates) if table_results else []
+    if from_tables:
+        # opt-in: results read straight from tables replace the results head (no LLM call)
+        contexts.pop("results")
+    elif table_context:
+        # otherwise the table candidates are extra context for the results head
+        hints = table_hints(candidates)
+        if hints:
+            contexts["results"] = "\n\n".join(t for t in (contexts.get("results"), hints) if t)
+    return PreparedPaper(
+        slug=slug,
+        work_dir=work_dir,
+        pages=pages,
+        contexts=contexts,
+        from_tables=from_tables,
+        parse_cache_hit=parse_cache is not None and parse_cache.hits > hits_before,
+    )
 
-    metadata_ctx = pages[0]["clean_text"] if pages else ""
-    half = max(1, len(pages) // 2)
-    methods_ctx = "\n\n".join(p.get("clean_text", "") for p in pages[:half])
-    results_ctx = "\n\n".join(p.get("clean_text", "") for p in pages)
-    limitations_ctx = "\n\n".join(p.get("clean_text", "") for p in pages[-2:]) if pages else ""
-    summary_ctx = (pages[0].get("clean_text", "") if pages else "") + "\n\n" + (pages[-1].get("clean_text", "") if pages else "")
-
-    contexts = {
-        "metadata": metadata_ctx,
-        "methods": methods_ctx,
-        "results": results_ctx,
-        "limitations": limitations_ctx,
-        "summary": summary_ctx,
-    }
 
-    attempt = 0
-    while True:
-        try:
-            llm = OpenRouterLLM()
-            runner = HeadRunner(llm_client=llm)
-            pipeline = Pipeline(head_runner=runner, cache_dir=str(work_dir / ".cache"))
-            merged = pipeline.run(contexts)
-            pre_repair = merged
-            repairer = Repairer(llm_client=None)
-            repaired, applied, remaining = repairer.repair_json(pre_repair, max_attempts=1)
-            repaired.setdefault("_meta", {})
-            repaired["_meta"].setdefault("repair_log", [])
-            repaired["_meta"]["repair_log"].extend(applied)
-            repaired["_meta"]["remaining_errors"] = remaining
-            final_paper, evidence_report = attach_evidence_for_paper(repaired, pages, fuzzy_threshold=85.0)
-            final_paper.setdefault("_meta", {})
-            final_paper["_meta"]["evidence_report"] = evidence_report
-            break
-        except LLMGenerationError as err:
-            attempt += 1
-            if attempt > retries:
-                raise RuntimeError(f"LLM error after {retries} retries: {err}") from err
-            time.sleep(backoff * attempt)
+def _pipeline_for(prepared: PreparedPaper, llm: Optional[AsyncOpenRouterLLM],
+                  head_cache: Optional[CacheBackend] = None, fused: bool = False) -> Pipeline:
+    # one client (and connection pool) for every head and paper; failed heads
+    # are retried individually by the model's rate limiter. Without a shared
+    # head cache, results go to JSON files in the paper's work dir.
+    llm = llm or AsyncOpenRouterLLM(max_prompt_chars=None)
+    return Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(prepared.work_dir / ".cache"),
+                    cache=head_cache, fused=fused)
+
+
+def finish_paper(prepared: PreparedPaper, merged: Dict[str, Any]) -> PaperMetrics:
+    """Repair, attach evidence, write the paper's outputs and score it (CPU-bound)."""
+    work_dir = prepared.work_dir
+    if prepared.from_tables:
+        merged["results"] = prepared.from_tables
+        merged.setdefault("_meta", {})["results_source"] = "tables"
+    pre_repair = merged
+    repairer = Repairer(llm_client=None)
+    repaired, applied, remaining = repairer.repair_json(pre_repair, max_attempts=1)
+    repaired.setdefault("_meta", {})
+    repaired["_meta"].setdefault("repair_log", [])
+    repaired["_meta"]["repair_log"].extend(applied)
+    repaired["_meta"]["remaining_errors"] = remaining
+    final_paper, evidence_report = attach_evidence_for_paper(repaired, prepared.pages, fuzzy_threshold=85.0)
+    final_paper.setdefault("_meta", {})
+    final_paper["_meta"]["evidence_report"] = evidence_report
 
     (work_dir / "pre_repair.json").write_text(json.dumps(pre_repair, ensure_ascii=False, indent=2))
     (work_dir / "final.json").write_text(json.dumps(final_paper, ensure_ascii=False, indent=2))
@@ -158,19 +215,118 @@ def process_pdf(
     alignment_post, _, _ = compute_alignment(final_paper.get("summary", ""), final_paper.get("evidence", {}))
 
     return PaperMetrics(
-        paper_id=slug,
+        paper_id=prepared.slug,
         schema_pass=schema_ok,
         repair_count=repair_count,
         evidence_coverage=coverage,
         alignment_pre=alignment_pre,
         alignment_post=alignment_post,
         notes=None,
+        **llm_metric_fields(final_paper.get("_meta", {}).get("llm_metrics") or {}),
+    )
+
+
+def llm_metric_fields(llm_metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """PaperMetrics fields from a paper's _meta["llm_metrics"] record."""
+    totals = llm_metrics.get("totals") or {}
+    heads = llm_metrics.get("heads") or {}
+    return {
+        "llm_calls": totals.get("calls", 0),
+        "llm_retries": totals.get("retries", 0),
+        "prompt_tokens": totals.get("prompt_tokens", 0),
+        "completion_tokens": totals.get("completion_tokens", 0),
+        "llm_cost": totals.get("cost"),
+        "head_cache_hits": totals.get("cache_hits", 0),
+        "heads": totals.get("heads", 0),
+        "heads_wall_ms": totals.get("wall_ms", 0.0),
+        # latency percentiles describe model calls, so cache hits are left out
+        "head_latencies_ms": [h["latency_ms"] for h in heads.values() if h.get("source") != SOURCE_CACHE],
+    }
+
+
+def failed_metrics(slug: str, exc: BaseException) -> PaperMetrics:
+    return PaperMetrics(
+        paper_id=slug,
+        schema_pass=False,
+        repair_count=0,
+        evidence_coverage=0.0,
+        alignment_pre=0.0,
+        alignment_post=0.0,
+        notes=str(exc),
     )
 
 
+def process_pdf(
+    pdf_path: Path,
+    output_dir: Path,
+    llm: Optional[AsyncOpenRouterLLM] = None,
+    head_cache: Optional[CacheBackend] = None,
+    fused: bool = False,
+    **prepare_kwargs: Any,
+) -> PaperMetrics:
+    """Run one paper through every stage in the calling thread."""
+    prepared = prepare_paper(pdf_path, output_dir, **prepare_kwargs)
+    try:
+        merged = _pipeline_for(prepared, llm, head_cache, fused).run(prepared.contexts)
+    except LLMGenerationError as err:
+        raise RuntimeError(f"LLM error: {err}") from err
+    return finish_paper(prepared, merged)
+
+
+async def run_batch(
+    pdfs: List[Path],
+    output_dir: Path,
+    llm: AsyncOpenRouterLLM,
+    concurrency: int = 4,
+    executor: Optional[Executor] = None,
+    on_done: Optional[Callable[[PaperMetrics], None]] = None,
+    head_cache: Optional[CacheBackend] = None,
+    fused: bool = False,
+    **prepare_kwargs: Any,
+) -> List[PaperMetrics]:
+    """
+    Process papers with overlapping stages: parsing/context building and
+    repair/evidence run on `executor` (a process pool in main()), head calls
+    run on this loop. The CPU stages are bounded by the executor's workers
+    and at most `concurrency` papers are in the LLM stage, so papers being
+    parsed never hold LLM slots. Each paper's final.json is written as soon
+    as it finishes. Metrics are returned in `pdfs` order.
+    """
+    loop = asyncio.get_running_loop()
+    llm_gate = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(pdf_path: Path) -> PaperMetrics:
+        try:
+            prepared = await loop.run_in_executor(
+                executor, functools.partial(prepare_paper, pdf_path, output_dir, **prepare_kwargs)
+            )
+            try:
+                async with llm_gate:
+                    merged = await _pipeline_for(prepared, llm, head_cache, fused).arun(prepared.contexts)
+            except LLMGenerationError as err:
+                raise RuntimeError(f"LLM error: {err}") from err
+            metrics = await loop.run_in_executor(executor, finish_paper, prepared, merged)
+            metrics.parse_cache_hit = prepared.parse_cache_hit
+        except Exception as exc:
+            metrics = failed_metrics(slugify(pdf_path), exc)
+        if on_done is not None:
+            on_done(metrics)
+        return metrics
+
+    try:
+        return list(await asyncio.gather(*(one(p) for p in pdfs)))
+    finally:
+        await aclose_shared_clients()
+
+
 def aggregate_metrics(metrics: Iterable[PaperMetrics]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-    rows = [m.__dict__ for m in metrics]
-    df = pd.DataFrame(rows)
+    metrics = list(metrics)
+    columns = [f.name for f in fields(PaperMetrics) if f.metadata.get("csv", True)]
+    rows = [{k: getattr(m, k) for k in columns} for m in metrics]
+    df = pd.DataFrame(rows, columns=columns)
+    latencies = [ms for m in metrics for ms in m.head_latencies_ms]
+    heads = sum(m.heads for m in metrics)
+    costs = [m.llm_cost for m in metrics if m.llm_cost is not None]
     summary = {
         "Papers": len(df),
         "Schema pass": f"{df['schema_pass'].sum()}/{len(df)}",
@@ -180,6 +336,17 @@ def aggregate_metrics(metrics: Iterable[PaperMetrics]) -> Tuple[pd.DataFrame, Di
             f"{df['alignment_pre'].mean():.2f} → {df['alignment_post'].mean():.2f}"
             if not df.empty else "0.00 → 0.00"
         ),
+        "LLM calls": int(df["llm_calls"].sum()),
+        "LLM retries": int(df["llm_retries"].sum()),
+        "Tokens per paper": (
+            float((df["prompt_tokens"] + df["completion_tokens"]).mean()) if not df.empty else 0.0
+        ),
+        "Prompt tokens": int(df["prompt_tokens"].sum()),
+        "Completion tokens": int(df["completion_tokens"].sum()),
+        "LLM cost": sum(costs) if costs else None,
+        "Head cache hit rate": sum(m.head_cache_hits for m in metrics) / heads if heads else None,
+        "Head latency p50 ms": percentile(latencies, 50),
+        "Head latency p95 ms": percentile(latencies, 95),
     }
     return df, summary
 
@@ -217,8 +384,84 @@ def main(args: Optional[List[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="Batch evaluation for research PDFs")
     parser.add_argument("pdf_dir", type=str, help="Folder containing PDF files")
     parser.add_argument("--output", type=str, default="results/batch_eval", help="Output directory")
-    parser.add_argument("--retries", type=int, default=2, help="Retries for OpenRouter calls")
-    parser.add_argument("--backoff", type=float, default=5.0, help="Backoff seconds between retries")
+    parser.add_argument("--retries", type=int, default=4, help="Retries per failed OpenRouter call (429/5xx)")
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=1.0,
+        help="Base seconds of the jittered exponential backoff (Retry-After wins when longer)",
+    )
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute for the model")
+    parser.add_argument("--tpm", type=float, default=None, help="Tokens per minute for the model")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="Concurrent OpenRouter requests")
+    parser.add_argument("--concurrency", type=int, default=4, help="Papers in the LLM stage at the same time")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Processes for parsing and evidence matching (0 = threads in this process)",
+    )
+    parser.add_argument(
+        "--parse-cache-dir",
+        type=str,
+        default=str(DEFAULT_PARSE_CACHE_DIR),
+        help="Directory for the content-addressed parsed-PDF cache",
+    )
+    parser.add_argument("--no-parse-cache", action="store_true", help="Always re-parse PDFs")
+    parser.add_argument(
+        "--head-cache",
+        choices=("sqlite", "json"),
+        default="sqlite",
+        help="Head results in one SQLite file under the output dir, or JSON files per paper",
+    )
+    parser.add_argument("--record", type=str, default=None,
+                        help="Also store every completion in this archive (.jsonl.gz) for --replay")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="Serve completions from a recorded archive instead of OpenRouter")
+    parser.add_argument("--replay-latency", type=float, default=None,
+                        help="Seconds per replayed call (default: the recorded latency)")
+    parser.add_argument("--replay-jitter", type=float, default=0.0, help="Up to this many extra seconds per call")
+    parser.add_argument("--replay-error-rate", type=float, default=0.0,
+                        help="Share of replayed calls that fail with HTTP 429 (retried by the limiter)")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream head completions and drop those that stop matching the head schema early",
+    )
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="One LLM call for all heads per paper (failed heads are re-run on their own prompts)",
+    )
+    parser.add_argument(
+        "--keep-boilerplate",
+        action="store_true",
+        help="Keep running headers/footers and page numbers in page text",
+    )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=None,
+        help="OCR processes per scanned PDF when Tesseract is installed (default: the CPUs left "
+             "per --workers process, so the two pools share one CPU budget)",
+    )
+    parser.add_argument(
+        "--context-tokens",
+        type=float,
+        default=1.0,
+        help="Scale the per-head context token budgets (1.0 = defaults)",
+    )
+    parser.add_argument("--no-ocr", action="store_true", help="Never OCR scanned PDFs")
+    parser.add_argument(
+        "--table-results",
+        action="store_true",
+        help="Replace the results head with results read from tables when any pass validation",
+    )
+    parser.add_argument(
+        "--no-table-context",
+        action="store_true",
+        help="Do not add table candidates to the results head's context",
+    )
     opts = parser.parse_args(args)
 
     pdf_dir = Path(opts.pdf_dir)
@@ -232,32 +475,69 @@ def main(args: Optional[List[str]] = None) -> None:
 
     output_root = Path(opts.output)
     output_root.mkdir(parents=True, exist_ok=True)
-    metrics: List[PaperMetrics] = []
+    parse_cache = None if opts.no_parse_cache else ParseCache(opts.parse_cache_dir)
+    context_budgets = {head: int(n * opts.context_tokens) for head, n in DEFAULT_HEAD_BUDGETS.items()}
+    head_cache = None
+    if opts.head_cache == "sqlite":
+        head_cache = TieredCache(SQLiteCache(str(output_root / ".cache" / "heads.sqlite")))
+    if opts.replay:
+        llm = ReplayLLM(opts.replay, latency=opts.replay_latency, jitter=opts.replay_jitter,
+                        error_rate=opts.replay_error_rate)
+    else:
+        llm = AsyncOpenRouterLLM(max_prompt_chars=None, stream=True if opts.stream else None)
+    limits: Dict[str, Any] = {"max_retries": opts.retries, "backoff_base": opts.backoff}
+    for name in ("rpm", "tpm", "max_in_flight"):
+        if getattr(opts, name) is not None:
+            limits[name] = getattr(opts, name)
+    llm.limiter = configure_model(llm.model_id, **limits)
+    if opts.record:
+        llm = RecordingLLM(llm, opts.record)
+    # each parsing worker may start its own OCR pool; split the CPUs between them
+    cpus = os.cpu_count() or 1
+    ocr_workers = opts.ocr_workers
+    if ocr_workers is None:
+        ocr_workers = max(1, cpus // opts.workers) if opts.workers > 0 else cpus
+    ocr_cache = None
+    if not opts.no_ocr and tesseract_available():
+        ocr_cache = OCRPageCache(str(DEFAULT_OCR_CACHE_DIR))
+    parse_options = replace(
+        BATCH_PARSE_OPTIONS,
+        strip_boilerplate=not opts.keep_boilerplate,
+        ocr=ocr_cache is not None,
+        ocr_workers=ocr_workers,
+        ocr_cache=ocr_cache,
+    )
 
-    for pdf_path in pdfs:
-        slug = slugify(pdf_path)
-        try:
-            metrics.append(
-                process_pdf(
-                    pdf_path,
-                    output_dir=output_root,
-                    retries=opts.retries,
-                    backoff=opts.backoff,
-                )
-            )
-        except Exception as exc:
-            metrics.append(
-                PaperMetrics(
-                    paper_id=slug,
-                    schema_pass=False,
-                    repair_count=0,
-                    evidence_coverage=0.0,
-                    alignment_pre=0.0,
-                    alignment_post=0.0,
-                    notes=str(exc),
-                )
+    def _report(m: PaperMetrics) -> None:
+        status = "ok" if m.notes is None else f"failed: {m.notes}"
+        print(f"[{m.paper_id}] {status}", flush=True)
+
+    # CPU stages (parse, contexts, repair, evidence) go to worker processes,
+    # head calls share this process's event loop and connection pool
+    executor = ProcessPoolExecutor(max_workers=opts.workers) if opts.workers > 0 else None
+    try:
+        metrics = asyncio.run(
+            run_batch(
+                pdfs,
+                output_root,
+                llm,
+                concurrency=opts.concurrency,
+                executor=executor,
+                on_done=_report,
+                head_cache=head_cache,
+                fused=opts.fused,
+                parse_cache=parse_cache,
+                parse_options=parse_options,
+                table_results=opts.table_results,
+                table_context=not opts.no_table_context,
+                context_budgets=context_budgets,
             )
-            continue
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if opts.record:
+            llm.close()
 
     df, summary = aggregate_metrics(metrics)
     df.to_csv(output_root / "metrics.csv", index=False)
@@ -266,6 +546,17 @@ def main(args: Optional[List[str]] = None) -> None:
 
     (output_root / "summary.json").write_text(json.dumps(summary, indent=2))
     print(json.dumps(summary, indent=2))
+    if parse_cache is not None:
+        # the cache object was copied into the workers, so count hits from the papers
+        hits = sum(m.parse_cache_hit for m in metrics)
+        print(f"Parse cache: {hits}/{len(metrics)} papers served from {parse_cache.cache_dir}")
+    if head_cache is not None:
+        print(f"Head cache: {head_cache.stats()}")
+    print(f"Rate limiter: {llm.limiter.stats()}")
+    if opts.replay:
+        print(f"Replay: {llm.stats()}")
+    if opts.record:
+        print(f"Recorded {len(llm.archive)} completions in {opts.record}")
 
 
 if __name__ == "__main__":
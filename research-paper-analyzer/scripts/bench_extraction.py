@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Per-page latency of PyMuPDF extraction modes ("blocks" two-pass vs "dict" single-pass)."""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from ingestion.parser import EXTRACTION_MODES, page_from_pymupdf
+
+DEFAULT_SAMPLES = REPO_ROOT.parent / "samples"
+
+
+def time_mode(pdf_path: Path, mode: str, repeats: int) -> List[float]:
+    """Return per-page latencies (ms), best of `repeats` for each page."""
+    doc = fitz.open(str(pdf_path))
+    try:
+        latencies = []
+        for i in range(len(doc)):
+            best = float("inf")
+            for _ in range(repeats):
+                # fresh page object so PyMuPDF cannot reuse a cached text page
+                page = doc.load_page(i)
+                t0 = time.perf_counter()
+                page_from_pymupdf(page, i + 1, mode)
+                best = min(best, time.perf_counter() - t0)
+            latencies.append(best * 1000.0)
+        return latencies
+    finally:
+        doc.close()
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PyMuPDF extraction modes")
+    parser.add_argument("pdf_dir", nargs="?", default=str(DEFAULT_SAMPLES), help="Folder searched recursively for PDFs")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per page; the fastest is kept")
+    opts = parser.parse_args(args)
+
+    pdfs = sorted(Path(opts.pdf_dir).rglob("*.pdf"))
+    if not pdfs:
+        print("No PDF files found.")
+        return
+
+    totals: Dict[str, List[float]] = {m: [] for m in EXTRACTION_MODES}
+    print(f"{'paper':<40} {'pages':>5} " + " ".join(f"{m + ' ms/pg':>14}" for m in EXTRACTION_MODES))
+    for pdf in pdfs:
+        row = []
+        n_pages = 0
+        for mode in EXTRACTION_MODES:
+            lat = time_mode(pdf, mode, opts.repeats)
+            totals[mode].extend(lat)
+            n_pages = len(lat)
+            row.append(statistics.mean(lat) if lat else 0.0)
+        print(f"{pdf.stem[:40]:<40} {n_pages:>5} " + " ".join(f"{v:>14.2f}" for v in row))
+
+    print()
+    for mode, lat in totals.items():
+        if not lat:
+            continue
+        lat_sorted = sorted(lat)
+        p95 = lat_sorted[min(len(lat_sorted) - 1, int(0.95 * len(lat_sorted)))]
+        print(f"{mode:<8} pages={len(lat)} mean={statistics.mean(lat):.2f}ms "
+              f"median={statistics.median(lat):.2f}ms p95={p95:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
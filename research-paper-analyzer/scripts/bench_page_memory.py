@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""Memory held by parsed pages: page dicts vs compact Page objects (tracemalloc)."""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from ingestion.parser import compact_pages, parse_pdf_to_pages
+
+DEFAULT_SAMPLES = REPO_ROOT.parent / "samples"
+
+
+def retained_bytes(build: Callable[[], object]) -> int:
+    """Bytes still allocated after `build()` returns and temporaries are collected."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = build()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del obj
+    return current
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark memory of page representations")
+    parser.add_argument("pdf_dir", nargs="?", default=str(DEFAULT_SAMPLES), help="Folder searched recursively for PDFs")
+    opts = parser.parse_args(args)
+
+    pdfs = sorted(Path(opts.pdf_dir).rglob("*.pdf"))
+    if not pdfs:
+        print("No PDF files found.")
+        return
+
+    total_dict = total_compact = 0
+    print(f"{'paper':<40} {'pages':>5} {'dict KB':>10} {'compact KB':>11} {'saved':>7}")
+    for pdf in pdfs:
+        pages = parse_pdf_to_pages(str(pdf), save_json=False)["pages"]
+        # both forms are rebuilt from the same JSON so neither shares strings with `pages`
+        payload = json.dumps(pages)
+        as_dicts = retained_bytes(lambda: json.loads(payload))
+        as_compact = retained_bytes(lambda: compact_pages(json.loads(payload)))
+        total_dict += as_dicts
+        total_compact += as_compact
+        saved = 1.0 - as_compact / as_dicts if as_dicts else 0.0
+        print(f"{pdf.stem[:40]:<40} {len(pages):>5} {as_dicts / 1024:>10.1f} {as_compact / 1024:>11.1f} {saved:>7.1%}")
+
+    if total_dict:
+        print()
+        print(f"total dict={total_dict / 1024:.1f}KB compact={total_compact / 1024:.1f}KB "
+              f"saved={1.0 - total_compact / total_dict:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+End-to-end batch throughput on recorded LLM responses (no network).
+
+Record an archive once with a live model:
+  python scripts/batch_eval.py ../samples/<paper> --record results/responses.jsonl.gz
+then replay it at several concurrency levels, cold (empty caches) and warm:
+  python scripts/bench_replay.py results/responses.jsonl.gz --concurrency 1 4 8 --error-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from ingestion.cache import ParseCache
+from orchestrator.cache import SQLiteCache, TieredCache
+from orchestrator.ratelimit import ModelLimits
+from orchestrator.replay import ReplayLLM
+from scripts.batch_eval import run_batch
+
+DEFAULT_SAMPLES = REPO_ROOT.parent / "samples"
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batch_eval on a recorded response archive")
+    parser.add_argument("archive", type=str, help="Archive written by batch_eval.py --record")
+    parser.add_argument("pdf_dir", nargs="?", default=str(DEFAULT_SAMPLES), help="Folder searched recursively for PDFs")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Papers in flight, one run per value")
+    parser.add_argument("--latency", type=float, default=None, help="Seconds per call (default: recorded latency)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failing with HTTP 429")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute (default: unlimited)")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="Concurrent LLM calls")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Base seconds of the retry backoff")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for parsing and evidence (0 = threads; PyMuPDF is not thread-safe)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and injected errors")
+    opts = parser.parse_args(args)
+
+    pdfs = sorted(Path(opts.pdf_dir).rglob("*.pdf"))
+    if not pdfs:
+        print("No PDF files found.")
+        return
+
+    limits = ModelLimits(rpm=opts.rpm, max_in_flight=opts.max_in_flight, backoff_base=opts.backoff)
+    print(f"{'concurrency':>11} {'run':<5} {'seconds':>8} {'papers/s':>9} {'failed':>6} "
+          f"{'calls':>6} {'misses':>6} {'errors':>6} {'retries':>7}")
+    for concurrency in opts.concurrency:
+        work = Path(tempfile.mkdtemp(prefix="bench_replay_"))
+        executor = ProcessPoolExecutor(max_workers=opts.workers) if opts.workers > 0 else None
+        try:
+            parse_cache = ParseCache(str(work / "parse"))
+            head_cache = TieredCache(SQLiteCache(str(work / "heads.sqlite")))
+            for run in ("cold", "warm"):
+                llm = ReplayLLM(opts.archive, latency=opts.latency, jitter=opts.jitter,
+                                error_rate=opts.error_rate, seed=opts.seed, limits=limits)
+                t0 = time.perf_counter()
+                metrics = asyncio.run(run_batch(pdfs, work / run, llm, concurrency=concurrency, executor=executor,
+                                                head_cache=head_cache, parse_cache=parse_cache))
+                elapsed = time.perf_counter() - t0
+                stats = llm.stats()
+                failed = sum(m.notes is not None for m in metrics)
+                print(f"{concurrency:>11} {run:<5} {elapsed:>8.2f} {len(pdfs) / elapsed:>9.2f} {failed:>6} "
+                      f"{stats['calls']:>6} {stats['misses']:>6} {stats['injected_errors']:>6} {stats['retries']:>7}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
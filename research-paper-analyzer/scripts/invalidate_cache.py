@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Selectively drop cached head results.
+
+Examples:
+  python scripts/invalidate_cache.py --list
+  python scripts/invalidate_cache.py --model google/gemma-3n-e4b-it:free
+  python scripts/invalidate_cache.py --head results --template 1a2b3c4d5e6f
+  python scripts/invalidate_cache.py --stale-templates   # entries from edited prompts
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from orchestrator.cache import CacheBackend, open_head_cache
+from orchestrator.context import HEADS
+from orchestrator.heads import HeadRunner
+
+
+def current_templates() -> dict:
+    runner = HeadRunner()
+    current = {head: runner.template_version(head) for head in HEADS}
+    # heads answered by the fused prompt are tagged "fused:<head>"
+    current.update({f"fused:{head}": runner.template_version("fused") for head in HEADS})
+    return current
+
+
+def clear_stale_templates(cache: CacheBackend, head: Optional[str] = None, model: Optional[str] = None) -> int:
+    """Drop entries whose template version differs from the head's current prompt file."""
+    current = current_templates()
+    removed = 0
+    for ns in cache.namespaces():
+        if head is not None and ns["head"] != head:
+            continue
+        if model is not None and ns["model"] != model:
+            continue
+        if ns["head"] in current and ns["template"] != current[ns["head"]]:
+            removed += cache.clear(head=ns["head"], model=ns["model"], template=ns["template"])
+    return removed
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Invalidate cached head results by model, head or template")
+    parser.add_argument("--backend", choices=("sqlite", "json"), default="sqlite", help="Head cache backend")
+    parser.add_argument("--path", type=str, default=None,
+                        help="SQLite file or JSON directory (default .cache/heads.sqlite or .cache)")
+    parser.add_argument("--list", action="store_true", help="Show entry counts per head/model/template")
+    parser.add_argument("--model", type=str, default=None, help="Only entries from this model id")
+    parser.add_argument("--head", type=str, default=None, help="Only entries of this head")
+    parser.add_argument("--template", type=str, default=None, help="Only entries made with this template version")
+    parser.add_argument("--stale-templates", action="store_true",
+                        help="Only entries whose prompt template has since been edited")
+    parser.add_argument("--all", action="store_true", help="Drop every entry (needed when no filter is given)")
+    opts = parser.parse_args(args)
+
+    cache = open_head_cache(opts.backend, opts.path)
+    if opts.list:
+        current = current_templates()
+        print(f"{'head':<12} {'model':<45} {'template':<14} {'entries':>7}")
+        for ns in cache.namespaces():
+            stale = "" if current.get(ns["head"]) == ns["template"] else " (stale)"
+            print(f"{ns['head']:<12} {ns['model']:<45} {ns['template']:<14} {ns['entries']:>7}{stale}")
+        return
+
+    if opts.stale_templates:
+        removed = clear_stale_templates(cache, head=opts.head, model=opts.model)
+    elif opts.model is None and opts.head is None and opts.template is None:
+        if not opts.all:
+            parser.error("give --model, --head, --template or --stale-templates (or --all to drop everything)")
+        removed = cache.clear()
+    else:
+        removed = cache.clear(head=opts.head, model=opts.model, template=opts.template)
+    print(f"Removed {removed} cached head results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+"""
+Local OpenAI-compatible chat-completions server for load tests without network.
+
+Answers POST /v1/chat/completions with a schema-valid JSON answer for the
+head whose prompt template it recognises (the canned MockLLM answers; fused
+prompts get all heads), after a sampled latency. It can also push back like a
+real provider: 429s with Retry-After past a requests-per-minute window or a
+concurrency cap, and random 5xx failures. "stream": true is answered as
+server-sent events. GET /stats reports what the server saw.
+
+  python scripts/local_llm_server.py --port 8089 --latency-ms 800 --latency-dist lognormal \\
+      --rpm 120 --max-concurrent 8 --error-rate 0.02
+  OPENROUTER_BASE_URL=http://127.0.0.1:8089/v1 OPENROUTER_API_KEY=local \\
+      python scripts/batch_eval.py pdfs --rpm 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from orchestrator.context import HEADS, count_tokens
+from orchestrator.heads import MockLLM
+from orchestrator.prompts import PromptRegistry
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+@dataclass
+class ServerConfig:
+    latency_ms: float = 0.0               # mean latency per completion
+    latency_dist: str = "fixed"           # see LATENCY_DISTRIBUTIONS; uniform spans [0, 2 * mean]
+    latency_sigma: float = 0.5            # lognormal shape (the mean stays latency_ms)
+    rpm: Optional[float] = None           # sliding one-minute window; beyond it -> 429
+    max_concurrent: Optional[int] = None  # requests being served at once; beyond it -> 429
+    error_rate: float = 0.0               # share of admitted requests failing with a 5xx
+    error_codes: Tuple[int, ...] = (500, 502, 503)
+    stream_chunk_chars: int = 16          # characters per SSE chunk
+    seed: Optional[int] = None
+
+
+def _template_markers() -> List[Tuple[str, str]]:
+    # instruction text before the first placeholder identifies the head's prompt
+    prompts = PromptRegistry()
+    return [(head, prompts.get(head).prefix.strip()) for head in ("fused",) + HEADS]
+
+
+class StandInState:
+    def __init__(self, config: ServerConfig):
+        self.config = config
+        self.markers = _template_markers()
+        self.mock = MockLLM()
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._window: collections.deque = collections.deque()
+        self.in_flight = 0
+        self.counters = collections.Counter()
+
+    def admit(self) -> Optional[float]:
+        """None to serve the request, else the Retry-After seconds for a 429."""
+        cfg = self.config
+        with self._lock:
+            self.counters["requests"] += 1
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 60.0:
+                self._window.popleft()
+            if cfg.rpm and len(self._window) >= cfg.rpm:
+                self.counters["rate_limited"] += 1
+                return 60.0 - (now - self._window[0])
+            if cfg.max_concurrent and self.in_flight >= cfg.max_concurrent:
+                self.counters["rate_limited"] += 1
+                # a slot frees up about one completion later
+                return max(0.05, cfg.latency_ms / 1000.0)
+            self._window.append(now)
+            self.in_flight += 1
+            self.counters["max_in_flight"] = max(self.counters["max_in_flight"], self.in_flight)
+            return None
+
+    def leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def latency(self) -> float:
+        cfg = self.config
+        mean = cfg.latency_ms / 1000.0
+        with self._lock:
+            if mean <= 0 or cfg.latency_dist == "fixed":
+                return max(0.0, mean)
+            if cfg.latency_dist == "uniform":
+                return self._random.uniform(0.0, 2 * mean)
+            if cfg.latency_dist == "exponential":
+                return self._random.expovariate(1.0 / mean)
+            mu = math.log(mean) - cfg.latency_sigma ** 2 / 2
+            return self._random.lognormvariate(mu, cfg.latency_sigma)
+
+    def failure(self) -> Optional[int]:
+        with self._lock:
+            if self.config.error_rate > 0 and self._random.random() < self.config.error_rate:
+                self.counters["failed"] += 1
+                return self._random.choice(self.config.error_codes)
+        return None
+
+    def answer(self, messages: List[Dict[str, Any]]) -> str:
+        prompt = "\n\n".join(str(m.get("content") or "") for m in messages)
+        for head, marker in self.markers:
+            if marker and marker in prompt:
+                self.count(f"head:{head}")
+                if head == "fused":
+                    return json.dumps({h: json.loads(self.mock.head_response(h)) for h in HEADS})
+                return self.mock.head_response(head)
+        return self.mock.generate(prompt)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "in_flight": self.in_flight}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients exercise their connection pools
+    server_version = "local-llm-server"
+
+    @property
+    def state(self) -> StandInState:
+        return self.server.state
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        if getattr(self.server, "verbose", False):
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": {"message": message, "code": status}}, headers)
+
+    def do_GET(self) -> None:
+        path = self.path.rstrip("/")
+        if path == "/stats":
+            self._send_json(200, self.state.stats())
+        elif path in ("/v1/models", "/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "local/stand-in", "object": "model"}]})
+        else:
+            self._error(404, f"unknown path {self.path}")
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+            self._error(404, f"unknown path {self.path}")
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError:
+            self._error(400, "request body is not JSON")
+            return
+
+        retry_after = self.state.admit()
+        if retry_after is not None:
+            self._error(429, "Rate limit exceeded (local stand-in)", {
+                "Retry-After": str(max(1, math.ceil(retry_after))),
+                "retry-after-ms": str(int(retry_after * 1000)),
+            })
+            return
+        try:
+            time.sleep(self.state.latency())
+            status = self.state.failure()
+            if status is not None:
+                self._error(status, "Injected upstream failure (local stand-in)")
+                return
+            messages = request.get("messages") or []
+            content = self.state.answer(messages)
+            model = request.get("model") or "local/stand-in"
+            usage = {
+                "prompt_tokens": sum(count_tokens(str(m.get("content") or "")) for m in messages),
+                "completion_tokens": count_tokens(content),
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            if request.get("stream"):
+                self._stream(model, content, usage)
+            else:
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+        finally:
+            self.state.leave()
+
+    def _stream(self, model: str, content: str, usage: Dict[str, int]) -> None:
+        # unknown length: close the connection after the event stream
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model}
+        size = max(1, self.state.config.stream_chunk_chars)
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        events = [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]
+        events += [{"index": 0, "delta": {"content": piece}, "finish_reason": None} for piece in pieces]
+        events.append({"index": 0, "delta": {}, "finish_reason": "stop"})
+        try:
+            for i, choice in enumerate(events):
+                chunk = {**base, "choices": [choice]}
+                if i == len(events) - 1:
+                    chunk["usage"] = usage
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # the client dropped the stream early (e.g. it diverged from the schema)
+            self.state.count("streams_dropped")
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, config: Optional[ServerConfig] = None,
+                 verbose: bool = False) -> ThreadingHTTPServer:
+    """Serve on a daemon thread; port=0 picks a free port (server.server_address[1])."""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.state = StandInState(config or ServerConfig())
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, name="local-llm-server", daemon=True).start()
+    return server
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in for OpenRouter")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean latency per completion")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal shape parameter")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute before 429s")
+    parser.add_argument("--max-concurrent", type=int, default=None, help="Requests in service before 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 5xx")
+    parser.add_argument("--stream-chunk-chars", type=int, default=16, help="Characters per streamed chunk")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    opts = parser.parse_args(args)
+
+    config = ServerConfig(
+        latency_ms=opts.latency_ms,
+        latency_dist=opts.latency_dist,
+        latency_sigma=opts.latency_sigma,
+        rpm=opts.rpm,
+        max_concurrent=opts.max_concurrent,
+        error_rate=opts.error_rate,
+        stream_chunk_chars=opts.stream_chunk_chars,
+        seed=opts.seed,
+    )
+    server = start_server(opts.host, opts.port, config, verbose=opts.verbose)
+    host, port = server.server_address[:2]
+    print(f"Serving OpenAI-compatible completions on http://{host}:{port}/v1 (stats: /stats)", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(json.dumps(server.state.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# tests/test_async_llm.py
+import asyncio
+import json
+from types import SimpleNamespace
+
+from orchestrator import heads
+from orchestrator.heads import AsyncOpenRouterLLM, HeadRunner, MockLLM
+from orchestrator.pipeline import Pipeline
+
+def test_async_client_pool_is_shared_per_loop():
+    async def grab():
+        a = heads.shared_async_openai_client("k1")
+        b = heads.shared_async_openai_client("k2")
+        same = heads.shared_async_openai_client("k1")
+        await heads.aclose_shared_clients()
+        return a, b, same
+    a, b, same = asyncio.run(grab())
+    assert a is same and a is not b
+    # both keys ride on one httpx pool
+    assert a._client is b._client
+    assert heads.shared_openai_client("k1") is heads.shared_openai_client("k1")
+
+def test_async_openrouter_llm_uses_async_client(monkeypatch):
+    calls = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            message = SimpleNamespace(content='```json\n{"summary": "ok"}\n```')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    monkeypatch.setattr(heads, "shared_async_openai_client", lambda api_key, base_url=None: fake)
+    llm = AsyncOpenRouterLLM(api_key="test-key", model_id="test/model", max_prompt_chars=None)
+    out = asyncio.run(HeadRunner(llm_client=llm).arun_summary_head("context"))
+    assert out.summary == "ok"
+    assert calls[0]["model"] == "test/model" and calls[0]["response_format"] == {"type": "json_object"}
+
+def test_pipeline_accepts_sync_only_backends(tmp_path):
+    class SyncOnly:
+        def generate(self, prompt, temperature=0.0, max_tokens=512):
+            return MockLLM().generate(prompt)
+    pipeline = Pipeline(head_runner=HeadRunner(llm_client=SyncOnly()), cache_dir=str(tmp_path))
+    merged = pipeline.run({"summary": "Abstract: something"})
+    assert merged["summary"].startswith("We introduce")
@@ -0,0 +1,74 @@
+# tests/test_batch_eval.py
+import asyncio
+import json
+
+import pytest
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from orchestrator.heads import MockLLM
+from scripts import batch_eval
+from scripts.batch_eval import run_batch
+
+@pytest.fixture(autouse=True)
+def _no_punkt(monkeypatch):
+    # the alignment metric's sentence splitter needs nltk data that may not be downloaded
+    monkeypatch.setattr(batch_eval, "sent_tokenize", lambda text: text.split(". "))
+
+def _make_pdf(path, title):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    c.drawString(72, 720, title)
+    c.drawString(72, 700, "Abstract")
+    c.drawString(72, 680, "We introduce HybridAttentionNet and report 78.4% accuracy on TinyImageNet.")
+    c.save()
+
+def test_run_batch_writes_each_paper_and_keeps_order(tmp_path):
+    pdfs = []
+    for name in ("b_paper", "a_paper", "c_paper"):
+        path = tmp_path / f"{name}.pdf"
+        _make_pdf(path, name)
+        pdfs.append(path)
+    out = tmp_path / "out"
+    finished = []
+    metrics = asyncio.run(
+        run_batch(pdfs, out, MockLLM(), concurrency=2, on_done=lambda m: finished.append(m.paper_id),
+                  table_results=False)
+    )
+    assert [m.paper_id for m in metrics] == ["b_paper", "a_paper", "c_paper"]
+    assert sorted(finished) == ["a_paper", "b_paper", "c_paper"]
+    for m in metrics:
+        assert m.notes is None
+        final = json.loads((out / m.paper_id / "final.json").read_text())
+        assert final["summary"].startswith("We introduce")
+
+def test_run_batch_records_failures_without_stopping(tmp_path):
+    good = tmp_path / "good.pdf"
+    _make_pdf(good, "good")
+    missing = tmp_path / "missing.pdf"
+    metrics = asyncio.run(run_batch([missing, good], tmp_path / "out", MockLLM(), table_results=False))
+    assert metrics[0].notes and metrics[1].notes is None
+
+def test_parsing_does_not_wait_for_llm_slots(tmp_path, monkeypatch):
+    events = []
+
+    class SlowLLM(MockLLM):
+        async def agenerate(self, prompt, temperature=0.0, max_tokens=512):
+            await asyncio.sleep(0.1)
+            events.append("llm")
+            return self.generate(prompt, temperature, max_tokens)
+
+    prepare = batch_eval.prepare_paper
+
+    def recording_prepare(pdf_path, *args, **kwargs):
+        events.append(f"prepare:{pdf_path.stem}")
+        return prepare(pdf_path, *args, **kwargs)
+
+    monkeypatch.setattr(batch_eval, "prepare_paper", recording_prepare)
+    pdfs = []
+    for name in ("p1", "p2", "p3"):
+        _make_pdf(tmp_path / f"{name}.pdf", name)
+        pdfs.append(tmp_path / f"{name}.pdf")
+    metrics = asyncio.run(run_batch(pdfs, tmp_path / "out", SlowLLM(), concurrency=1, table_results=False))
+    assert all(m.notes is None for m in metrics)
+    # every paper is parsed while the first one is still in the LLM stage
+    assert all(e.startswith("prepare:") for e in events[:3])
@@ -0,0 +1,26 @@
+from ingestion.boilerplate import remove_boilerplate
+
+def _page(no, body):
+    blocks = [
+        {"bbox": [72, 30, 300, 40], "text": "Preprint. Under review."},
+        {"bbox": [72, 100, 500, 300], "text": body},
+        {"bbox": [300, 750, 310, 760], "text": str(no)},
+    ]
+    return {"page_no": no, "raw_text": "", "blocks": blocks,
+            "clean_text": "\n\n".join(b["text"] for b in blocks)}
+
+def test_repeating_headers_and_page_numbers_removed():
+    bodies = ["Introduction text.", "Method details.", "Experiments setup.", "Results table.", "Conclusion."]
+    pages = [_page(i, body) for i, body in enumerate(bodies, start=1)]
+    pages[0]["blocks"].insert(1, {"bbox": [11, 228, 38, 564], "text": "arXiv:2502.00401v2 [cs.LG] 4 Jun 2025"})
+    report = remove_boilerplate(pages)
+    assert report["blocks_removed"] == 11
+    assert report["bytes_removed"] > 0
+    assert [p["clean_text"] for p in pages] == bodies
+
+def test_short_documents_untouched():
+    pages = [_page(i, "Body") for i in range(1, 3)]
+    before = [p["clean_text"] for p in pages]
+    report = remove_boilerplate(pages)
+    assert report["bytes_removed"] == 0
+    assert [p["clean_text"] for p in pages] == before
@@ -0,0 +1,52 @@
+from ingestion.sections import build_section_index
+from orchestrator.context import build_context, build_contexts, count_tokens, truncate_to_tokens
+
+def _block(text, size=10.0):
+    return {"bbox": [72, 100, 500, 120], "text": text, "font_size": size}
+
+FILLER = "This paragraph describes general motivation for the broad research area at some length. "
+
+PAGES = [
+    {"page_no": 1, "blocks": [
+        _block("GreatNet: A Great Paper", 17.0),
+        _block("Jane Doe, University of Somewhere, jane@example.org"),
+        _block("Abstract", 12.0),
+        _block("We propose GreatNet, which outperforms prior work on CIFAR-10."),
+        _block("1 Introduction", 12.0),
+        _block(FILLER * 4),
+    ]},
+    {"page_no": 2, "blocks": [
+        _block("2 Method", 12.0),
+        _block("GreatNet stacks attention layers in an encoder-decoder architecture."),
+        _block("3 Results", 12.0),
+        _block("Table 1 reports accuracy: GreatNet reaches 94.5% vs 93.1% for the baseline."),
+        _block("4 Limitations", 12.0),
+        _block("A limitation is that GreatNet fails on long inputs; future work will fix this."),
+        _block("References", 12.0),
+        _block("[1] Someone. Results on accuracy 99.9%. 2020."),
+    ]},
+]
+SECTIONS = build_section_index(PAGES)
+
+def test_contexts_pick_head_specific_blocks():
+    ctx = build_contexts(PAGES, SECTIONS)
+    assert "94.5%" in ctx["results"]
+    assert "encoder-decoder" in ctx["methods"]
+    assert "fails on long inputs" in ctx["limitations"]
+    assert ctx["metadata"].startswith("GreatNet: A Great Paper")
+    assert "We propose GreatNet" in ctx["summary"]
+    # reference lists never feed a head
+    assert all("Someone" not in c for c in ctx.values())
+
+def test_budget_is_respected_and_order_kept():
+    ctx = build_context("results", PAGES, SECTIONS, budget=30)
+    assert count_tokens(ctx) <= 30
+    assert "94.5%" in ctx
+    full = build_context("summary", PAGES, SECTIONS, budget=2000)
+    assert full.index("We propose") < full.index("motivation")
+    assert "fails on long inputs" not in full
+
+def test_truncate_to_tokens():
+    text = FILLER * 10
+    assert count_tokens(truncate_to_tokens(text, 25)) <= 25
+    assert truncate_to_tokens("short", 25) == "short"
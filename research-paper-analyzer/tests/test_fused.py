@@ -0,0 +1,79 @@
+# tests/test_fused.py
+import json
+
+from orchestrator.context import fuse_contexts
+from orchestrator.heads import FUSED_MAX_TOKENS, HeadRunner, MockLLM, OpenRouterLLM
+from orchestrator.pipeline import Pipeline
+from schema.head_models import MetadataOutput, ResultsOutput
+
+CONTEXTS = {
+    "metadata": "Hybrid Attention\n\nAbstract: we study attention",
+    "methods": "We propose HybridAttentionNet",
+    "results": "Table 1: 78.4% on TinyImageNet",
+    "limitations": "Limitations: small datasets",
+    "summary": "Abstract: we study attention\n\nResults: 78.4%",
+}
+
+class CountingLLM(MockLLM):
+    def __init__(self, break_head=None):
+        self.prompts = []
+        self.max_tokens = []
+        self.break_head = break_head
+
+    def generate(self, prompt, temperature=0.0, max_tokens=512):
+        self.prompts.append(prompt)
+        self.max_tokens.append(max_tokens)
+        raw = super().generate(prompt, temperature, max_tokens)
+        if self.break_head and "for ALL HEADS" in prompt:
+            data = json.loads(raw)
+            data[self.break_head] = 42
+            raw = json.dumps(data)
+        return raw
+
+    agenerate = None
+
+    def fused_calls(self):
+        return sum("for ALL HEADS" in p for p in self.prompts)
+
+def test_fuse_contexts_keeps_shared_blocks_once():
+    fused = fuse_contexts(CONTEXTS)
+    assert fused.count("Abstract: we study attention") == 1
+    assert fused.index("Hybrid Attention") < fused.index("We propose")
+
+def test_fused_output_splits_into_head_models():
+    runner = HeadRunner(llm_client=MockLLM())
+    outputs, errors = runner.run_fused_heads(fuse_contexts(CONTEXTS))
+    assert not errors
+    assert isinstance(outputs["metadata"], MetadataOutput)
+    assert isinstance(outputs["results"], ResultsOutput)
+    assert set(outputs) == set(CONTEXTS)
+
+def test_fused_pipeline_makes_one_call_and_caches_per_head(tmp_path):
+    llm = CountingLLM()
+    pipeline = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path), fused=True)
+    paper = pipeline.run(CONTEXTS)
+    assert len(llm.prompts) == 1 and llm.max_tokens == [FUSED_MAX_TOKENS]
+    assert paper["title"] and paper["results"] and paper["summary"]
+    again = pipeline.run(CONTEXTS)
+    assert again["title"] == paper["title"] and again["methods"] == paper["methods"]
+    assert len(llm.prompts) == 1
+
+def test_invalid_head_falls_back_to_its_own_prompt(tmp_path):
+    llm = CountingLLM(break_head="methods")
+    pipeline = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path), fused=True)
+    paper = pipeline.run(CONTEXTS)
+    assert llm.fused_calls() == 1 and len(llm.prompts) == 2
+    assert "METHODS/ARCHITECTURE" in llm.prompts[1]
+    assert paper["methods"][0]["name"]
+
+def test_explicit_max_tokens_is_not_capped():
+    llm = OpenRouterLLM(api_key="test-key", model_id="some/model")
+    first, _ = llm._request_plan("prompt", 0.0, 1500)
+    default, _ = llm._request_plan("prompt", 0.0, None)
+    assert first["max_tokens"] == 1500
+    assert default["max_tokens"] == OpenRouterLLM.DEFAULT_MAX_TOKENS
+
+def test_fused_cache_key_reports_the_fused_budget():
+    runner = HeadRunner(llm_client=OpenRouterLLM(api_key="test-key", model_id="some/model"))
+    assert runner.generation_params("summary")["max_tokens"] == OpenRouterLLM.DEFAULT_MAX_TOKENS
+    assert runner.generation_params("fused")["max_tokens"] == FUSED_MAX_TOKENS
@@ -0,0 +1,154 @@
+# tests/test_head_cache.py
+import multiprocessing
+import time
+
+import pytest
+
+from orchestrator.cache import JsonFileCache, SQLiteCache, open_head_cache
+from orchestrator.heads import HeadRunner, MockLLM
+from orchestrator.pipeline import Pipeline
+
+@pytest.fixture(params=["sqlite", "json"])
+def cache(request, tmp_path):
+    location = tmp_path / ("heads.sqlite" if request.param == "sqlite" else "heads")
+    return open_head_cache(request.param, str(location))
+
+def test_roundtrip_and_namespaced_clear(cache):
+    assert cache.get("k1") is None
+    cache.put("k1", {"summary": "a"}, head="summary", model="m1")
+    cache.put("k2", {"summary": "b"}, head="summary", model="m2")
+    cache.put("k3", {"methods": []}, head="methods", model="m1")
+    assert cache.get("k1") == {"summary": "a"}
+    assert cache.clear(model="m1", head="summary") == 1
+    assert cache.get("k1") is None and cache.get("k3") == {"methods": []}
+    assert cache.clear(model="m2") == 1
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["hits"] == 2 and stats["misses"] == 2
+    assert cache.clear() == 1
+
+def test_sqlite_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), max_bytes=300)
+    for i in range(3):
+        cache.put(f"k{i}", {"text": "x" * 80})
+        time.sleep(0.01)
+    cache.get("k0")  # k0 is now the most recently used
+    cache.put("k3", {"text": "x" * 80})
+    assert cache.get("k0") is not None and cache.get("k1") is None
+    assert cache.stats()["evictions"] >= 1
+
+def test_sqlite_ttl(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), ttl_seconds=0.05)
+    cache.put("k", [1, 2])
+    assert cache.get("k") == [1, 2]
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+def _writer(path, start):
+    cache = SQLiteCache(path)
+    for i in range(start, start + 25):
+        cache.put(f"k{i}", {"i": i}, head="h")
+
+def test_sqlite_shared_by_processes(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    SQLiteCache(path)
+    procs = [multiprocessing.Process(target=_writer, args=(path, n * 25)) for n in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+    assert SQLiteCache(path).stats()["entries"] == 100
+
+def test_pipeline_uses_given_backend(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "heads.sqlite"))
+    pipeline = Pipeline(head_runner=HeadRunner(llm_client=MockLLM()), cache=cache)
+    first = pipeline.run({"summary": "Abstract: something"})
+    second = pipeline.run({"summary": "Abstract: something"})
+    assert first["summary"] == second["summary"]
+    assert cache.stats()["hits"] == 1
+    assert cache.clear(model="MockLLM") == 1
+
+def test_pipeline_json_cache_honours_cache_dir(tmp_path):
+    Pipeline(cache_dir=str(tmp_path / "heads")).run({"summary": "Abstract: something"})
+    assert len(list((tmp_path / "heads").glob("*.json"))) == 1
+    assert isinstance(Pipeline(cache_dir=str(tmp_path / "heads")).cache, JsonFileCache)
+
+def test_cache_key_covers_model_template_and_params(tmp_path, monkeypatch):
+    import shutil
+    from orchestrator import heads
+
+    prompts = tmp_path / "prompts"
+    shutil.copytree(heads.PROMPTS_DIR, prompts)
+    monkeypatch.setattr(heads, "PROMPTS_DIR", prompts)
+    cache = SQLiteCache(str(tmp_path / "heads.sqlite"))
+    ctx = {"summary": "Abstract: something"}
+
+    class OtherModel(MockLLM):
+        model_id = "other/model"
+
+    Pipeline(head_runner=HeadRunner(llm_client=MockLLM()), cache=cache).run(ctx)
+    Pipeline(head_runner=HeadRunner(llm_client=OtherModel()), cache=cache).run(ctx)
+    Pipeline(head_runner=HeadRunner(llm_client=MockLLM(), temperature=0.7), cache=cache).run(ctx)
+    assert cache.stats()["hits"] == 0 and cache.stats()["entries"] == 3
+
+    # editing the prompt file makes old entries unreachable and stale
+    old_version = HeadRunner().template_version("summary")
+    path = prompts / "summary_prompt.txt"
+    path.write_text(path.read_text(encoding="utf-8") + "\nBe brief.", encoding="utf-8")
+    assert HeadRunner().prompts.reload() == {"summary": HeadRunner().template_version("summary")}
+    assert HeadRunner().template_version("summary") != old_version
+    Pipeline(head_runner=HeadRunner(llm_client=MockLLM()), cache=cache).run(ctx)
+    assert cache.stats()["hits"] == 0
+
+    from scripts.invalidate_cache import clear_stale_templates
+    assert clear_stale_templates(cache) == 3
+    assert [ns["template"] for ns in cache.namespaces()] == [HeadRunner().template_version("summary")]
+
+def test_sqlite_cache_adds_template_column_to_old_files(tmp_path):
+    import sqlite3
+    path = tmp_path / "old.sqlite"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, head TEXT NOT NULL DEFAULT '', "
+                 "model TEXT NOT NULL DEFAULT '', payload TEXT NOT NULL, size INTEGER NOT NULL, "
+                 "created REAL NOT NULL, accessed REAL NOT NULL)")
+    conn.execute("INSERT INTO entries VALUES ('k', 'summary', 'm', '{}', 2, 0, 0)")
+    conn.commit()
+    conn.close()
+    cache = SQLiteCache(str(path))
+    assert cache.namespaces() == [{"head": "summary", "model": "m", "template": "", "entries": 1}]
+
+def test_memory_cache_bounds_entries_and_bytes():
+    from orchestrator.cache import MemoryCache
+    cache = MemoryCache(max_entries=2, max_bytes=None)
+    for k in ("a", "b", "c"):
+        cache.put(k, {"k": k})
+    assert cache.get("a") is None and cache.get("c") == {"k": "c"}
+    small = MemoryCache(max_entries=10, max_bytes=30)
+    small.put("a", {"t": "x" * 10})
+    small.put("b", {"t": "x" * 10})
+    assert small.get("a") is None and small.stats()["evictions"] == 1
+
+def test_tiered_cache_serves_parsed_objects_from_memory(tmp_path, monkeypatch):
+    from orchestrator.cache import TieredCache
+    disk = SQLiteCache(str(tmp_path / "heads.sqlite"))
+    cache = TieredCache(disk)
+    pipeline = Pipeline(head_runner=HeadRunner(llm_client=MockLLM()), cache=cache)
+    first = pipeline.run({"summary": "Abstract: something", "methods": "We propose X"})
+
+    def no_disk(key):
+        raise AssertionError("memory tier should have answered")
+    monkeypatch.setattr(disk, "get", no_disk)
+    second = pipeline.run({"summary": "Abstract: something", "methods": "We propose X"})
+    assert first["_meta"].pop("llm_metrics")["totals"]["cache_hits"] == 0
+    assert second["_meta"].pop("llm_metrics")["totals"]["cache_hits"] == 2
+    assert second == first
+    # callers get their own copy; mutating it leaves the cached head intact
+    second["methods"].clear()
+    assert pipeline.run({"summary": "Abstract: something", "methods": "We propose X"})["methods"]
+    assert cache.stats()["memory"]["hits"] == 4
+
+    # a fresh process (new memory tier) is served from disk and promotes the entry
+    monkeypatch.undo()
+    fresh = TieredCache(disk)
+    Pipeline(head_runner=HeadRunner(llm_client=MockLLM()), cache=fresh).run({"summary": "Abstract: something"})
+    assert fresh.stats()["hits"] == 1 and fresh.memory.stats()["entries"] == 1
@@ -2,6 +2,9 @@
 import os
 from pathlib import Path
 import tempfile
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
 from reportlab.pdfgen import canvas
 from ingestion import parser
 
@@ -22,3 +25,117 @@ def test_parser_extracts_text(tmp_path):
     page0 = result["pages"][0]
     # clean_text should contain the sample text
     assert sample_text in page0["clean_text"]
+
+def make_multipage_pdf(path: str, n_pages: int = 7):
+    c = canvas.Canvas(path)
+    for i in range(n_pages):
+        c.drawString(72, 800, f"Page {i + 1} heading")
+        c.drawString(72, 760, f"Body text for page number {i + 1}.")
+        c.showPage()
+    c.save()
+
+def test_parallel_parse_matches_serial(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    make_multipage_pdf(str(pdf_path))
+    serial = parser.parse_pdf_to_pages(str(pdf_path), save_json=False)
+    parallel = parser.parse_pdf_to_pages(str(pdf_path), parser.ParseOptions(workers=3, chunk_size=2), save_json=False)
+    assert [p["page_no"] for p in parallel["pages"]] == list(range(1, 8))
+    assert parallel == serial
+
+def test_iter_pages_streams_to_jsonl(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    make_multipage_pdf(str(pdf_path), n_pages=3)
+    parsed = parser.parse_pdf_to_pages(str(pdf_path), save_json=False)
+    streamed = list(parser.iter_pages(str(pdf_path)))
+    assert streamed == parsed["pages"]
+
+    out_path = tmp_path / "multi.jsonl"
+    footer = parser.write_pages_jsonl(str(pdf_path), str(out_path))
+    assert footer["n_pages"] == 3
+    pages = parser.JsonlPages(str(out_path))
+    # re-iterable: every pass re-reads the file
+    assert list(pages) == parsed["pages"]
+    assert list(pages) == parsed["pages"]
+
+def test_single_pass_extraction_matches_two_pass(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    make_multipage_pdf(str(pdf_path), n_pages=3)
+    single = parser.parse_pdf_to_pages(str(pdf_path), parser.ParseOptions(extraction_mode="dict"), save_json=False)
+    double = parser.parse_pdf_to_pages(str(pdf_path), parser.ParseOptions(extraction_mode="blocks"), save_json=False)
+    # two-pass stays the default; "dict" is opt-in
+    assert parser.parse_pdf_to_pages(str(pdf_path), save_json=False) == double
+    for a, b in zip(single["pages"], double["pages"]):
+        # dict mode additionally records each block's font size
+        assert [(x["bbox"], x["text"]) for x in a["blocks"]] == [(x["bbox"], x["text"]) for x in b["blocks"]]
+        assert all("font_size" in x for x in a["blocks"])
+        assert a["clean_text"] == b["clean_text"]
+
+def test_weak_pages_refined_with_pdfplumber(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    make_multipage_pdf(str(pdf_path), n_pages=3)
+    pages = parser.parse_pdf_to_pages(str(pdf_path), save_json=False)["pages"]
+    # Simulate a page whose PyMuPDF text layer came back empty / garbled
+    pages[1] = dict(pages[1], clean_text="", blocks=[])
+    pages[2] = dict(pages[2], clean_text="�" * 40)
+    assert parser.is_weak_page(pages[1]) and parser.is_weak_page(pages[2])
+
+    replaced = parser.refine_weak_pages(str(pdf_path), pages)
+    assert replaced == [2, 3]
+    assert [p["parser_used"] for p in pages] == ["pymupdf", "pdfplumber", "pdfplumber"]
+    assert "Body text for page number 2." in pages[1]["clean_text"]
+
+def test_page_fallback_keeps_good_pages(tmp_path):
+    pdf_path = tmp_path / "multi.pdf"
+    make_multipage_pdf(str(pdf_path), n_pages=3)
+    res = parser.parse_pdf_to_pages(str(pdf_path), parser.ParseOptions(fallback="page"), save_json=False)
+    assert res["parser_used"] == "pymupdf"
+    assert all(p["parser_used"] == "pymupdf" for p in res["pages"])
+
+def test_compact_pages_read_like_dicts(tmp_path):
+    from evidence.locator import find_query_in_pages
+    pdf_path = tmp_path / "multi.pdf"
+    make_multipage_pdf(str(pdf_path), n_pages=3)
+    plain = parser.parse_pdf_to_pages(str(pdf_path), save_json=False)
+    compact = parser.parse_pdf_to_pages(str(pdf_path), parser.ParseOptions(compact=True), save_json=False)
+    for d, c in zip(plain["pages"], compact["pages"]):
+        assert isinstance(c, parser.Page)
+        assert c["clean_text"] == d["clean_text"] and c.get("page_no") == d["page_no"]
+        assert [b["text"] for b in c["blocks"]] == [b["text"] for b in d["blocks"]]
+        assert c.to_dict()["blocks"][0]["bbox"] == d["blocks"][0]["bbox"]
+    query = "Page 3 heading"
+    assert find_query_in_pages(compact["pages"], query) == find_query_in_pages(plain["pages"], query)
+    # blocks that are not substrings of clean_text, and blocks without bbox
+    page = parser.Page(1, "raw", "alpha\n\nbeta", [{"bbox": None, "text": "beta"}, {"bbox": None, "text": "gamma"}], "ocr")
+    assert [b.to_dict() for b in page.blocks] == [{"bbox": None, "text": "beta"}, {"bbox": None, "text": "gamma"}]
+    assert page.clean_text == "alpha\n\nbeta"
+
+def test_refine_falls_back_to_serial_when_pool_breaks(tmp_path, monkeypatch):
+    class BrokenPool:
+        def __init__(self, max_workers):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, fn, args):
+            raise BrokenProcessPool("worker died")
+
+    pdf_path = tmp_path / "multi.pdf"
+    make_multipage_pdf(str(pdf_path), n_pages=3)
+    pages = parser.parse_pdf_to_pages(str(pdf_path), save_json=False)["pages"]
+    pages[1] = dict(pages[1], clean_text="", blocks=[])
+    pages[2] = dict(pages[2], clean_text="", blocks=[])
+    monkeypatch.setattr(parser, "ProcessPoolExecutor", BrokenPool)
+    with pytest.warns(UserWarning, match="re-extracting serially"):
+        assert parser.refine_weak_pages(str(pdf_path), pages, workers=2) == [2, 3]
+
+    def unreadable(args):
+        raise ValueError("broken xref")
+
+    monkeypatch.setattr(parser, "_parse_pdfplumber_pages", unreadable)
+    pages[1] = dict(pages[1], clean_text="", blocks=[])
+    with pytest.warns(UserWarning, match="broken xref"):
+        assert parser.refine_weak_pages(str(pdf_path), pages) == []
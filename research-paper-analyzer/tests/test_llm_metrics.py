@@ -0,0 +1,99 @@
+# tests/test_llm_metrics.py
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from orchestrator.heads import AsyncOpenRouterLLM, HeadRunner, OpenRouterLLM
+from orchestrator.metrics import percentile
+from orchestrator.pipeline import Pipeline
+from orchestrator.ratelimit import configure_model
+from scripts.batch_eval import PaperMetrics, aggregate_metrics
+from scripts.local_llm_server import ServerConfig, start_server
+
+CONTEXTS = {"metadata": "Hybrid Attention", "results": "Table 1: 78.4%", "summary": "Abstract: x"}
+
+class BilledCompletions:
+    """Sync client answering every head with an OpenRouter-style usage block."""
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = json.dumps({"summary": "billed"})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20, cost=0.0003),
+        )
+
+@pytest.fixture
+def server():
+    srv = start_server(config=ServerConfig(max_concurrent=1, latency_ms=20, error_rate=0.3, seed=11))
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    srv.shutdown()
+    srv.server_close()
+
+def test_usage_cost_and_calls_per_head(tmp_path):
+    llm = OpenRouterLLM(api_key="test-key", model_id="test/billed", max_prompt_chars=None)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=BilledCompletions()))
+    paper = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path)).run({"summary": "Abstract: x"})
+    record = paper["_meta"]["llm_metrics"]
+    head = record["heads"]["summary"]
+    assert head["source"] == "llm" and head["calls"] == 1 and not head["estimated"]
+    assert (head["prompt_tokens"], head["completion_tokens"], head["cost"]) == (100, 20, 0.0003)
+    assert record["model"] == "test/billed" and record["totals"]["cost"] == 0.0003
+    # usage accounting is requested from OpenRouter itself
+    assert llm.client.chat.completions.calls[0]["extra_body"] == {"usage": {"include": True}}
+
+    again = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path)).run({"summary": "Abstract: x"})
+    totals = again["_meta"]["llm_metrics"]["totals"]
+    assert totals["cache_hits"] == 1 and totals["cache_hit_rate"] == 1.0
+    assert totals["calls"] == 0 and totals["prompt_tokens"] == 0 and totals["cost"] is None
+
+def test_retries_and_server_usage_are_attributed_to_heads(server, tmp_path):
+    _, base_url = server
+    configure_model("local/metrics", rpm=None, max_in_flight=8, max_retries=30, backoff_base=0.01, backoff_cap=0.05)
+    llm = AsyncOpenRouterLLM(api_key="local", model_id="local/metrics", max_prompt_chars=None, base_url=base_url)
+    record = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path)).run(CONTEXTS)["_meta"]["llm_metrics"]
+    heads = record["heads"]
+    assert set(heads) == set(CONTEXTS)
+    assert all(h["calls"] == 1 and h["prompt_tokens"] > 0 and h["completion_tokens"] > 0 for h in heads.values())
+    assert not record["totals"]["estimated"] and record["totals"]["cost"] is None
+    assert record["totals"]["retries"] == llm.limiter.stats()["retries"] > 0
+    assert record["totals"]["wall_ms"] >= max(h["latency_ms"] for h in heads.values()) > 0
+
+def test_batch_summary_aggregates_latency_tokens_and_hit_rate():
+    metrics = [
+        PaperMetrics("a", True, 0, 1.0, 50.0, 60.0, llm_calls=2, prompt_tokens=300, completion_tokens=100,
+                     llm_cost=0.01, head_cache_hits=1, heads=3, head_latencies_ms=[100.0, 200.0]),
+        PaperMetrics("b", True, 0, 1.0, 50.0, 60.0, llm_calls=3, llm_retries=2, prompt_tokens=500,
+                     completion_tokens=100, heads=3, head_latencies_ms=[300.0, 400.0, 500.0]),
+    ]
+    df, summary = aggregate_metrics(metrics)
+    assert "head_latencies_ms" not in df.columns and "parse_cache_hit" not in df.columns
+    assert list(df["prompt_tokens"]) == [300, 500]
+    assert summary["Tokens per paper"] == 500.0 and summary["LLM calls"] == 5 and summary["LLM retries"] == 2
+    assert summary["LLM cost"] == 0.01 and summary["Head cache hit rate"] == pytest.approx(1 / 6)
+    assert summary["Head latency p50 ms"] == 300.0 and summary["Head latency p95 ms"] == pytest.approx(480.0)
+    json.dumps(summary)
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([5.0], 95) == 5.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+
+def test_fallback_request_is_the_one_accounted(monkeypatch):
+    class NoJsonMode(BilledCompletions):
+        def create(self, **kwargs):
+            if "response_format" in kwargs:
+                self.calls.append(kwargs)
+                raise ValueError("JSON mode is not enabled for this model")
+            return super().create(**kwargs)
+
+    llm = OpenRouterLLM(api_key="test-key", model_id="test/nojson", max_prompt_chars=None)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=NoJsonMode()))
+    accounted = []
+    monkeypatch.setattr(llm, "_account", lambda request, usage=None, text="": accounted.append(request))
+    assert json.loads(llm.generate("prompt"))["summary"] == "billed"
+    sent = llm.client.chat.completions.calls
+    assert "response_format" in sent[0] and accounted == [sent[1]]
@@ -0,0 +1,68 @@
+# tests/test_local_llm_server.py
+import json
+import urllib.request
+
+import pytest
+
+from orchestrator.heads import AsyncOpenRouterLLM, HeadRunner, OPENROUTER_BASE_URL
+from orchestrator.pipeline import Pipeline
+from orchestrator.ratelimit import configure_model
+from scripts.local_llm_server import ServerConfig, start_server
+
+CONTEXTS = {"metadata": "Hybrid Attention", "results": "Table 1: 78.4%", "summary": "Abstract: x"}
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def _serve(**config):
+        server = start_server(config=ServerConfig(**config))
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield _serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def _llm(base_url, model_id, **kwargs):
+    configure_model(model_id, rpm=None, max_in_flight=8, max_retries=30, backoff_base=0.01, backoff_cap=0.05)
+    return AsyncOpenRouterLLM(api_key="local", model_id=model_id, max_prompt_chars=None, base_url=base_url, **kwargs)
+
+def _stats(base_url):
+    with urllib.request.urlopen(base_url.rsplit("/v1", 1)[0] + "/stats") as resp:
+        return json.loads(resp.read())
+
+def test_pipeline_runs_against_the_stand_in(serve, tmp_path):
+    server, base_url = serve(latency_ms=20)
+    llm = _llm(base_url, "local/plain")
+    paper = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path)).run(CONTEXTS)
+    assert paper["title"] and paper["results"][0]["dataset"] == "TinyImageNet"
+    stats = _stats(base_url)
+    assert stats["requests"] == 3 and stats["head:metadata"] == 1 and stats["head:results"] == 1
+    assert llm.cache_params()["base_url"] == base_url
+
+def test_limiter_retries_429s_and_failures(serve, tmp_path):
+    server, base_url = serve(max_concurrent=1, latency_ms=50, error_rate=0.3, seed=7)
+    llm = _llm(base_url, "local/busy")
+    paper = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path)).run(CONTEXTS)
+    assert paper["summary"]
+    stats = _stats(base_url)
+    assert stats["rate_limited"] > 0 and stats["max_in_flight"] == 1
+    # every rejected or failed attempt is retried by the limiter alone
+    assert stats["requests"] == 3 + stats["rate_limited"] + stats.get("failed", 0)
+    assert llm.limiter.stats()["retries"] == stats["rate_limited"] + stats.get("failed", 0)
+
+def test_streamed_completions(serve, tmp_path):
+    server, base_url = serve(stream_chunk_chars=5)
+    llm = _llm(base_url, "local/stream", stream=True)
+    paper = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path)).run(CONTEXTS)
+    assert paper["title"] == "Hybrid Attention for Efficient Image Classification"
+    assert llm.stream_stats == {"streamed": 3, "diverged": 0}
+
+def test_base_url_from_environment(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_BASE_URL", "http://127.0.0.1:9/v1")
+    assert AsyncOpenRouterLLM(api_key="local").base_url == "http://127.0.0.1:9/v1"
+    monkeypatch.delenv("OPENROUTER_BASE_URL")
+    llm = AsyncOpenRouterLLM(api_key="local")
+    assert llm.base_url == OPENROUTER_BASE_URL and "base_url" not in llm.cache_params()
@@ -0,0 +1,40 @@
+# tests/test_ocr.py
+import pytest
+from reportlab.pdfgen import canvas
+from ingestion import ocr, parser
+
+def fake_engine(png: bytes, lang: str) -> str:
+    # stands in for Tesseract; module-level so worker processes can unpickle it
+    assert png.startswith(b"\x89PNG")
+    return f"Recognised page text ({lang}).\n\nSecond paragraph of the scan."
+
+def make_blank_pdf(path: str, n_pages: int = 3):
+    # pages with no text layer, as a scanner would produce
+    c = canvas.Canvas(path)
+    for _ in range(n_pages):
+        c.rect(72, 72, 200, 200)
+        c.showPage()
+    c.save()
+
+def test_weak_pages_ocr_queue_and_cache(tmp_path):
+    pdf_path = str(tmp_path / "scan.pdf")
+    make_blank_pdf(pdf_path)
+    parsed = parser.parse_pdf_to_pages(pdf_path, save_json=False)
+    assert parsed["needs_ocr"]
+    cache = ocr.OCRPageCache(str(tmp_path / "ocr"))
+    pages = parsed["pages"]
+    replaced = parser.ocr_weak_pages(pdf_path, pages, workers=2, dpi=50, cache=cache, engine=fake_engine)
+    assert replaced == [1, 2, 3]
+    assert all(p["parser_used"] == "ocr" for p in pages)
+    assert pages[0]["clean_text"] == "Recognised page text (eng).\n\nSecond paragraph of the scan."
+    assert len(pages[0]["blocks"]) == 2
+    # second run is served from the per-page cache
+    texts = ocr.ocr_pages(pdf_path, [1, 2, 3], dpi=50, cache=cache, engine=fake_engine)
+    assert cache.hits == 3 and len(texts) == 3
+
+@pytest.mark.skipif(ocr._HAS_TESSERACT, reason="pytesseract is installed")
+def test_ocr_without_tesseract_raises(tmp_path):
+    pdf_path = str(tmp_path / "scan.pdf")
+    make_blank_pdf(pdf_path, n_pages=1)
+    with pytest.raises(RuntimeError):
+        parser.parse_pdf_to_pages(pdf_path, parser.ParseOptions(ocr=True), save_json=False)
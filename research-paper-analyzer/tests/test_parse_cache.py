@@ -0,0 +1,42 @@
+from reportlab.pdfgen import canvas
+from ingestion import parser
+from ingestion.cache import ParseCache
+
+def _make_pdf(path: str, text: str):
+    c = canvas.Canvas(path)
+    c.drawString(72, 800, text)
+    c.showPage()
+    c.save()
+
+def test_cache_hit_on_same_content(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    a = tmp_path / "a.pdf"
+    _make_pdf(str(a), "Cached parse test")
+    first = parser.parse_pdf_to_pages(str(a), save_json=False, cache=cache)
+    assert cache.stats()["misses"] == 1
+
+    # Same bytes under another name: served from cache, but file/basename follow the new path
+    b = tmp_path / "b.pdf"
+    b.write_bytes(a.read_bytes())
+    second = parser.parse_pdf_to_pages(str(b), save_json=False, cache=cache)
+    assert cache.stats()["hits"] == 1
+    assert second["basename"] == "b"
+    assert second["pages"] == first["pages"]
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"), max_bytes=1)
+    cache.put("k1", {"pages": [{"clean_text": "x" * 100}]})
+    cache.put("k2", {"pages": [{"clean_text": "y" * 100}]})
+    # Every put overflows a 1-byte cap, so only the newest entry survives at most
+    assert cache.get("k1") is None
+    assert cache.stats()["evictions"] >= 1
+
+def test_cache_key_follows_output_options():
+    base = parser.ParseOptions()
+    # speed and return-form settings share entries
+    assert parser.ParseOptions(workers=4, chunk_size=2, compact=True).cache_key() == base.cache_key()
+    # OCR render settings only count when OCR runs
+    assert parser.ParseOptions(ocr_dpi=150).cache_key() == base.cache_key()
+    assert parser.ParseOptions(ocr=True, ocr_dpi=150).cache_key() != parser.ParseOptions(ocr=True).cache_key()
+    assert parser.ParseOptions(extraction_mode="dict").cache_key() != base.cache_key()
+    assert base.cache_key()["parser_version"] == parser.PARSER_VERSION
@@ -0,0 +1,57 @@
+# tests/test_prompts.py
+import hashlib
+import os
+import shutil
+
+import pytest
+
+from orchestrator.heads import HeadRunner
+from orchestrator.prompts import PROMPTS_DIR, PromptRegistry, PromptTemplate, shared_prompt_registry
+
+@pytest.fixture
+def prompts(tmp_path):
+    shutil.copytree(PROMPTS_DIR, tmp_path / "prompts")
+    return tmp_path / "prompts"
+
+def _edit(path, extra):
+    stat = path.stat()
+    path.write_text(path.read_text(encoding="utf-8") + extra, encoding="utf-8")
+    # make sure the mtime moves even on coarse filesystem clocks
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+def test_rendering_matches_plain_replacement():
+    registry = PromptRegistry()
+    assert {"fused", "metadata", "methods", "results", "limitations", "summary"} <= set(registry.versions())
+    for name in registry.versions():
+        text = (PROMPTS_DIR / f"{name}_prompt.txt").read_text(encoding="utf-8")
+        expected = text.replace("{heads}", '"summary"').replace("{context_text}", "CTX {json}")
+        assert registry.render(name, context_text="CTX {json}", heads='"summary"') == expected
+        assert registry.version(name) == hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+def test_only_known_placeholders_are_substituted():
+    t = PromptTemplate.compile("x", 'Return {"title": "..."} for {context_text} [{heads}] {other}')
+    assert t.prefix == 'Return {"title": "..."} for '
+    assert t.fields == ("context_text", "heads")
+    assert t.render(context_text="C", heads="H") == 'Return {"title": "..."} for C [H] {other}'
+
+def test_templates_stay_loaded_until_reload(prompts):
+    registry = PromptRegistry(prompts)
+    before = registry.version("summary")
+    _edit(prompts / "summary_prompt.txt", "\nBe brief.")
+    assert registry.version("summary") == before
+    assert registry.reload() == {"summary": registry.version("summary")} and registry.version("summary") != before
+    with pytest.raises(FileNotFoundError):
+        registry.get("missing")
+
+def test_hot_reload_picks_up_edits(prompts):
+    registry = PromptRegistry(prompts, hot_reload=True)
+    before = registry.version("metadata")
+    _edit(prompts / "metadata_prompt.txt", "\nNo prose.")
+    assert registry.version("metadata") != before
+    assert registry.render("metadata", context_text="C").endswith("\nNo prose.")
+
+def test_head_runners_share_one_registry(prompts):
+    assert HeadRunner().prompts is HeadRunner().prompts
+    assert shared_prompt_registry(prompts) is shared_prompt_registry(prompts)
+    runner = HeadRunner(prompts=PromptRegistry(prompts))
+    assert runner.template_version("summary") == HeadRunner().template_version("summary")
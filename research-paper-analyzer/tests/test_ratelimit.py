@@ -0,0 +1,84 @@
+# tests/test_ratelimit.py
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from orchestrator import heads, ratelimit
+from orchestrator.heads import AsyncOpenRouterLLM
+from orchestrator.ratelimit import ModelLimits, RateLimiter, TokenBucket
+
+def _rate_limit_error(retry_after="0"):
+    request = httpx.Request("POST", "https://example.test/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+def test_token_bucket_refills_continuously():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])
+    assert all(bucket.reserve() == 0 for _ in range(60))
+    # the 61st request waits one refill interval (1s at 60/min)
+    assert bucket.reserve() == pytest.approx(1.0)
+    now[0] += 2.0
+    assert bucket.reserve() == 0
+    bucket.pause(5.0)
+    assert bucket.reserve() == pytest.approx(5.0)
+
+def test_retry_after_header_parsing():
+    assert ratelimit.retry_after_seconds(_rate_limit_error("7")) == 7.0
+    assert ratelimit.is_retryable(_rate_limit_error())
+    assert not ratelimit.is_retryable(ValueError("bad json"))
+
+def test_limiter_retries_only_the_failed_call(monkeypatch):
+    monkeypatch.setattr(ratelimit.time, "sleep", lambda s: None)
+    limiter = RateLimiter("m", ModelLimits(max_retries=3))
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _rate_limit_error("0")
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert len(attempts) == 3 and limiter.stats()["throttled"] == 2
+
+    with pytest.raises(ValueError):
+        limiter.call(lambda: (_ for _ in ()).throw(ValueError("not transient")))
+
+def test_async_limiter_caps_in_flight_requests():
+    limiter = RateLimiter("m", ModelLimits(max_in_flight=2))
+    peak = [0, 0]
+
+    async def request():
+        peak[0] += 1
+        peak[1] = max(peak[1], peak[0])
+        await asyncio.sleep(0.02)
+        peak[0] -= 1
+        return True
+
+    async def main():
+        return await asyncio.gather(*(limiter.acall(request) for _ in range(6)))
+
+    assert all(asyncio.run(main()))
+    assert peak[1] == 2
+
+def test_async_openrouter_llm_retries_429(monkeypatch):
+    calls = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise _rate_limit_error("0")
+            message = SimpleNamespace(content='{"summary": "ok"}')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    monkeypatch.setattr(heads, "shared_async_openai_client", lambda api_key, base_url=None: fake)
+    ratelimit.configure_model("test/retry-model", backoff_base=0.0)
+    llm = AsyncOpenRouterLLM(api_key="test-key", model_id="test/retry-model", max_prompt_chars=None)
+    assert asyncio.run(llm.agenerate("prompt")) == '{"summary": "ok"}'
+    assert len(calls) == 2
@@ -0,0 +1,67 @@
+# tests/test_replay.py
+import asyncio
+import gzip
+import time
+
+import pytest
+
+from orchestrator.heads import HeadRunner, MockLLM
+from orchestrator.pipeline import Pipeline
+from orchestrator.ratelimit import ModelLimits
+from orchestrator.replay import RecordingLLM, ReplayLLM, ReplayMissError, ResponseArchive
+
+CONTEXTS = {"metadata": "Hybrid Attention", "methods": "We propose X", "summary": "Abstract: shared paper"}
+FAST = ModelLimits(max_retries=3, backoff_base=0.001, backoff_cap=0.01)
+
+def _record(path):
+    with RecordingLLM(MockLLM(), str(path), flush_every=2) as llm:
+        paper = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(path.parent / "rec")).run(CONTEXTS)
+    return paper
+
+def test_replay_reproduces_recorded_run(tmp_path):
+    archive = tmp_path / "responses.jsonl.gz"
+    recorded = _record(archive)
+    assert len(ResponseArchive(str(archive))) == 3
+    llm = ReplayLLM(str(archive), latency=0.0, limits=FAST)
+    assert llm.model_id == "MockLLM"
+    replayed = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path / "rep")).run(CONTEXTS)
+    # run metrics differ (replay estimates tokens); the extraction is identical
+    assert replayed["_meta"].pop("llm_metrics")["totals"]["calls"] == 3
+    recorded["_meta"].pop("llm_metrics")
+    assert replayed == recorded
+    assert llm.stats()["calls"] == 3 and llm.stats()["misses"] == 0
+
+def test_unknown_prompt_is_a_miss(tmp_path):
+    archive = tmp_path / "responses.jsonl.gz"
+    _record(archive)
+    llm = ReplayLLM(str(archive), latency=0.0, limits=FAST)
+    with pytest.raises(ReplayMissError):
+        llm.generate("a prompt nobody recorded")
+    assert llm.misses == 1
+
+def test_injected_errors_are_retried_by_the_limiter(tmp_path):
+    archive = tmp_path / "responses.jsonl.gz"
+    _record(archive)
+    llm = ReplayLLM(str(archive), latency=0.0, error_rate=0.5, seed=3, limits=FAST)
+    runner = HeadRunner(llm_client=llm)
+
+    async def many():
+        return await asyncio.gather(*(runner.arun_summary_head("Abstract: shared paper") for _ in range(10)))
+
+    out = asyncio.run(many())
+    assert all(o.summary for o in out)
+    assert llm.injected_errors > 0 and llm.limiter.stats()["retries"] == llm.injected_errors
+
+def test_fixed_latency_and_truncated_archive(tmp_path):
+    archive = tmp_path / "responses.jsonl.gz"
+    archive_obj = ResponseArchive(str(archive))
+    archive_obj.add("m", "p", '{"summary": "s"}')
+    archive_obj.add("m", "q", '{"summary": "t"}')
+    archive_obj.flush()
+    # a recording killed mid-flush leaves a partial gzip member behind
+    with open(archive, "ab") as fh:
+        fh.write(gzip.compress(b'{"key": "x", "model": "m"')[:15])
+    llm = ReplayLLM(str(archive), latency=0.05, limits=FAST)
+    t0 = time.perf_counter()
+    assert llm.generate("q") == '{"summary": "t"}'
+    assert time.perf_counter() - t0 >= 0.05
@@ -0,0 +1,47 @@
+from ingestion.sections import build_section_index, canonical_section_name
+
+def _block(text, size=10.0):
+    return {"bbox": [72, 100, 500, 120], "text": text, "font_size": size}
+
+PAGES = [
+    {"page_no": 1, "blocks": [
+        _block("A Great Paper", 17.0),
+        _block("ABSTRACT", 12.0),
+        _block("We study things and report 90% accuracy."),
+        _block("1\nIntroduction", 12.0),
+        _block("Things are important."),
+    ]},
+    {"page_no": 2, "blocks": [
+        _block("2 Proposed Method: GreatNet", 12.0),
+        _block("GreatNet stacks layers."),
+        _block("3\nExperiments", 12.0),
+        _block("Table 1: GreatNet 90.0 on CIFAR-10."),
+    ]},
+    {"page_no": 3, "blocks": [
+        _block("4 Conclusion", 12.0),
+        _block("GreatNet works. A limitation is scale."),
+        _block("References", 12.0),
+        _block("[1] Someone. 2020."),
+    ]},
+]
+
+def test_canonical_names():
+    assert canonical_section_name("RELATED WORKS") == "Related Work"
+    assert canonical_section_name("Proposed Method: CUSP") == "Method"
+    assert canonical_section_name("Conclusions and Future Work") == "Conclusion"
+    assert canonical_section_name("Training") is None
+
+def test_section_index_offsets():
+    sections = build_section_index(PAGES)
+    assert [s["name"] for s in sections] == [
+        "Abstract", "Introduction", "Method", "Experiments", "Conclusion", "References"]
+    by_name = {s["name"]: s for s in sections}
+    method = by_name["Method"]
+    assert (method["page_start"], method["block_start"]) == (2, 0)
+    assert (method["page_end"], method["block_end"]) == (2, 2)
+    # spans across pages: ends where the next heading starts
+    exp = by_name["Experiments"]
+    assert (exp["page_start"], exp["block_start"], exp["page_end"], exp["block_end"]) == (2, 2, 3, 0)
+    # the last section runs to one past the last block
+    refs = by_name["References"]
+    assert (refs["page_end"], refs["block_end"]) == (3, 4)
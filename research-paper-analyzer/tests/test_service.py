@@ -0,0 +1,61 @@
+# tests/test_service.py
+import asyncio
+import threading
+
+import pytest
+
+from orchestrator.heads import HeadRunner, MockLLM
+from orchestrator.pipeline import Pipeline
+from orchestrator.service import PipelineService
+
+class LoopRecordingLLM(MockLLM):
+    def __init__(self):
+        self.loops = set()
+
+    async def agenerate(self, prompt, temperature=0.0, max_tokens=512):
+        self.loops.add(id(asyncio.get_running_loop()))
+        return self.generate(prompt, temperature=temperature, max_tokens=max_tokens)
+
+def test_submissions_from_many_threads_share_one_loop(tmp_path):
+    llm = LoopRecordingLLM()
+    pipeline = Pipeline(head_runner=HeadRunner(llm_client=llm), cache_dir=str(tmp_path))
+    results = []
+    with PipelineService(pipeline) as service:
+        def upload(i):
+            results.append(service.submit({"summary": f"Abstract: paper {i}"}).result(timeout=10))
+
+        threads = [threading.Thread(target=upload, args=(i,)) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert len(results) == 5 and all(r["summary"].startswith("We introduce") for r in results)
+    assert len(llm.loops) == 1
+    assert service.closed
+
+def test_shutdown_is_idempotent_and_rejects_new_work(tmp_path):
+    service = PipelineService(Pipeline(cache_dir=str(tmp_path)))
+    assert service.run({"summary": "Abstract: x"}, timeout=10)["summary"]
+    service.shutdown()
+    service.shutdown()
+    with pytest.raises(RuntimeError):
+        service.submit({"summary": "Abstract: x"})
+
+def test_pipeline_errors_surface_on_the_future(tmp_path):
+    class Broken(MockLLM):
+        async def agenerate(self, prompt, temperature=0.0, max_tokens=512):
+            return "not json"
+
+    with PipelineService(Pipeline(cache_dir=str(tmp_path))) as service:
+        broken = Pipeline(head_runner=HeadRunner(llm_client=Broken()), cache_dir=str(tmp_path / "b"))
+        with pytest.raises(Exception):
+            service.submit({"summary": "Abstract: x"}, pipeline=broken).result(timeout=10)
+        # the service keeps working after a failed submission
+        assert service.run({"summary": "Abstract: y"}, timeout=10)["summary"]
+
+def test_default_pipeline_is_built_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with PipelineService() as service:
+        other = Pipeline(cache_dir=str(tmp_path / "other"))
+        assert service.run({"summary": "Abstract: x"}, pipeline=other, timeout=10)["summary"]
+        assert not (tmp_path / ".cache").exists()
@@ -0,0 +1,105 @@
+# tests/test_singleflight.py
+import asyncio
+import threading
+import time
+
+from orchestrator.cache import SQLiteCache
+from orchestrator.heads import HeadRunner, MockLLM
+from orchestrator.pipeline import Pipeline
+from orchestrator.singleflight import SingleFlight
+
+class SlowCountingLLM(MockLLM):
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, temperature=0.0, max_tokens=512):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return super().generate(prompt, temperature, max_tokens)
+
+    agenerate = None  # force the thread path so calls overlap in wall time
+
+def test_concurrent_pipelines_share_one_call_per_head(tmp_path):
+    llm = SlowCountingLLM()
+    cache = SQLiteCache(str(tmp_path / "heads.sqlite"))
+    flight = SingleFlight()
+    contexts = {"summary": "Abstract: shared paper", "methods": "We propose X"}
+    results = []
+
+    def session():
+        pipeline = Pipeline(head_runner=HeadRunner(llm_client=llm), cache=cache, single_flight=flight)
+        results.append(pipeline.run(contexts))
+
+    threads = [threading.Thread(target=session) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert llm.calls == 2
+    run_metrics = [r["_meta"].pop("llm_metrics") for r in results]
+    assert sum(m["totals"]["calls"] for m in run_metrics) == 2
+    for head in contexts:
+        sources = sorted(m["heads"][head]["source"] for m in run_metrics)
+        # one session called the model; the others shared its call or found it cached
+        assert sources.count("llm") == 1 and set(sources) <= {"llm", "shared", "cache"}
+    assert len(results) == 4 and all(r == results[0] for r in results)
+    assert flight.stats()["coalesced"] + cache.stats()["hits"] >= 6
+
+def test_followers_receive_leader_exception():
+    flight = SingleFlight()
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("provider down")
+
+    async def main():
+        return await asyncio.gather(*(flight.run("k", boom) for _ in range(3)), return_exceptions=True)
+
+    out = asyncio.run(main())
+    assert len(calls) == 1 and all(isinstance(e, ValueError) for e in out)
+
+def test_lease_makes_other_process_wait_for_the_result(tmp_path):
+    path = str(tmp_path / "heads.sqlite")
+    holder, waiter = SQLiteCache(path), SQLiteCache(path)  # distinct lease owners, like two processes
+    assert holder.acquire_lease("k", 60)
+    assert not waiter.acquire_lease("k", 60)
+
+    def finish_elsewhere():
+        time.sleep(0.1)
+        holder.put("k", {"summary": "from the other process"})
+        holder.release_lease("k")
+
+    async def compute():
+        raise AssertionError("should reuse the other process's result")
+
+    threading.Thread(target=finish_elsewhere).start()
+    flight = SingleFlight(poll_seconds=0.02)
+    assert asyncio.run(flight.run("k", compute, cache=waiter)) == {"summary": "from the other process"}
+    assert flight.stats()["lease_waits"] >= 1
+
+def test_expired_lease_is_taken_over(tmp_path):
+    path = str(tmp_path / "heads.sqlite")
+    crashed, survivor = SQLiteCache(path), SQLiteCache(path)
+    assert crashed.acquire_lease("k", 0.05)
+    time.sleep(0.1)
+    assert survivor.acquire_lease("k", 60)
+
+def test_lease_holder_finding_the_result_cached_reports_a_cache_hit(tmp_path):
+    from orchestrator import metrics
+
+    cache = SQLiteCache(str(tmp_path / "heads.sqlite"))
+    record = metrics.HeadMetrics()
+
+    async def compute():
+        raise AssertionError("the cached result should have been used")
+
+    async def leader():
+        with metrics.measuring(record):
+            return await SingleFlight().run("k", compute, cache=cache, lookup=lambda: {"payload": 1})
+
+    assert asyncio.run(leader()) == {"payload": 1}
+    assert record.source == "cache"
@@ -0,0 +1,107 @@
+# tests/test_streaming.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from orchestrator import heads
+from orchestrator.heads import AsyncOpenRouterLLM, HeadRunner, OpenRouterLLM
+from orchestrator.streaming import JSONStreamValidator, StreamDivergedError
+from schema.head_models import MetadataOutput, MethodsOutput, ResultsOutput
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+class FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.sent += 1
+            yield _chunk(piece)
+
+    def close(self):
+        self.closed = True
+
+class FakeCompletions:
+    def __init__(self, pieces, full='{"summary": "from the full completion"}'):
+        self.pieces = pieces
+        self.full = full
+        self.calls = []
+        self.streams = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            self.streams.append(FakeStream(self.pieces))
+            return self.streams[-1]
+        message = SimpleNamespace(content=self.full)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def _llm(pieces, **kwargs):
+    llm = OpenRouterLLM(api_key="test-key", model_id="test/stream", max_prompt_chars=None, stream=True)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(pieces, **kwargs)))
+    return llm
+
+def test_validator_accepts_fenced_json_and_stops_at_its_end():
+    v = JSONStreamValidator(MetadataOutput)
+    assert not v.feed('```json\n{"title": "A \\"quoted\\" {title}", "authors": ["A", "B"], ')
+    assert v.feed('"year": 2023, "venue": null}\n```\nHope this helps!')
+    assert v.json_text.startswith('{"title"') and v.json_text.endswith("null}")
+
+@pytest.mark.parametrize("schema,text", [
+    (ResultsOutput, '{"dataset": "x"'),                    # results must be an array
+    (MetadataOutput, '{"title": "T", "authors": "A, B"'),  # authors must be a list
+    (MethodsOutput, '{"methods": [{"name": "X"}, "Y"'),   # method items are objects
+    (MetadataOutput, '{"title": "T"]'),                    # broken syntax
+    (MetadataOutput, "I could not find any metadata in this context. " * 5),
+])
+def test_validator_flags_divergence_before_the_end(schema, text):
+    with pytest.raises(StreamDivergedError):
+        JSONStreamValidator(schema).feed(text)
+
+def test_stream_is_closed_once_the_json_is_complete():
+    llm = _llm(['{"summ', 'ary": "streamed"}', " and some trailing chatter", " that is never read"])
+    out = HeadRunner(llm_client=llm).run_summary_head("context")
+    stream = llm.client.chat.completions.streams[0]
+    assert out.summary == "streamed"
+    assert stream.closed and stream.sent == 2
+    assert llm.stream_stats == {"streamed": 1, "diverged": 0}
+
+def test_diverging_stream_falls_back_to_a_plain_request():
+    llm = _llm(['{"title": "T", "authors": 7', ', "year": 2023}', "never read"],
+               full='{"title": "T", "authors": ["A"], "year": 2023}')
+    out = HeadRunner(llm_client=llm).run_metadata_head("context")
+    calls = llm.client.chat.completions.calls
+    assert out.authors == ["A"]
+    assert [bool(c.get("stream")) for c in calls] == [True, False]
+    assert llm.client.chat.completions.streams[0].sent == 1
+    assert llm.stream_stats["diverged"] == 1 and "authors" in llm.last_divergence
+
+def test_async_stream(monkeypatch):
+    class AsyncFakeStream(FakeStream):
+        async def __aiter__(self):
+            for chunk in FakeStream.__iter__(self):
+                yield chunk
+
+        async def close(self):
+            self.closed = True
+
+    class AsyncCompletions:
+        stream = None
+
+        async def create(self, **kwargs):
+            assert kwargs["stream"]
+            self.stream = AsyncFakeStream(['[{"dataset": "D", "metric": "acc", ', '"value": 1.5}]', "!"])
+            return self.stream
+
+    completions = AsyncCompletions()
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(heads, "shared_async_openai_client", lambda api_key, base_url=None: fake)
+    llm = AsyncOpenRouterLLM(api_key="test-key", model_id="test/stream", max_prompt_chars=None, stream=True)
+    out = asyncio.run(HeadRunner(llm_client=llm).arun_results_head("context"))
+    assert out.__root__[0].value == 1.5
+    assert completions.stream.closed and completions.stream.sent == 2
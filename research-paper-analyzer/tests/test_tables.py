@@ -0,0 +1,51 @@
+from ingestion.tables import dataset_from_caption, records_from_grid, split_header, table_hints, validated_results
+
+def test_split_header():
+    assert split_header("Acc (%)") == ("Accuracy", "")
+    assert split_header("CRT Acc") == ("Accuracy", "CRT")
+    assert split_header("params") == (None, "params")
+
+def test_dataset_from_caption():
+    assert dataset_from_caption("Variations on the Transformer. All metrics are on the English-to-German set") == "English-to-German"
+    assert dataset_from_caption("Results on CIFAR-10.") == "CIFAR-10"
+
+def test_merged_booktabs_cells_are_expanded():
+    # what the table finder returns for a rule-only table: columns and rows merged
+    rows = [
+        ["Datasets", "CRT", "Heart"],
+        ["Method", "Acc F1", "Acc F1"],
+        ["Ours\nBaseline", "0.91 0.80\n0.85 0.70", "0.77 0.60\n0.70 0.55"],
+    ]
+    recs = records_from_grid(rows, caption="Main results.")
+    got = {(r["row_label"], r["ours_is"], r["dataset"], r["metric"], r["value"]) for r in recs}
+    assert ("Ours", "Ours", "CRT", "Accuracy", 0.91) in got
+    assert ("Baseline", None, "Heart", "F1", 0.55) in got
+    assert len(recs) == 8
+
+def test_metric_from_caption_and_validation():
+    rows = [["Model", "CIFAR-10", "SVHN"], ["ResNet", "93.1 ± 0.2", "96.0"], ["Ours", "94.5*", "n/a"]]
+    recs = records_from_grid(rows, caption="Test accuracy (%) of all models.")
+    assert [(r["dataset"], r["value"]) for r in recs] == [("CIFAR-10", 93.1), ("SVHN", 96.0), ("CIFAR-10", 94.5)]
+    assert all(r["metric"] == "Accuracy" for r in recs)
+    valid = validated_results(recs + [{"dataset": "x", "metric": "y"}])
+    assert len(valid) == 3 and "row_label" not in valid[0]
+
+def test_baseline_rows_are_not_marked_as_ours():
+    rows = [["Method", "MSE", "MAE"], ["Traditional Lasso", "0.41", "0.52"],
+            ["Random Forest", "0.38", "0.47"], ["Proposed GraphLasso", "0.29", "0.36"]]
+    recs = records_from_grid(rows, caption="Results on Housing.")
+    ours = {r["row_label"]: r["ours_is"] for r in recs}
+    assert ours == {"Traditional Lasso": None, "Random Forest": None, "Proposed GraphLasso": "Proposed GraphLasso"}
+    assert all(r.get("baseline") is None for r in recs)
+
+def test_table_hints_list_candidates_with_provenance():
+    rows = [["Model", "CIFAR-10"], ["ResNet", "93.1"], ["ResNet", "93.1"], ["Ours", "94.5%"]]
+    recs = records_from_grid(rows, caption="Test accuracy of all models.")
+    for r in recs:
+        r.update({"page": 4, "table": "2"})
+    hints = table_hints(recs + [{"dataset": "x"}]).splitlines()
+    assert hints[0].startswith("TABLE CANDIDATES")
+    assert hints[1:] == ['- Table 2 (p. 4), row "ResNet": Accuracy on CIFAR-10 = 93.1',
+                         '- Table 2 (p. 4), row "Ours": Accuracy on CIFAR-10 = 94.5%']
+    assert table_hints(recs, max_rows=1).count("\n") == 1
+    assert table_hints([]) == ""